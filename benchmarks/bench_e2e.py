@@ -0,0 +1,257 @@
+# End-to-end load benchmark: drives the real FastAPI app over HTTP at increasing
+# concurrency and writes throughput, latency percentiles and memory per scenario as JSON.
+#
+#   python -m benchmarks.bench_e2e --concurrency 1,4,16 --requests 48 --output bench.json
+#   python -m benchmarks.bench_e2e --compare before.json --output after.json
+#
+# Everything external is local: the GitHub stub (REST + GraphQL, with latency, payload
+# size and per-token rate limits), a fake Gemini model (latency spread over streamed
+# chunks) and the in-memory Firestore. The app runs in its own uvicorn process, as in
+# production, so its CPU and memory are measured apart from the load generator's.
+#
+# Scenarios:
+#   small_user       a developer with a handful of repos against an ordinary repo
+#   prolific_user    300 repos with padded listings, profiled in deep mode
+#   monorepo_target  a ~60k-entry tree that comes back truncated and is split per directory
+#
+# Each request is a different developer against the scenario's repo, so developer
+# extraction and LLM synthesis are paid every time while the repo context is shared,
+# as when many candidates are evaluated for one team. The report cache is off.
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+import httpx
+import uvicorn
+
+from benchmarks.github_stub import StubServer, _BackgroundProcess, create_github_stub_app
+
+@dataclass
+class Scenario:
+    name: str
+    stub: Dict[str, Any] = field(default_factory=dict)   # create_github_stub_app() arguments
+    profile_mode: str = "fast"
+    repo_url: str = "https://github.com/acme/platform"
+
+SCENARIOS = {
+    "small_user": Scenario("small_user", stub={"repo_count": 5}),
+    "prolific_user": Scenario("prolific_user", stub={"repo_count": 300, "repo_padding_bytes": 2000}, profile_mode="deep"),
+    "monorepo_target": Scenario(
+        "monorepo_target", stub={"tree_fanout": 10, "tree_levels": 4, "tree_truncate_at": 20000},
+        repo_url="https://github.com/acme/monorepo"
+    ),
+}
+
+# Settings for the app process: local stand-ins, per-process caches, nothing on disk
+APP_ENV = {
+    "PERSISTENCE_BACKEND": "memory",
+    "GITHUB_TOKENS": "bench-token-1,bench-token-2",
+    "GITHUB_HTTP2": "false",
+    "GITHUB_CACHE_BACKEND": "memory",
+    "PROFILE_SNAPSHOT_BACKEND": "memory",
+    "REPO_INDEX_BACKEND": "memory",
+    "REPORT_CACHE_BACKEND": "none",
+    "CLONE_CACHE_DIR": "/nonexistent",
+}
+
+class AppServer(_BackgroundProcess):
+    """
+    Runs src.main:app with uvicorn in a child process, pointed at the GitHub stub, with
+    Gemini replaced by FakeGeminiModel. App logging goes to /dev/null unless 'verbose'.
+    """
+
+    def __init__(self, github_url: str, llm: Dict[str, Any], verbose: bool = False):
+        super().__init__()
+        self.github_url = github_url
+        self.llm = llm
+        self.verbose = verbose
+
+    def _target(self):
+        os.environ.update(APP_ENV, GITHUB_API_BASE=self.github_url)
+        if not self.verbose:
+            sys.stdout = open(os.devnull, "w")
+        # Imported here so only the child process loads the app
+        from benchmarks.fake_gemini import FakeGeminiModel
+        import src.main
+        from src.llm.client import init_llm
+
+        model = FakeGeminiModel(**self.llm)
+        src.main.init_llm = lambda: init_llm(model)
+        uvicorn.run(src.main.app, host="127.0.0.1", port=self.port, log_level="warning")
+
+def _memory_mb(pid: int) -> Dict[str, Optional[float]]:
+    """Current (VmRSS) and peak (VmHWM) resident memory of a process, from /proc (Linux)."""
+    values: Dict[str, Optional[float]] = {"rss_mb": None, "peak_rss_mb": None}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    values["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith("VmHWM:"):
+                    values["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return values
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank: an actual observed latency, stable for small samples
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+async def _run_level(
+    http: httpx.AsyncClient,
+    scenario: Scenario,
+    concurrency: int,
+    requests: int,
+    level_tag: str
+) -> Dict[str, Any]:
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            body = {
+                "git_id": f"dev-{level_tag}-{i}",
+                "repo_url": scenario.repo_url,
+                "user_id": "bench",
+                "profile_mode": scenario.profile_mode,
+            }
+            start = time.perf_counter()
+            try:
+                resp = await http.post("/api/generate-report", json=body)
+                status = str(resp.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": requests - statuses.get("200", 0),
+        "statuses": statuses,
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 1),
+            "p95": round(_percentile(latencies, 95), 1),
+            "p99": round(_percentile(latencies, 99), 1),
+            "max": round(latencies[-1], 1) if latencies else 0.0,
+            "mean": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        },
+    }
+
+async def _drive(app_url: str, app_pid: int, scenario: Scenario, levels: List[int], requests: int) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=app_url, timeout=120, limits=limits) as http:
+        # Cold request, reported apart from the levels: it pays the repo analysis (the
+        # monorepo's tree) and connection setup that later requests find cached
+        cold = await _run_level(http, scenario, 1, 1, "cold")
+        print(f"  {scenario.name:<16} cold  {cold['latency_ms']['max']:7.1f} ms", file=sys.stderr)
+        results = []
+        for concurrency in levels:
+            level = await _run_level(http, scenario, concurrency, requests, f"c{concurrency}")
+            level.update(_memory_mb(app_pid))
+            results.append(level)
+            print(
+                f"  {scenario.name:<16} c={concurrency:<3} {level['throughput_rps']:7.2f} req/s  "
+                f"p50 {level['latency_ms']['p50']:7.1f}  p95 {level['latency_ms']['p95']:7.1f}  "
+                f"p99 {level['latency_ms']['p99']:7.1f} ms  errors {level['errors']}  rss {level['rss_mb']} MB",
+                file=sys.stderr
+            )
+    return {"cold_ms": cold["latency_ms"]["max"], "cold_status": cold["statuses"], "levels": results}
+
+def run_scenario(scenario: Scenario, args: argparse.Namespace, levels: List[int]) -> Dict[str, Any]:
+    stub_args = {"latency_ms": args.github_latency_ms, "rate_limit": args.rate_limit, **scenario.stub}
+    llm = {"latency_ms": args.llm_latency_ms, "stream_chunks": args.llm_chunks, "report_chars": args.report_chars}
+    with StubServer(create_github_stub_app, **stub_args) as stub, AppServer(stub.url, llm, args.verbose) as app:
+        results = asyncio.run(_drive(app.url, app.process.pid, scenario, levels, args.requests))
+    return {"name": scenario.name, "profile_mode": scenario.profile_mode, "stub": stub_args, "llm": llm, **results}
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]):
+    """Prints per scenario and concurrency how throughput and p50/p95/p99 moved between two runs."""
+    print(f"comparing {before.get('commit')} -> {after.get('commit')}", file=sys.stderr)
+    previous = {
+        (scenario["name"], level["concurrency"]): level
+        for scenario in before["scenarios"] for level in scenario["levels"]
+    }
+    cold = {scenario["name"]: scenario.get("cold_ms") for scenario in before["scenarios"]}
+    for scenario in after["scenarios"]:
+        if cold.get(scenario["name"]):
+            print(f"  {scenario['name']:<16} cold  {_change(cold[scenario['name']], scenario['cold_ms'])}", file=sys.stderr)
+        for level in scenario["levels"]:
+            old = previous.get((scenario["name"], level["concurrency"]))
+            if old is None:
+                continue
+            deltas = [f"req/s {_change(old['throughput_rps'], level['throughput_rps'])}"]
+            deltas += [
+                f"{q} {_change(old['latency_ms'][q], level['latency_ms'][q])}" for q in ("p50", "p95", "p99")
+            ]
+            print(f"  {scenario['name']:<16} c={level['concurrency']:<3} " + "  ".join(deltas), file=sys.stderr)
+
+def _change(old: float, new: float) -> str:
+    return f"{(new - old) / old * 100:+6.1f}%" if old else "   n/a"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels, run in order")
+    parser.add_argument("--requests", type=int, default=32, help="Reports per concurrency level")
+    parser.add_argument("--github-latency-ms", type=float, default=50.0)
+    parser.add_argument("--rate-limit", type=int, default=1000000, help="Stub requests per token and window")
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0, help="Fake Gemini time per report")
+    parser.add_argument("--llm-chunks", type=int, default=20, help="Chunks the fake Gemini latency is spread over when streaming")
+    parser.add_argument("--report-chars", type=int, default=4000)
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own log lines")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "requests_per_level": args.requests,
+        "scenarios": [run_scenario(SCENARIOS[name.strip()], args, levels) for name in args.scenarios.split(",")],
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
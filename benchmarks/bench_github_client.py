@@ -0,0 +1,69 @@
+# Compares report extraction throughput with a fresh connection per GitHub call
+# (the old per-request AsyncClient behaviour) against the shared pooled client.
+#
+#   python -m benchmarks.bench_github_client --reports 100 --concurrency 4
+#
+# New connections are routed through a proxy that delays them by --handshake-ms to
+# stand in for the TCP + TLS setup to api.github.com. The stub speaks plain HTTP, so
+# HTTP/2 (negotiated via TLS ALPN) is not exercised here; only connection reuse is.
+# Stub, proxy and client run in separate processes; on small hosts keep --concurrency
+# low so the stub itself does not become the bottleneck.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+import httpx
+
+from benchmarks.github_stub import HandshakeDelayProxy, StubServer, create_github_stub_app
+from src.data_extraction import github_client
+from src.data_extraction.git_extractor import extract_developer_profile
+from src.data_extraction.repo_analyzer import analyze_repo_context
+
+async def _run_reports(total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_report(i: int):
+        async with semaphore:
+            await asyncio.gather(
+                extract_developer_profile(f"dev{i}"),
+                analyze_repo_context("https://github.com/acme/platform")
+            )
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(one_report(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+async def main(reports: int, concurrency: int, latency_ms: float, handshake_ms: float):
+    with StubServer(create_github_stub_app, latency_ms=latency_ms) as stub, \
+            HandshakeDelayProxy(stub.port, handshake_ms) as proxy:
+        os.environ["GITHUB_API_BASE"] = proxy.url
+        # Measure connection reuse only, not the response cache
+        os.environ["GITHUB_CACHE_BACKEND"] = "none"
+
+        # "Before": no keep-alive, every call opens a new connection
+        await github_client.init_github_client(
+            github_client.create_github_client(limits=httpx.Limits(max_keepalive_connections=0), http2=False)
+        )
+        before = await _run_reports(reports, concurrency)
+
+        # "After": one pooled client shared by every report
+        await github_client.init_github_client()
+        after = await _run_reports(reports, concurrency)
+        await github_client.close_github_client()
+
+    print(f"per-request connections: {before:8.1f} reports/sec")
+    print(f"shared pooled client:    {after:8.1f} reports/sec  ({after / before:.2f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--handshake-ms", type=float, default=60.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.reports, args.concurrency, args.latency_ms, args.handshake_ms))
@@ -0,0 +1,83 @@
+# Shows that LLM synthesis no longer serializes concurrent reports or stalls the server.
+#
+#   python -m benchmarks.bench_llm_concurrency --reports 20 --concurrency 10 --latency-ms 500
+#
+# A fake Gemini model answers after --latency-ms. "blocking" sleeps synchronously inside
+# the coroutine (the old 'model.generate_content' call); "async" awaits, like
+# 'generate_content_async'. While reports run, /health is probed through the ASGI app
+# to measure how long an unrelated request waits.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+import httpx
+
+from benchmarks.fake_gemini import FakeGeminiModel
+from src.llm import client as llm_client
+from src.main import app
+from src.models import CodebaseContextSummary, DeveloperProfileSummary
+
+DEV_PROFILE = DeveloperProfileSummary(
+    top_languages=[{"name": "Python", "score": 12}, {"name": "Go", "score": 4}],
+    contribution_style="Active Maintainer",
+    tech_focus=["api", "cli", "ml"]
+)
+REPO_CONTEXT = CodebaseContextSummary(
+    languages=[{"name": "Python", "share": "80.0%"}],
+    high_churn_files=["src/app.py", "src/models.py"],
+    complexity_hotspots=["src/app.py (12 KB, 9 entries in dir)"]
+)
+
+async def _probe_health(http: httpx.AsyncClient, stop: asyncio.Event, latencies: list):
+    # A probe is due every 50ms; latency counts from when it was due, so time spent
+    # waiting for a blocked event loop to get to it is included
+    interval = 0.05
+    while not stop.is_set():
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        await http.get("/health")
+        latencies.append((time.perf_counter() - due) * 1000)
+
+async def _run(model: FakeGeminiModel, reports: int, concurrency: int):
+    llm_client.init_llm(model)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_report():
+        async with semaphore:
+            await llm_client.generate_hiring_report(DEV_PROFILE, REPO_CONTEXT)
+
+    latencies = []
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as http:
+        probe = asyncio.create_task(_probe_health(http, stop, latencies))
+        await asyncio.sleep(0) # Let the probe start
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(one_report() for _ in range(reports)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await probe
+
+    return reports / elapsed, max(latencies), statistics.median(latencies)
+
+async def main(reports: int, concurrency: int, latency_ms: float):
+    before = await _run(FakeGeminiModel(latency_ms, blocking=True), reports, concurrency)
+    after = await _run(FakeGeminiModel(latency_ms, blocking=False), reports, concurrency)
+
+    for label, (throughput, worst, median) in (("blocking generate_content:", before), ("async generate_content:", after)):
+        print(f"{label:27} {throughput:6.2f} reports/sec   /health median {median:8.1f} ms, worst {worst:8.1f} ms")
+    print(f"throughput: {after[0] / before[0]:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.reports, args.concurrency, args.latency_ms))
@@ -0,0 +1,86 @@
+# Shows what hedging and retries do to report latency when Gemini has a long tail.
+#
+#   python -m benchmarks.bench_llm_hedging --reports 200 --stall-rate 0.05 --stall-ms 10000
+#
+# The fake Gemini model answers in about --latency-ms, except that a --stall-rate fraction
+# of calls first stalls for --stall-ms and an --error-rate fraction fails with a 503. The
+# same seeded sequence runs with LLM_HEDGE=false (retries only) and LLM_HEDGE=true
+# (adaptive threshold), for buffered and streamed reports. For streams the latency is
+# the time to the first chunk, which is what the hedge races.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import math
+import os
+import time
+from typing import Dict, List
+
+from benchmarks.bench_llm_concurrency import DEV_PROFILE, REPO_CONTEXT
+from benchmarks.fake_gemini import FakeGeminiModel
+from src.llm import client as llm_client
+from src.llm import hedging
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[max(1, math.ceil(q / 100 * len(sorted_values))) - 1]
+
+async def _one(stream: bool) -> float:
+    started = time.perf_counter()
+    if stream:
+        async for _ in llm_client.stream_hiring_report(DEV_PROFILE, REPO_CONTEXT):
+            break # First chunk; closing the generator cancels the rest
+    else:
+        await llm_client.generate_hiring_report(DEV_PROFILE, REPO_CONTEXT)
+    return (time.perf_counter() - started) * 1000
+
+async def _run(args: argparse.Namespace, stream: bool, hedge: bool) -> Dict[str, float]:
+    os.environ["LLM_HEDGE"] = "true" if hedge else "false"
+    hedging._latency_stats = None # Every run learns its threshold from scratch
+    model = FakeGeminiModel(
+        args.latency_ms, stream_chunks=args.chunks, stall_rate=args.stall_rate, stall_ms=args.stall_ms,
+        error_rate=args.error_rate, seed=args.seed
+    )
+    llm_client.init_llm(model)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one() -> float:
+        async with semaphore:
+            return await _one(stream)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies = sorted(await asyncio.gather(*(one() for _ in range(args.reports))))
+    return {
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "max": latencies[-1],
+        "extra_calls": (model.calls - args.reports) / args.reports * 100,
+    }
+
+async def main(args: argparse.Namespace):
+    os.environ.setdefault("REPORT_CACHE_BACKEND", "none")
+    print(
+        f"{args.reports} reports, {args.latency_ms:.0f} ms per call, {args.stall_rate:.0%} stall {args.stall_ms:.0f} ms, "
+        f"{args.error_rate:.0%} fail with 503"
+    )
+    for stream in (False, True):
+        for hedge in (False, True):
+            r = await _run(args, stream, hedge)
+            label = f"{'stream (first chunk)' if stream else 'buffered'}, {'hedged' if hedge else 'retries only'}:"
+            print(
+                f"{label:36} p50 {r['p50']:7.0f}  p95 {r['p95']:7.0f}  p99 {r['p99']:7.0f}  max {r['max']:7.0f} ms   "
+                f"extra calls {r['extra_calls']:5.1f}%"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--chunks", type=int, default=10, help="Stream chunks the latency is spread over")
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--stall-ms", type=float, default=10000.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+# Compares fast and deep developer profiling: latency, GitHub requests and top languages.
+#
+#   python -m benchmarks.bench_profile --repos 250 --latency-ms 80
+#
+# The stub gives each repo a secondary language next to its primary one and reports
+# commits to a large C++ repo the user does not own; fast mode (30 newest repos, primary
+# language only) cannot see either. Deep mode pages, language calls and the commit
+# query are pipelined, so its latency is a few round trips rather than one per repo.
+# A repeat deep profile reads the saved snapshot and only the events feed is new.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+from benchmarks.github_stub import StubServer, create_github_stub_app
+from src.data_extraction import github_client
+from src.data_extraction.git_extractor import extract_developer_profile
+from src.data_extraction.rate_limit import get_token_pool
+
+async def _profile(git_id: str, mode: str, **budget):
+    pool = get_token_pool()
+    before = sum(t["requests"] for t in pool.stats()["tokens"])
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        profile = await extract_developer_profile(git_id, mode, **budget)
+    elapsed = (time.perf_counter() - start) * 1000
+    requests = sum(t["requests"] for t in pool.stats()["tokens"]) - before
+    return profile, elapsed, requests
+
+async def main(repos: int, latency_ms: float, max_requests: int, time_budget: float):
+    with StubServer(create_github_stub_app, latency_ms=latency_ms, repo_count=repos) as stub:
+        os.environ["GITHUB_API_BASE"] = stub.url
+        os.environ["GITHUB_CACHE_BACKEND"] = "none"
+        os.environ.setdefault("GITHUB_TOKENS", "bench-token")
+        os.environ["PROFILE_SNAPSHOT_BACKEND"] = "memory"
+        await github_client.init_github_client()
+
+        # Each budgeted run profiles a new user, so it is a full scan rather than a snapshot refresh
+        runs = [
+            ("fast", "polyglot", {}),
+            ("deep", "polyglot", {"max_requests": max_requests, "time_budget": time_budget}),
+            ("deep (repeat)", "polyglot", {"max_requests": max_requests, "time_budget": time_budget}),
+            ("deep (20 requests)", "polyglot-2", {"max_requests": 20, "time_budget": time_budget}),
+            ("deep (0.3s)", "polyglot-3", {"max_requests": max_requests, "time_budget": 0.3}),
+        ]
+        for label, git_id, budget in runs:
+            profile, elapsed, requests = await _profile(git_id, label.split()[0], **budget)
+            langs = ", ".join(f"{lang['name']}={lang['score']}" for lang in profile.top_languages)
+            print(f"{label:<20} {elapsed:7.0f} ms  {requests:4d} requests  {langs}")
+        await github_client.close_github_client()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=250, help="Public repos of the profiled user")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Stub latency per GitHub call")
+    parser.add_argument("--max-requests", type=int, default=300)
+    parser.add_argument("--time-budget", type=float, default=8.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.repos, args.latency_ms, args.max_requests, args.time_budget))
@@ -0,0 +1,90 @@
+# Times the vectorized skill-similarity engine on candidates x repos matrices.
+#
+#   python -m benchmarks.bench_scoring --candidates 5000 --repos 50
+#
+# Vectorizing (building the NumPy arrays from Pydantic models) and scoring (the matrix
+# products + per-repo top-k) are reported separately; scoring is what repeats when the
+# same vectors are matched against new repos. A pair-by-pair loop over the same vectors
+# is timed on a sample as the baseline.
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from src.models import CodebaseContextSummary, DeveloperProfileSummary
+from src.scoring.similarity import (
+    LANGUAGE_VOCAB, rank_matrix, scoring_weights, similarity_matrix, vectorize_developers, vectorize_repos
+)
+
+TOPICS = ["api", "cli", "ml", "web", "infra", "database", "kubernetes", "graphql", "react", "compiler", "security", "data"]
+
+def _profiles(count: int, rng: random.Random):
+    return [
+        DeveloperProfileSummary(
+            top_languages=[{"name": name, "score": rng.randint(1, 50)} for name in rng.sample(LANGUAGE_VOCAB[:20], 3)],
+            contribution_style="",
+            tech_focus=rng.sample(TOPICS, 5)
+        )
+        for _ in range(count)
+    ]
+
+def _repos(count: int, rng: random.Random):
+    contexts = []
+    for _ in range(count):
+        names = rng.sample(LANGUAGE_VOCAB[:20], 4)
+        shares = sorted((rng.random() for _ in names), reverse=True)
+        contexts.append(CodebaseContextSummary(
+            languages=[{"name": n, "share": f"{100 * s / sum(shares):.1f}%"} for n, s in zip(names, shares)],
+            high_churn_files=[f"src/{rng.choice(TOPICS)}/module_{i}.py" for i in range(10)],
+            complexity_hotspots=[f"src/{rng.choice(TOPICS)}/core.py (12 KB, 9 entries in dir)"]
+        ))
+    return contexts
+
+def _pairwise(developers, repos, rows: int) -> np.ndarray:
+    weights = scoring_weights()
+    total = sum(weights.values())
+    out = np.zeros((rows, repos.languages.shape[0]))
+    for i in range(rows):
+        for j in range(repos.languages.shape[0]):
+            language = sum(float(a) * float(b) for a, b in zip(developers.languages[i], repos.languages[j]))
+            topic = sum(float(a) * float(b) for a, b in zip(developers.topics[i], repos.topics[j]))
+            out[i, j] = round(100 * (weights["language"] * language + weights["topic"] * topic) / total, 1)
+    return out
+
+def main(candidates: int, repos: int, top_k: int, sample: int):
+    rng = random.Random(7)
+    profiles, contexts = _profiles(candidates, rng), _repos(repos, rng)
+
+    start = time.perf_counter()
+    developers, targets = vectorize_developers(profiles), vectorize_repos(contexts)
+    vectorize_ms = (time.perf_counter() - start) * 1000
+
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        scores = similarity_matrix(developers, targets)
+        top = rank_matrix(scores, top_k)
+    score_ms = (time.perf_counter() - start) * 1000 / runs
+
+    sample = min(sample, candidates)
+    start = time.perf_counter()
+    baseline = _pairwise(developers, targets, sample)
+    loop_ms = (time.perf_counter() - start) * 1000 * candidates / sample
+    assert np.allclose(baseline, scores[:sample], atol=0.11), "vectorized and pairwise scores disagree"
+
+    print(f"{candidates} candidates x {repos} repos = {candidates * repos:,} pairs")
+    print(f"vectorize (models -> arrays):   {vectorize_ms:9.1f} ms")
+    print(f"score + top-{top_k} (vectorized):   {score_ms:9.2f} ms")
+    print(f"pair-by-pair loop (estimated):  {loop_ms:9.0f} ms  ({loop_ms / score_ms:,.0f}x slower)")
+    print(f"best for repo 0: candidates {top[0][:5]} scores {[float(scores[i, 0]) for i in top[0][:5]]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=5000)
+    parser.add_argument("--repos", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=20, help="Candidates timed with the pairwise loop")
+    args = parser.parse_args()
+    main(args.candidates, args.repos, args.top_k, args.sample)
@@ -0,0 +1,162 @@
+# Measures cold start: how long `import src.main` takes and what it loads, and how long a
+# fresh uvicorn worker needs before /health and /ready answer 200.
+#
+#   python -m benchmarks.bench_startup --runs 5
+#   python -m benchmarks.bench_startup --runs 5 --output after.json --compare before.json
+#
+# Each run is a new interpreter, as when a worker is spawned or an instance autoscales.
+# Both warm-up modes are started: "background" (the default; heavy SDKs load after the
+# server accepts connections) and "blocking" (STARTUP_WARMUP=blocking; the lifespan
+# waits for them, like the old eager startup). The Gemini SDK is configured with a
+# dummy key and Firestore points at an emulator address; neither makes network calls
+# while starting, so the real import and initialization cost is what gets measured.
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from benchmarks.bench_e2e import _change, _git_commit, _memory_mb
+
+# SDKs that src.main should no longer pull in at import time
+HEAVY_MODULES = ("google.generativeai", "firebase_admin", "google.cloud.firestore", "grpc", "git")
+
+APP_ENV = {
+    "GOOGLE_API_KEY": "bench-dummy-key",
+    "PERSISTENCE_BACKEND": "firestore",
+    "FIRESTORE_EMULATOR_HOST": "127.0.0.1:8681",
+    "GITHUB_TOKENS": "bench-token-1",
+    "GITHUB_CACHE_BACKEND": "memory",
+    "PROFILE_SNAPSHOT_BACKEND": "memory",
+    "REPO_INDEX_BACKEND": "memory",
+    "REPORT_CACHE_BACKEND": "none",
+    "REPO_INDEX_PREWARM": "",
+}
+
+IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import src.main
+elapsed = time.perf_counter() - started
+with open("/proc/self/status") as f:
+    rss = next((round(int(line.split()[1]) / 1024, 1) for line in f if line.startswith("VmRSS:")), None)
+print(json.dumps({{
+    "import_seconds": elapsed,
+    "rss_mb": rss,
+    "heavy_modules": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+def _env(**extra: str) -> Dict[str, str]:
+    return {**os.environ, **APP_ENV, **extra}
+
+def measure_import() -> Dict[str, Any]:
+    """'import src.main' in a fresh interpreter: seconds, RSS afterwards and heavy modules loaded."""
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], env=_env(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_until_ok(http: httpx.Client, path: str, started: float, timeout: float) -> Optional[float]:
+    """Seconds from 'started' until GET 'path' first returns 200 (polled every 5 ms), or None."""
+    while time.perf_counter() - started < timeout:
+        try:
+            if http.get(path).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    return None
+
+def measure_server(warmup: str, timeout: float = 60.0) -> Dict[str, Any]:
+    """Spawns a uvicorn worker and times /health and /ready from process start."""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        env=_env(STARTUP_WARMUP=warmup), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as http:
+            health = _wait_until_ok(http, "/health", started, timeout)
+            ready = _wait_until_ok(http, "/ready", started, timeout)
+        return {"health_seconds": health, "ready_seconds": ready, **_memory_mb(process.pid)}
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def _median(runs: List[Dict[str, Any]], key: str) -> Optional[float]:
+    values = [run[key] for run in runs if run.get(key) is not None]
+    return round(statistics.median(values), 3) if values else None
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]):
+    print(f"comparing {before.get('commit')} -> {after.get('commit')}", file=sys.stderr)
+    for section, keys in (("import", ("import_seconds", "rss_mb")), *((mode, ("health_seconds", "ready_seconds", "rss_mb")) for mode in after["servers"])):
+        old = before["import"] if section == "import" else before.get("servers", {}).get(section)
+        new = after["import"] if section == "import" else after["servers"][section]
+        if not old:
+            continue
+        deltas = [f"{key} {_change(old[key], new[key])}" for key in keys if old.get(key) and new.get(key)]
+        print(f"  {section:<10} " + "  ".join(deltas), file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement (medians are reported)")
+    parser.add_argument("--modes", default="background,blocking", help="STARTUP_WARMUP values to start the server with")
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    results: Dict[str, Any] = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import": {
+            "import_seconds": _median(imports, "import_seconds"),
+            "rss_mb": _median(imports, "rss_mb"),
+            "heavy_modules": imports[-1]["heavy_modules"],
+        },
+        "servers": {},
+    }
+    print(
+        f"  import     {results['import']['import_seconds'] * 1000:7.1f} ms  rss {results['import']['rss_mb']} MB  "
+        f"heavy modules loaded: {', '.join(results['import']['heavy_modules']) or 'none'}",
+        file=sys.stderr
+    )
+    for mode in args.modes.split(","):
+        runs = [measure_server(mode.strip()) for _ in range(args.runs)]
+        server = {key: _median(runs, key) for key in ("health_seconds", "ready_seconds", "rss_mb", "peak_rss_mb")}
+        results["servers"][mode.strip()] = server
+        print(
+            f"  {mode.strip():<10} /health {server['health_seconds']} s  /ready {server['ready_seconds']} s  "
+            f"rss {server['rss_mb']} MB",
+            file=sys.stderr
+        )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+import random
+import time
+from typing import AsyncIterator
+
+class FakeGeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeGeminiError(Exception):
+    """Transient API error; 'code' is the HTTP status, as on google.api_core exceptions."""
+
+    def __init__(self, code: int = 503):
+        super().__init__(f"{code} Service Unavailable (injected)")
+        self.code = code
+
+class FakeGeminiStream:
+    """Async-iterable of FakeGeminiResponse chunks, like AsyncGenerateContentResponse."""
+
+    def __init__(self, chunks, chunk_delay: float):
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+
+    async def __aiter__(self) -> AsyncIterator[FakeGeminiResponse]:
+        for chunk in self.chunks:
+            await asyncio.sleep(self.chunk_delay)
+            yield FakeGeminiResponse(chunk)
+
+class FakeGeminiModel:
+    """
+    Stand-in for genai.GenerativeModel that answers after 'latency_ms'.
+    blocking=True sleeps synchronously inside the coroutine, which is what calling the
+    sync 'generate_content' from async code did to the event loop.
+    With stream=True the latency is spread evenly over 'stream_chunks' chunks.
+    'report_chars' pads the report to a realistic length.
+
+    Tail latency and failures can be injected: a 'stall_rate' fraction of calls first
+    waits 'stall_ms' (before the first chunk when streaming), and an 'error_rate'
+    fraction fails with a FakeGeminiError(503). 'seed' makes the draws repeatable.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 2000.0,
+        blocking: bool = False,
+        stream_chunks: int = 20,
+        report_chars: int = 0,
+        stall_rate: float = 0.0,
+        stall_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        model_name: str = "models/fake-gemini"
+    ):
+        self.latency_ms = latency_ms
+        self.blocking = blocking
+        self.stream_chunks = stream_chunks
+        self.report_chars = report_chars
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.model_name = model_name
+        self.calls = 0
+        self.stalls = 0
+        self.errors = 0
+
+    def _report(self, contents) -> str:
+        text = f"## Core Fit Assessment\nStrong ({len(str(contents))} prompt chars)"
+        if self.report_chars > len(text):
+            text += "\n" + "lorem ipsum " * ((self.report_chars - len(text)) // 12)
+        return text
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        if self.random.random() < self.error_rate:
+            self.errors += 1
+            await asyncio.sleep(self.latency_ms / 1000 / max(1, self.stream_chunks))
+            raise FakeGeminiError()
+        if self.random.random() < self.stall_rate:
+            self.stalls += 1
+            await asyncio.sleep(self.stall_ms / 1000)
+        if stream:
+            text = self._report(contents)
+            size = max(1, len(text) // self.stream_chunks)
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            return FakeGeminiStream(chunks, self.latency_ms / 1000 / len(chunks))
+        if self.blocking:
+            time.sleep(self.latency_ms / 1000)
+        else:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return FakeGeminiResponse(self._report(contents))
@@ -0,0 +1,306 @@
+import asyncio
+import hashlib
+import multiprocessing
+import socket
+import time
+from typing import Callable, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+def _stub_tree(files_per_dir: int, fanout: int, levels: int, prefix: str = ""):
+    """Yields git/trees entries for a synthetic tree: 'fanout' subdirectories per level."""
+    depth = prefix.count("/")
+    for i in range(files_per_dir):
+        yield {"path": f"{prefix}file_{i}.py", "type": "blob", "sha": f"{i:040x}", "size": 200 * (i + 1) * (depth + 1)}
+    if depth < levels:
+        for d in range(fanout):
+            path = f"{prefix}pkg_{d}"
+            yield {"path": path, "type": "tree", "sha": f"tree:{path}"}
+            yield from _stub_tree(files_per_dir, fanout, levels, path + "/")
+
+def _stub_history(new_commits: int = 0, base_commits: int = 250):
+    """Default-branch history, newest first: 'new_commits' pushed on top of a fixed base."""
+    def node(i: int, oid: str, committed: str, files):
+        return {"oid": oid, "committedDate": committed, "associatedPullRequests": {"nodes": [{
+            "number": i, "files": {"nodes": files},
+        }]}}
+
+    pushed = [
+        node(base_commits + j, f"{base_commits + j:040x}", f"2026-02-{1 + j % 28:02d}T12:00:00Z", [
+            {"path": "src/feature_new.py", "additions": 40, "deletions": 2},
+            {"path": f"src/module_{j % 7}.py", "additions": 5, "deletions": 1},
+        ])
+        for j in reversed(range(new_commits))
+    ]
+    return pushed + [
+        node(i, f"{i:040x}", f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}T12:00:00Z", [
+            {"path": f"src/module_{i % 7}.py", "additions": 10 * (i % 5), "deletions": i % 3},
+            {"path": "README.md", "additions": 1, "deletions": 0},
+        ])
+        for i in range(base_commits)
+    ]
+
+def create_github_stub_app(
+    latency_ms: float = 0.0,
+    repo_count: int = 30,
+    tree_fanout: int = 4,
+    tree_levels: int = 3,
+    tree_truncate_at: int = 100000,
+    rate_limit: int = 5000,
+    repo_padding_bytes: int = 0
+) -> FastAPI:
+    """
+    Minimal stand-in for the GitHub REST endpoints used by the extractors.
+    'latency_ms' is added to every response to mimic network/API time.
+    Payload sizes follow 'repo_count' and the tree shape; 'repo_padding_bytes' adds a
+    description of that length to every repo, like the extra fields real listings carry.
+    Recursive tree listings longer than 'tree_truncate_at' entries come back truncated, like GitHub's.
+    Each token gets its own 'rate_limit' requests per window (REST and GraphQL counted separately).
+    Tests can change app.state between calls: 'repo_count', 'pushed' ({repo index: pushed_at}),
+    'events' (the public events feed, newest first) and 'new_commits' (commits pushed on top of
+    every repo's default-branch history, which moves its HEAD).
+    """
+    app = FastAPI()
+    app.state.repo_count = repo_count
+    app.state.pushed = {}
+    app.state.events = []
+    app.state.new_commits = 0
+    windows = {} # (Authorization header, resource) -> remaining requests
+    reset = int(time.time()) + 3600
+
+    @app.middleware("http")
+    async def etag_middleware(request: Request, call_next):
+        # Mirror GitHub's conditional requests: ETag on every 200, 304 when it matches.
+        # Every non-304 response counts against the token's rate-limit window; once it is
+        # spent, requests get GitHub's 403 until the window resets.
+        resource = "graphql" if request.url.path == "/graphql" else "core"
+        window = (request.headers.get("authorization", ""), resource)
+        remaining = windows.setdefault(window, rate_limit)
+        limit_headers = {
+            "X-RateLimit-Limit": str(rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset),
+            "X-RateLimit-Resource": resource,
+        }
+        if remaining == 0:
+            return Response(
+                content=b'{"message": "API rate limit exceeded"}', status_code=403,
+                headers=limit_headers, media_type="application/json"
+            )
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        windows[window] = remaining - 1
+        headers = dict(response.headers)
+        headers.update({**limit_headers, "ETag": etag, "X-RateLimit-Remaining": str(remaining - 1)})
+        return Response(content=body, status_code=200, headers=headers)
+
+    async def _delay():
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    @app.get("/users/{git_id}")
+    async def user(git_id: str):
+        await _delay()
+        return {"login": git_id, "public_repos": app.state.repo_count, "hireable": True}
+
+    @app.get("/users/{git_id}/repos")
+    async def user_repos(git_id: str, per_page: int = 30, page: int = 1):
+        await _delay()
+        # Each user leans towards a different language, so candidates score differently
+        langs = ["Python", "Go", "TypeScript", "Rust"]
+        offset = sum(map(ord, git_id))
+        repos = [
+            {
+                "name": f"repo-{i}",
+                "full_name": f"{git_id}/repo-{i}",
+                "fork": i % 10 == 9,
+                "language": langs[(offset + i * i) % len(langs)],
+                "size": 100 * (i + 1),
+                "topics": ["api", "cli"] if i % 2 else ["ml"],
+                "stargazers_count": i,
+                "pushed_at": app.state.pushed.get(i, f"2026-01-{28 - i % 28:02d}T{23 - i // 28 % 24:02d}:00:00Z"),
+                "description": "x" * repo_padding_bytes,
+            }
+            for i in range(app.state.repo_count)
+        ]
+        repos.sort(key=lambda repo: repo["pushed_at"], reverse=True) # Like sort=pushed
+        return repos[(page - 1) * per_page:page * per_page]
+
+    @app.get("/users/{git_id}/events/public")
+    async def user_events(git_id: str, per_page: int = 30):
+        await _delay()
+        return app.state.events[:per_page]
+
+    @app.get("/repos/{owner}/{repo}/languages")
+    async def languages(owner: str, repo: str):
+        await _delay()
+        if repo.startswith("repo-"):
+            # Candidate repos: mostly the primary language, with a secondary stack alongside
+            langs = ["Python", "Go", "TypeScript", "Rust"]
+            i = int(repo[len("repo-"):])
+            primary = langs[(sum(map(ord, owner)) + i * i) % len(langs)]
+            return {primary: 60000 + 1000 * i, "Shell": 8000, langs[(i + 1) % len(langs)]: 30000}
+        return {"Python": 80000, "Shell": 15000, "Dockerfile": 5000}
+
+    @app.post("/graphql")
+    async def graphql(request: Request):
+        # Modelled queries: a user's commit contributions, and the churn history (pages of
+        # commits, each tied to a PR)
+        await _delay()
+        body = await request.json()
+        if "contributionsCollection" in body.get("query", ""):
+            login = body.get("variables", {}).get("login", "")
+            by_repo = [
+                {"contributions": {"totalCount": 5 * i}, "repository": {
+                    "nameWithOwner": f"{login}/repo-{i}", "isFork": False, "languages": {"edges": []},
+                }}
+                for i in range(min(repo_count, 20))
+            ] + [{"contributions": {"totalCount": 40}, "repository": {
+                "nameWithOwner": "upstream/compiler", "isFork": False,
+                "languages": {"edges": [{"size": 900000, "node": {"name": "C++"}}, {"size": 100000, "node": {"name": "CMake"}}]},
+            }}]
+            return {"data": {"user": {"contributionsCollection": {
+                "totalCommitContributions": sum(r["contributions"]["totalCount"] for r in by_repo),
+                "commitContributionsByRepository": by_repo,
+            }}}}
+        variables = body.get("variables", {})
+        offset = int(variables.get("after") or 0)
+        first = variables.get("first", 100)
+        history = _stub_history(app.state.new_commits)
+        nodes = history[offset:offset + first]
+        end = offset + len(nodes)
+        return {"data": {
+            "rateLimit": {"cost": 1, "remaining": 4999},
+            "repository": {"defaultBranchRef": {"target": {
+                "oid": history[0]["oid"],
+                "history": {"pageInfo": {"hasNextPage": end < len(history), "endCursor": str(end)}, "nodes": nodes},
+            }}},
+        }}
+
+    @app.get("/repos/{owner}/{repo}/commits/{ref}")
+    async def commit(owner: str, repo: str, ref: str, request: Request):
+        await _delay()
+        sha = _stub_history(app.state.new_commits)[0]["oid"] if ref == "HEAD" else ref
+        if request.headers.get("accept") == "application/vnd.github.sha":
+            return Response(content=sha, media_type="text/plain")
+        return {"sha": sha}
+
+    @app.get("/repos/{owner}/{repo}/git/trees/{sha:path}")
+    async def git_tree(owner: str, repo: str, sha: str, recursive: int = 0):
+        await _delay()
+        prefix = sha[len("tree:"):] + "/" if sha.startswith("tree:") else ""
+        entries = []
+        for entry in _stub_tree(5, tree_fanout, tree_levels, prefix):
+            relative = entry["path"][len(prefix):]
+            if not recursive and "/" in relative:
+                continue
+            entries.append({**entry, "path": relative})
+        truncated = len(entries) > tree_truncate_at
+        return {"sha": sha, "url": "", "tree": entries[:tree_truncate_at], "truncated": truncated}
+
+    @app.get("/repos/{owner}/{repo}/commits")
+    async def commits(owner: str, repo: str, per_page: int = 30):
+        await _delay()
+        return [{"sha": f"{i:040x}"} for i in range(per_page)]
+
+    return app
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Stub on port {port} did not start")
+
+class _BackgroundProcess:
+    """
+    Runs a server in a child process so it does not compete with the
+    benchmarked client for the GIL.
+    """
+
+    def __init__(self):
+        self.port = _free_port()
+        self.process: Optional[multiprocessing.Process] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _target(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        self.process = multiprocessing.Process(target=self._target, daemon=True)
+        self.process.start()
+        _wait_for_port(self.port)
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.join(timeout=5)
+
+class StubServer(_BackgroundProcess):
+    """
+    Serves an app built by 'app_factory(**kwargs)' with uvicorn on a free localhost port.
+    """
+
+    def __init__(self, app_factory: Callable[..., FastAPI], **kwargs):
+        super().__init__()
+        self.app_factory = app_factory
+        self.kwargs = kwargs
+
+    def _target(self):
+        uvicorn.run(self.app_factory(**self.kwargs), host="127.0.0.1", port=self.port, log_level="warning")
+
+class HandshakeDelayProxy(_BackgroundProcess):
+    """
+    TCP proxy that holds every *new* connection for 'handshake_ms' before relaying it.
+    On localhost connection setup is free; this stands in for the TCP + TLS round trips
+    a fresh connection to api.github.com costs, which is what connection reuse saves.
+    """
+
+    def __init__(self, target_port: int, handshake_ms: float):
+        super().__init__()
+        self.target_port = target_port
+        self.handshake_ms = handshake_ms
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader, client_writer):
+        await asyncio.sleep(self.handshake_ms / 1000)
+        upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.target_port)
+        await asyncio.gather(
+            self._pipe(client_reader, upstream_writer),
+            self._pipe(upstream_reader, client_writer)
+        )
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, "127.0.0.1", self.port)
+        async with server:
+            await server.serve_forever()
+
+    def _target(self):
+        asyncio.run(self._serve())
@@ -0,0 +1,29 @@
+import json
+from typing import Any, Optional
+
+# Cache values (report dicts, repo index entries, profile snapshots, dumped Pydantic
+# summaries) are packed with msgpack when it is installed: smaller than JSON and faster
+# to decode. 0xC1 is the one byte msgpack never uses, so it marks msgpack payloads
+# unambiguously, and values written as plain JSON (before, or without msgpack) still load.
+MSGPACK_TAG = b"\xc1"
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+def dumps(value: Any) -> bytes:
+    if msgpack is not None:
+        return MSGPACK_TAG + msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+def loads(data: bytes) -> Optional[Any]:
+    """The stored value, or None when it cannot be decoded here (msgpack payload, msgpack missing)."""
+    if data[:1] == MSGPACK_TAG:
+        if msgpack is None:
+            return None
+        return msgpack.unpackb(data[1:], raw=False)
+    return json.loads(data)
+
+def serializer_name() -> str:
+    return "msgpack" if msgpack is not None else "json"
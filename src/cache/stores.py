@@ -0,0 +1,444 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Union
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CacheEntry:
+    value: bytes
+    meta: Dict[str, Any] = field(default_factory=dict)
+    stored_at: float = field(default_factory=time.time)
+    cached_at: float = field(default_factory=time.time) # When this copy was made (TieredCache local tier)
+
+class MemoryCache:
+    """
+    In-process LRU cache bounded by entry count and total value size.
+    Entries older than 'ttl' seconds (if set) are dropped on access.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and time.time() - entry.stored_at > self.ttl:
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: bytes, meta: Optional[Dict[str, Any]] = None, stored_at: Optional[float] = None):
+        self.delete(key)
+        if len(value) > self.max_bytes:
+            return # Never let a single huge body flush the whole cache
+        self._entries[key] = CacheEntry(value=value, meta=meta or {}, stored_at=stored_at or time.time())
+        self._bytes += len(value)
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.value)
+            self.evictions += 1
+
+    def touch(self, key: str):
+        """Marks an entry as freshly validated without rewriting its value."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.stored_at = time.time()
+            self._entries.move_to_end(key)
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.value)
+
+    # Async counterparts (see SqliteCache), so callers on the event loop can treat every store alike
+
+    async def aget(self, key: str) -> Optional[CacheEntry]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: bytes, meta: Optional[Dict[str, Any]] = None):
+        self.set(key, value, meta)
+
+    async def atouch(self, key: str):
+        self.touch(key)
+
+    async def adelete(self, key: str):
+        self.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "entries": len(self._entries), "bytes": self._bytes, "evictions": self.evictions}
+
+class SqliteCache:
+    """
+    On-disk LRU cache in a SQLite file (WAL mode), so entries survive restarts and
+    are shared by every worker process on the host. Entries are namespaced so
+    several caches can live in one file. Each namespace is bounded by entry count
+    and total value size, like MemoryCache.
+
+    Statements wait up to 5 s for another process's write lock, so code on the event
+    loop uses the async methods (aget, aset, ...), which run them on this store's own
+    thread instead.
+    """
+
+    # Eviction scans the table, so it only runs every N writes
+    EVICT_EVERY = 64
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str = "default",
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = None
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self._writes = 0
+        self._bytes_written = 0 # Since the last eviction pass
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cache-{namespace}")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, meta TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache_entries)")}
+        if "size" not in columns:
+            # Files written before entries were sized
+            self._conn.execute("ALTER TABLE cache_entries ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE cache_entries SET size = LENGTH(value)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_leases ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, owner TEXT NOT NULL, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, meta, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, meta, stored_at = row
+            now = time.time()
+            if self.ttl is not None and now - stored_at > self.ttl:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+                )
+                return None
+
+            self._conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key)
+            )
+            return CacheEntry(value=value, meta=json.loads(meta), stored_at=stored_at)
+
+    def set(self, key: str, value: bytes, meta: Optional[Dict[str, Any]] = None):
+        if len(value) > self.max_bytes:
+            return # Never let a single huge body flush the whole cache
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, meta, stored_at, accessed_at, size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, value, json.dumps(meta or {}), now, now, len(value))
+            )
+            self._writes += 1
+            self._bytes_written += len(value)
+            # Large values trigger a pass sooner, so the file cannot outgrow max_bytes by much
+            if self._writes % self.EVICT_EVERY == 0 or self._bytes_written > self.max_bytes // 16:
+                self._evict()
+
+    def touch(self, key: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE cache_entries SET stored_at = ?, accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, now, self.namespace, key)
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+            )
+
+    def acquire_lease(self, key: str, owner: str, seconds: float) -> bool:
+        """
+        Claims 'key' for 'owner' for 'seconds', across every process using this file.
+        False while someone else holds an unexpired lease. A crashed owner's lease just expires.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM cache_leases WHERE namespace = ? AND key = ? AND expires_at < ?",
+                    (self.namespace, key, now)
+                )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO cache_leases (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, owner, now + seconds)
+                )
+                row = self._conn.execute(
+                    "SELECT owner FROM cache_leases WHERE namespace = ? AND key = ?", (self.namespace, key)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row is not None and row[0] == owner
+
+    def release_lease(self, key: str, owner: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_leases WHERE namespace = ? AND key = ? AND owner = ?", (self.namespace, key, owner)
+            )
+
+    async def _off_loop(self, method: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(method, *args))
+
+    async def aget(self, key: str) -> Optional[CacheEntry]:
+        return await self._off_loop(self.get, key)
+
+    async def aset(self, key: str, value: bytes, meta: Optional[Dict[str, Any]] = None):
+        await self._off_loop(self.set, key, value, meta)
+
+    async def atouch(self, key: str):
+        await self._off_loop(self.touch, key)
+
+    async def adelete(self, key: str):
+        await self._off_loop(self.delete, key)
+
+    async def aacquire_lease(self, key: str, owner: str, seconds: float) -> bool:
+        return await self._off_loop(self.acquire_lease, key, owner, seconds)
+
+    async def arelease_lease(self, key: str, owner: str):
+        await self._off_loop(self.release_lease, key, owner)
+
+    def _evict(self):
+        # Keep the most recently accessed entries while they fit in both 'max_entries' and 'max_bytes'
+        cursor = self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            " SELECT key FROM ("
+            "  SELECT key,"
+            "   ROW_NUMBER() OVER recent AS position,"
+            "   SUM(size) OVER (recent ROWS UNBOUNDED PRECEDING) AS total"
+            "  FROM cache_entries WHERE namespace = ?"
+            "  WINDOW recent AS (ORDER BY accessed_at DESC, key)"
+            " ) WHERE position > ? OR total > ?)",
+            (self.namespace, self.namespace, self.max_entries, self.max_bytes)
+        )
+        self.evictions += cursor.rowcount
+        self._bytes_written = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+        return {"backend": "sqlite", "entries": entries, "bytes": size, "evictions": self.evictions}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    An in-process LRU (MemoryCache) in front of a SqliteCache shared by every worker on
+    the host. Reads try the local tier first and copy shared hits into it; writes go to
+    both. Local copies are trusted for 'local_ttl' seconds, which bounds how long this
+    worker can miss another worker's update of the same key.
+    """
+
+    def __init__(self, local: MemoryCache, shared: SqliteCache, local_ttl: float = 30.0):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+        self.local_hits = 0
+        self.shared_hits = 0
+
+    def _local_get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.local.get(key)
+        if entry is not None and time.time() - entry.cached_at <= self.local_ttl:
+            self.local_hits += 1
+            return entry
+        return None
+
+    def _from_shared(self, key: str, entry: Optional[CacheEntry]) -> Optional[CacheEntry]:
+        if entry is None:
+            self.local.delete(key)
+            return None
+        self.shared_hits += 1
+        self.local.set(key, entry.value, entry.meta, stored_at=entry.stored_at)
+        return entry
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        return self._local_get(key) or self._from_shared(key, self.shared.get(key))
+
+    def set(self, key: str, value: bytes, meta: Optional[Dict[str, Any]] = None):
+        self.shared.set(key, value, meta)
+        self.local.set(key, value, meta)
+
+    def touch(self, key: str):
+        self.shared.touch(key)
+        self.local.touch(key)
+
+    def delete(self, key: str):
+        self.shared.delete(key)
+        self.local.delete(key)
+
+    # The local tier is served on the event loop; only the shared tier goes to its thread
+
+    async def aget(self, key: str) -> Optional[CacheEntry]:
+        return self._local_get(key) or self._from_shared(key, await self.shared.aget(key))
+
+    async def aset(self, key: str, value: bytes, meta: Optional[Dict[str, Any]] = None):
+        self.local.set(key, value, meta)
+        await self.shared.aset(key, value, meta)
+
+    async def atouch(self, key: str):
+        self.local.touch(key)
+        await self.shared.atouch(key)
+
+    async def adelete(self, key: str):
+        self.local.delete(key)
+        await self.shared.adelete(key)
+
+    async def aacquire_lease(self, key: str, owner: str, seconds: float) -> bool:
+        return await self.shared.aacquire_lease(key, owner, seconds)
+
+    async def arelease_lease(self, key: str, owner: str):
+        await self.shared.arelease_lease(key, owner)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "tiered",
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "local": self.local.stats(),
+            "shared": self.shared.stats(),
+        }
+
+CacheStore = Union[MemoryCache, SqliteCache, TieredCache]
+
+def create_store(
+    backend: str,
+    namespace: str,
+    path: str,
+    max_entries: int,
+    max_bytes: int = 64 * 1024 * 1024,
+    ttl: Optional[float] = None
+) -> Optional[CacheStore]:
+    """
+    The store behind one cache: 'memory' (per process), 'sqlite' (shared by the host's
+    workers, survives restarts), 'tiered' (sqlite with a per-process LRU in front; sized
+    by CACHE_LOCAL_MAX_ENTRIES and refreshed after CACHE_LOCAL_TTL_SECONDS) or 'none'.
+    """
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+    shared = SqliteCache(path, namespace=namespace, max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+    if backend == "sqlite":
+        return shared
+    local = MemoryCache(
+        max_entries=min(max_entries, int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", 256))), max_bytes=max_bytes, ttl=ttl
+    )
+    return TieredCache(local, shared, local_ttl=float(os.getenv("CACHE_LOCAL_TTL_SECONDS", 30)))
+
+# Identifies this process's leases
+_lease_owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+@asynccontextmanager
+async def fill_lease(
+    store: CacheStore,
+    key: str,
+    seconds: Optional[float] = None,
+    ready: Optional[Callable[[CacheEntry], bool]] = None
+) -> AsyncIterator[Optional[CacheEntry]]:
+    """
+    Stampede protection for a miss on a store shared by several workers. The first
+    worker to miss 'key' takes a lease and gets None: it computes the value, stores it
+    and the lease is released when the block exits. Workers that miss meanwhile wait
+    for the value to land and get its entry instead, so the work is done once per host.
+    If the lease expires (CACHE_LEASE_SECONDS; the owner crashed or gave up), the next
+    waiter takes over. 'ready' decides whether a stored entry is the awaited one (for
+    keys whose old value stays readable while it is recomputed).
+
+    Per-process stores have no lease: in-process callers are already coalesced (see
+    src/orchestration/singleflight.py), so this yields None at once.
+    """
+    if not isinstance(store, (SqliteCache, TieredCache)):
+        yield None
+        return
+
+    seconds = seconds or float(os.getenv("CACHE_LEASE_SECONDS", 90))
+    poll = float(os.getenv("CACHE_LEASE_POLL_MS", 100)) / 1000
+    owner = f"{_lease_owner}-{uuid.uuid4().hex[:8]}"
+
+    async def filled() -> Optional[CacheEntry]:
+        # Read past a tiered store's local copy, which may be the stale value being replaced
+        entry = await (store.shared.aget(key) if isinstance(store, TieredCache) else store.aget(key))
+        if entry is None or (ready is not None and not ready(entry)):
+            return None
+        if isinstance(store, TieredCache):
+            store.local.set(key, entry.value, entry.meta, stored_at=entry.stored_at)
+        return entry
+
+    waited = False
+    while not await store.aacquire_lease(key, owner, seconds):
+        waited = True
+        await asyncio.sleep(poll)
+        entry = await filled()
+        if entry is not None:
+            logger.debug("Waited for another worker to fill %s.", key[:40])
+            yield entry
+            return
+    try:
+        # The previous owner may have stored the value just before releasing its lease
+        yield await filled() if waited else None
+    finally:
+        # Shielded: a cancelled filler must still free the lease for the waiters
+        await asyncio.shield(store.arelease_lease(key, owner))
@@ -0,0 +1,244 @@
+# Generates reports for many (git_id, repo_url) pairs from the command line, without the HTTP API.
+#
+#   python -m src.cli.bulk --input pairs.jsonl --output results.jsonl
+#   python -m src.cli.bulk --input pairs.jsonl --output results.jsonl --stage-concurrency extraction=16,synthesis=8
+#
+# Input is JSONL, one pair per line: {"git_id": "octocat", "repo_url": "https://github.com/acme/platform"}
+# ("user_id" and "profile_mode" are optional per line). Output is JSONL, one result per
+# line in completion order, each with the input 'line' it answers.
+#
+# Pairs run through the same pipeline as POST /api/generate-report. Extraction,
+# synthesis and persistence each have their own concurrency limit, so while some pairs
+# wait on Gemini the next ones are already being extracted. Only a bounded window of
+# pairs is in flight; input is read and results are written as the pipeline advances.
+#
+# The output file is the checkpoint: a report is saved before its result line is
+# written, and re-running the same command skips the lines already answered
+# (--retry-failed also redoes the failed ones). Progress, throughput and ETA go to stderr.
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Iterator, Optional, TextIO, Tuple
+
+from dotenv import load_dotenv
+
+from src.data_extraction.github_client import init_github_client, close_github_client
+from src.llm.client import init_llm
+from src.orchestration.jobs import DEFAULT_STAGE_CONCURRENCY, parse_stage_concurrency
+from src.orchestration.manager import orchestrate_report_generation
+
+def load_completed(path: str, retry_failed: bool) -> Dict[int, Tuple[str, str]]:
+    """
+    Input lines already answered in an earlier run's output: line -> (git_id, repo_url).
+    A result line cut short by a crash is ignored (and its pair redone).
+    """
+    completed: Dict[int, Tuple[str, str]] = {}
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            try:
+                result = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(result, dict) or "line" not in result:
+                continue
+            if result.get("success") or not retry_failed:
+                completed[result["line"]] = (result.get("git_id"), result.get("repo_url"))
+            else:
+                completed.pop(result["line"], None)
+    return completed
+
+def count_pairs(path: str) -> int:
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+def read_pairs(stream: TextIO) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yields (line number, pair, error) one line at a time; malformed lines come with an error."""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            pair = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(pair, dict) or not pair.get("git_id") or not pair.get("repo_url"):
+            yield line_number, None, "Expected an object with git_id and repo_url"
+            continue
+        yield line_number, pair, None
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}h{rest // 60:02d}m" if hours else f"{rest // 60}m{rest % 60:02d}s"
+
+class Progress:
+    """Counts results and prints done/total, throughput (last minute) and ETA to stderr."""
+
+    RATE_WINDOW = 60.0
+
+    def __init__(self, total: Optional[int], skipped: int, limits: Dict[str, int], log: TextIO):
+        self.total = total
+        self.skipped = skipped
+        self.limits = limits
+        self.active = {stage: 0 for stage in limits}
+        self.succeeded = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.recent: deque = deque() # Completion times within the last RATE_WINDOW seconds
+        self.log = log
+
+    def record(self, success: bool):
+        if success:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self.recent.append(time.monotonic())
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        while self.recent and self.recent[0] < now - self.RATE_WINDOW:
+            self.recent.popleft()
+        window = min(self.RATE_WINDOW, now - self.started)
+        return len(self.recent) / window if window > 0 else 0.0
+
+    def report(self):
+        done = self.succeeded + self.failed
+        rate = self.rate()
+        line = f"📦 [Bulk] {done + self.skipped}"
+        if self.total:
+            remaining = self.total - self.skipped - done
+            line += f"/{self.total} ({(done + self.skipped) / self.total:.1%})"
+            line += f" | ETA {_duration(remaining / rate)}" if rate > 0 else " | ETA --"
+        line += f" | {rate:.2f} pairs/s | ok {self.succeeded} failed {self.failed}"
+        line += " | " + " ".join(f"{stage} {self.active[stage]}/{limit}" for stage, limit in self.limits.items())
+        print(line, file=self.log, flush=True)
+
+async def run(args: argparse.Namespace, log: TextIO) -> int:
+    completed = {} if args.restart else load_completed(args.output, args.retry_failed)
+    total = count_pairs(args.input)
+    limits = parse_stage_concurrency(args.stage_concurrency)
+    gates = {stage: asyncio.Semaphore(limit) for stage, limit in limits.items()}
+    window = asyncio.Semaphore(args.max_in_flight or sum(limits.values()))
+    progress = Progress(total, len(completed), limits, log)
+    if completed:
+        print(f"⏩ [Bulk] Resuming: {len(completed)} of {total} pairs already in {args.output}.", file=log)
+
+    @asynccontextmanager
+    async def stage_gate(name: str):
+        async with gates[name]:
+            progress.active[name] += 1
+            try:
+                yield
+            finally:
+                progress.active[name] -= 1
+
+    # A result line cut short by a crash is ended before appending
+    broken_tail = False
+    if not args.restart and os.path.exists(args.output) and os.path.getsize(args.output):
+        with open(args.output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            broken_tail = f.read(1) != b"\n"
+
+    async def process(output: TextIO, line_number: int, pair: Optional[Dict[str, Any]], error: Optional[str]):
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"line": line_number}
+        if pair is None:
+            result.update(success=False, error=error)
+        else:
+            response = await orchestrate_report_generation(
+                git_id=pair["git_id"],
+                repo_url=pair["repo_url"],
+                auth_token=args.token,
+                user_id=pair.get("user_id") or args.user_id,
+                force_refresh=args.force_refresh,
+                stage_gate=stage_gate,
+                profile_mode=pair.get("profile_mode") or args.profile_mode
+            )
+            result.update(
+                git_id=pair["git_id"], repo_url=pair["repo_url"], success=response.success,
+                report_id=response.report_id, error=response.error
+            )
+            if args.markdown:
+                result["markdown_content"] = response.markdown_content
+        result["seconds"] = round(time.perf_counter() - started, 2)
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        progress.record(result["success"])
+
+    async def report_progress(output: TextIO):
+        while True:
+            await asyncio.sleep(args.progress_seconds)
+            os.fsync(output.fileno())
+            progress.report()
+
+    in_flight = set()
+    with open(args.output, "w" if args.restart else "a", encoding="utf-8") as output, open(args.input, encoding="utf-8") as stream:
+        if broken_tail:
+            output.write("\n")
+        reporter = asyncio.create_task(report_progress(output))
+        try:
+            for line_number, pair, error in read_pairs(stream):
+                done = completed.get(line_number)
+                if done is not None and (pair is None or done == (pair["git_id"], pair["repo_url"])):
+                    continue
+                # Stop reading ahead while the window is full, so memory stays flat
+                await window.acquire()
+                task = asyncio.create_task(process(output, line_number, pair, error))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                task.add_done_callback(lambda _: window.release())
+            await asyncio.gather(*in_flight)
+        finally:
+            # Interrupted: pairs still running are redone on resume, none writes half a line
+            for task in (reporter, *in_flight):
+                task.cancel()
+            await asyncio.gather(reporter, *in_flight, return_exceptions=True)
+            output.flush()
+            os.fsync(output.fileno())
+    progress.report()
+    elapsed = time.monotonic() - progress.started
+    print(f"🏁 [Bulk] {progress.succeeded} succeeded, {progress.failed} failed in {_duration(elapsed)}.", file=log)
+    return 1 if progress.failed else 0
+
+async def main(args: argparse.Namespace) -> int:
+    log = sys.stderr
+    # Pipeline logs go to stderr (or nowhere with --quiet); progress lines always to stderr
+    quiet = open(os.devnull, "w") if args.quiet else contextlib.nullcontext(sys.stderr)
+    with quiet as sink, contextlib.redirect_stdout(sink):
+        await init_github_client()
+        init_llm()
+        # No write-behind queue: each report is saved (under the persistence limit)
+        # before its result line is written, so the output is a safe checkpoint
+        try:
+            return await run(args, log)
+        finally:
+            await close_github_client()
+
+if __name__ == "__main__":
+    load_dotenv()
+    default_limits = ",".join(f"{stage}={limit}" for stage, limit in DEFAULT_STAGE_CONCURRENCY.items())
+    parser = argparse.ArgumentParser(description="Generate reports for (git_id, repo_url) pairs from JSONL.")
+    parser.add_argument("--input", required=True, help="Pairs JSONL file")
+    parser.add_argument("--output", required=True, help="Results JSONL file; also the resume checkpoint")
+    parser.add_argument("--stage-concurrency", default=default_limits, help=f"Per-stage limits (default: {default_limits})")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="Pairs in the pipeline at once (default: sum of the stage limits)")
+    parser.add_argument("--token", default=None, help="GitHub PAT for private repos")
+    parser.add_argument("--user-id", default="cli", help="Owner of the saved reports (unless set per line)")
+    parser.add_argument("--profile-mode", default="fast", choices=["fast", "deep"])
+    parser.add_argument("--force-refresh", action="store_true", help="Ignore cached reports")
+    parser.add_argument("--markdown", action="store_true", help="Include the report Markdown in the output")
+    parser.add_argument("--retry-failed", action="store_true", help="On resume, redo pairs that failed before")
+    parser.add_argument("--restart", action="store_true", help="Ignore and overwrite an existing output file")
+    parser.add_argument("--progress-seconds", type=float, default=10.0, help="Interval between progress lines")
+    parser.add_argument("--quiet", action="store_true", help="Hide per-report pipeline logs")
+    sys.exit(asyncio.run(main(parser.parse_args())))
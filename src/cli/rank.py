@@ -0,0 +1,80 @@
+# Ranks many candidates against one repository from the command line.
+#
+#   python -m src.cli.rank --repo https://github.com/acme/platform --input candidates.jsonl --top-k 10
+#
+# Input is JSONL, one candidate per line: {"git_id": "octocat"} (a bare "octocat" string also works).
+# Output is JSONL, one event per line, written as results complete (same events as POST /api/rank).
+# Progress logs go to stderr so stdout stays machine-readable.
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+from typing import List, TextIO
+
+from dotenv import load_dotenv
+
+from src.data_extraction.github_client import init_github_client, close_github_client
+from src.llm.client import init_llm
+from src.orchestration.manager import stream_candidate_ranking
+from src.persistence.firestore import start_report_writer, stop_report_writer
+
+def read_candidates(stream: TextIO) -> List[str]:
+    git_ids = []
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        git_id = record if isinstance(record, str) else record.get("git_id")
+        if not git_id:
+            raise ValueError(f"Line {line_number}: expected a git_id")
+        git_ids.append(git_id)
+    return git_ids
+
+async def run(args: argparse.Namespace, output: TextIO) -> int:
+    with open(args.input) if args.input != "-" else contextlib.nullcontext(sys.stdin) as stream:
+        git_ids = read_candidates(stream)
+
+    failed = False
+    with contextlib.redirect_stdout(sys.stderr):
+        await init_github_client()
+        init_llm()
+        start_report_writer()
+        try:
+            async for event, data in stream_candidate_ranking(
+                repo_url=args.repo,
+                git_ids=git_ids,
+                auth_token=args.token,
+                user_id=args.user_id,
+                top_k=args.top_k,
+                force_refresh=args.force_refresh
+            ):
+                if event == "codebase_context" and not args.verbose:
+                    data = {"languages": data["languages"]}
+                if event == "candidate" and not args.verbose:
+                    data.pop("developer_summary", None)
+                output.write(json.dumps({"event": event, **data}, default=str) + "\n")
+                output.flush()
+                failed = failed or event == "error"
+        finally:
+            await stop_report_writer()
+            await close_github_client()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Rank candidates (JSONL) against one repository.")
+    parser.add_argument("--repo", required=True, help="Target repository URL")
+    parser.add_argument("--input", default="-", help="Candidates JSONL file ('-' = stdin)")
+    parser.add_argument("--output", default="-", help="Results JSONL file ('-' = stdout)")
+    parser.add_argument("--top-k", type=int, default=10, help="Candidates that get a full LLM report")
+    parser.add_argument("--token", default=None, help="GitHub PAT for private repos")
+    parser.add_argument("--user-id", default="cli", help="Owner of the saved reports")
+    parser.add_argument("--force-refresh", action="store_true", help="Ignore cached reports")
+    parser.add_argument("--verbose", action="store_true", help="Include full profiles in the output")
+    args = parser.parse_args()
+
+    with open(args.output, "w") if args.output != "-" else contextlib.nullcontext(sys.stdout) as output:
+        sys.exit(asyncio.run(run(args, output)))
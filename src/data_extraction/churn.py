@@ -0,0 +1,247 @@
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Set, Any
+from src.data_extraction.github_client import github_graphql
+from src.data_extraction.rate_limit import get_token_pool
+
+logger = logging.getLogger(__name__)
+
+# One query returns a page of default-branch history. GitHub's GraphQL Commit type has no
+# file list, so paths come from each commit's associated pull request (squash/merge
+# workflows), which also carries per-file additions/deletions.
+HISTORY_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String, $since: GitTimestamp, $files: Int!) {
+  rateLimit { cost remaining }
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef {
+      target {
+        oid
+        ... on Commit {
+          history(first: $first, after: $after, since: $since) {
+            pageInfo { hasNextPage endCursor }
+            nodes {
+              oid
+              committedDate
+              associatedPullRequests(first: 1) {
+                nodes {
+                  number
+                  files(first: $files) { nodes { path additions deletions } }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+@dataclass
+class FileChurn:
+    path: str
+    changes: int = 0
+    additions: int = 0
+    deletions: int = 0
+    score: float = 0.0        # Recency-weighted churn, see _change_weight()
+    last_changed: float = 0.0 # Epoch seconds
+
+@dataclass
+class ChurnResult:
+    files: Dict[str, FileChurn] = field(default_factory=dict)
+    head_sha: Optional[str] = None
+    commits_analyzed: int = 0
+    unattributed_commits: int = 0 # Commits with no pull request (no file data)
+    requests_used: int = 0
+    points_used: int = 0
+    computed_at: float = field(default_factory=time.time)
+    reached_stop: bool = False    # History walk met 'stop_at' (see compute_file_churn)
+
+    def top(self, n: int) -> List[FileChurn]:
+        return sorted(self.files.values(), key=lambda f: f.score, reverse=True)[:n]
+
+    def merge_newer(self, newer: "ChurnResult", half_life_days: float, min_score: float = 0.01):
+        """
+        Folds in churn of commits made after this result was computed (in place).
+        Existing scores are decayed to 'newer.computed_at' by one rescale, so they match
+        what a full recompute would give. Files whose score decayed below 'min_score'
+        are dropped to keep the result bounded.
+        """
+        age_days = max(0.0, (newer.computed_at - self.computed_at) / 86400)
+        factor = 0.5 ** (age_days / half_life_days)
+        for path in list(self.files):
+            entry = self.files[path]
+            entry.score *= factor
+            if entry.score < min_score and path not in newer.files:
+                del self.files[path]
+
+        for path, changed in newer.files.items():
+            entry = self.files.setdefault(path, FileChurn(path=path))
+            entry.changes += changed.changes
+            entry.additions += changed.additions
+            entry.deletions += changed.deletions
+            entry.score += changed.score
+            entry.last_changed = max(entry.last_changed, changed.last_changed)
+
+        self.head_sha = newer.head_sha or self.head_sha
+        self.commits_analyzed += newer.commits_analyzed
+        self.unattributed_commits += newer.unattributed_commits
+        self.requests_used = newer.requests_used
+        self.points_used = newer.points_used
+        self.computed_at = newer.computed_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact form for persisting (see repo_index.py)."""
+        return {
+            "files": {
+                f.path: [f.changes, f.additions, f.deletions, round(f.score, 6), f.last_changed]
+                for f in self.files.values()
+            },
+            "head_sha": self.head_sha,
+            "commits_analyzed": self.commits_analyzed,
+            "unattributed_commits": self.unattributed_commits,
+            "computed_at": self.computed_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChurnResult":
+        files = {
+            path: FileChurn(path, changes, additions, deletions, score, last_changed)
+            for path, (changes, additions, deletions, score, last_changed) in data["files"].items()
+        }
+        return cls(
+            files=files,
+            head_sha=data.get("head_sha"),
+            commits_analyzed=data.get("commits_analyzed", 0),
+            unattributed_commits=data.get("unattributed_commits", 0),
+            computed_at=data.get("computed_at", time.time()),
+        )
+
+def _change_weight(changed_at: float, now: float, half_life_days: float, lines: int) -> float:
+    """
+    A change counts 1.0 today, halving every 'half_life_days'; bigger diffs count a bit more.
+    Exponential decay keeps scores updatable later by rescaling instead of recomputing.
+    """
+    age_days = max(0.0, (now - changed_at) / 86400)
+    recency = 0.5 ** (age_days / half_life_days)
+    return recency * (1.0 + math.log10(1 + lines))
+
+def _parse_timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+async def compute_file_churn(
+    owner: str,
+    repo_name: str,
+    token: Optional[str],
+    max_commits: Optional[int] = None,
+    since_days: Optional[int] = None,
+    max_requests: Optional[int] = None,
+    max_points: Optional[int] = None,
+    stop_at: Optional[str] = None,
+    seen_pull_requests: Optional[Set[int]] = None
+) -> Optional[ChurnResult]:
+    """
+    Aggregates per-file churn over recent default-branch history with paginated GraphQL queries.
+
+    Depth:  'max_commits' (CHURN_MAX_COMMITS) and optionally 'since_days' (CHURN_SINCE_DAYS).
+    Budget: stops paging after 'max_requests' queries (CHURN_MAX_REQUESTS) or once GitHub
+            reports 'max_points' rate-limit points spent (CHURN_MAX_POINTS).
+    Incremental: with 'stop_at' (an already analyzed commit) the walk ends there, so only newer
+            commits are counted; 'reached_stop' tells whether it was found within the budget.
+            'seen_pull_requests' carries PR numbers counted before and is updated in place.
+    Returns None when GraphQL is unavailable (it requires a token) or the first page fails.
+    """
+    if not token and not get_token_pool().authenticated:
+        logger.debug("GraphQL requires a GitHub token. Skipping churn analysis.")
+        return None
+
+    max_commits = max_commits or int(os.getenv("CHURN_MAX_COMMITS", 100))
+    max_requests = max_requests or int(os.getenv("CHURN_MAX_REQUESTS", 3))
+    max_points = max_points or int(os.getenv("CHURN_MAX_POINTS", 30))
+    half_life_days = float(os.getenv("CHURN_HALF_LIFE_DAYS", 30))
+    files_per_pr = int(os.getenv("CHURN_FILES_PER_PR", 50))
+    if since_days is None and os.getenv("CHURN_SINCE_DAYS"):
+        since_days = int(os.getenv("CHURN_SINCE_DAYS"))
+
+    since = None
+    if since_days:
+        since = (datetime.now(timezone.utc) - timedelta(days=since_days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    # Scores are relative to 'now', so the result is stamped with the same instant (merge_newer decays from it)
+    now = time.time()
+    result = ChurnResult(computed_at=now)
+    if seen_pull_requests is None:
+        seen_pull_requests = set()
+    cursor = None
+
+    while result.commits_analyzed < max_commits and result.requests_used < max_requests:
+        variables = {
+            "owner": owner,
+            "name": repo_name,
+            "first": min(100, max_commits - result.commits_analyzed),
+            "after": cursor,
+            "since": since,
+            "files": files_per_pr,
+        }
+        try:
+            resp = await github_graphql(HISTORY_QUERY, variables, token=token)
+            payload = resp.json() if resp.status_code == 200 else {"errors": [{"message": resp.text}]}
+        except Exception as e:
+            payload = {"errors": [{"message": str(e)}]}
+        result.requests_used += 1
+
+        if payload.get("errors"):
+            print(f"❌ [Churn] GraphQL Error: {payload['errors'][0].get('message')}")
+            if result.requests_used == 1:
+                return None
+            break # Keep what earlier pages gave us
+
+        data = payload.get("data") or {}
+        result.points_used += (data.get("rateLimit") or {}).get("cost", 1)
+
+        branch = ((data.get("repository") or {}).get("defaultBranchRef") or {}).get("target")
+        if not branch:
+            break # Empty repository
+        result.head_sha = result.head_sha or branch.get("oid")
+        history = branch["history"]
+
+        for commit in history["nodes"]:
+            if stop_at and commit["oid"] == stop_at:
+                result.reached_stop = True
+                break
+            result.commits_analyzed += 1
+            pull_requests = commit["associatedPullRequests"]["nodes"]
+            if not pull_requests:
+                result.unattributed_commits += 1
+                continue
+
+            # Merge-commit workflows associate every commit of a PR with it; count the PR once
+            pr = pull_requests[0]
+            if pr["number"] in seen_pull_requests:
+                continue
+            seen_pull_requests.add(pr["number"])
+
+            changed_at = _parse_timestamp(commit["committedDate"])
+            for changed in pr["files"]["nodes"]:
+                entry = result.files.setdefault(changed["path"], FileChurn(path=changed["path"]))
+                entry.changes += 1
+                entry.additions += changed["additions"]
+                entry.deletions += changed["deletions"]
+                entry.score += _change_weight(
+                    changed_at, now, half_life_days, changed["additions"] + changed["deletions"]
+                )
+                entry.last_changed = max(entry.last_changed, changed_at)
+
+        if result.reached_stop or not history["pageInfo"]["hasNextPage"] or result.points_used >= max_points:
+            break
+        cursor = history["pageInfo"]["endCursor"]
+
+    logger.debug(
+        "%s/%s: %d commits, %d files, %d requests / %d points",
+        owner, repo_name, result.commits_analyzed, len(result.files), result.requests_used, result.points_used
+    )
+    return result
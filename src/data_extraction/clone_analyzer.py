@@ -0,0 +1,429 @@
+import asyncio
+import base64
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Iterator, Tuple
+from urllib.parse import urlparse
+from src.data_extraction.churn import ChurnResult, FileChurn, _change_weight
+from src.data_extraction.rate_limit import get_token_pool
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping written next to each cached clone (size for the quota, last use for LRU)
+META_FILE = "commit-card.json"
+
+# Prefix of the per-clone lock files shared by every worker process using the cache
+LOCK_PREFIX = ".lock-"
+
+# Marks the start of each commit in our `git log` format
+COMMIT_MARKER = "\x00"
+
+@dataclass
+class CloneAnalysis:
+    churn: ChurnResult
+    hotspots: List[Tuple[str, int]] = field(default_factory=list) # (path, line count)
+
+class CloneCache:
+    """
+    Directory of bare, partial (blobless by default) clones reused across requests.
+    Existing clones are updated with an incremental `git fetch`; when the directory
+    grows past 'max_bytes' the least recently used clones are deleted.
+    Clones in use hold a shared flock on their lock file, so eviction in any worker
+    process skips them.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        depth: Optional[int] = None,
+        blob_filter: Optional[str] = None
+    ):
+        self.root = root or os.getenv("CLONE_CACHE_DIR", ".cache/clones")
+        self.max_bytes = max_bytes or int(os.getenv("CLONE_CACHE_MAX_BYTES", 5 * 1024 ** 3))
+        self.depth = depth if depth is not None else int(os.getenv("CLONE_DEPTH", 0))
+        self.blob_filter = blob_filter if blob_filter is not None else os.getenv("CLONE_FILTER", "blob:none")
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _lock_file(self, key: str) -> int:
+        return os.open(os.path.join(self.root, LOCK_PREFIX + key), os.O_RDWR | os.O_CREAT, 0o644)
+
+    @contextmanager
+    def in_use(self, key: str):
+        """
+        Marks a clone as in use for the duration of the block: lock_for(key) serializes
+        threads of this process, the shared flock keeps other processes from evicting it.
+        """
+        with self.lock_for(key):
+            fd = self._lock_file(key)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                yield
+            finally:
+                os.close(fd) # Closing the descriptor releases the flock
+
+    @staticmethod
+    def git(args: List[str], cwd: Optional[str] = None, token: Optional[str] = None, **kwargs):
+        """
+        Runs git with prompts disabled. The token travels as an HTTP header for this
+        call only, so it is never written into the clone's config.
+        """
+        command = ["git"]
+        if token:
+            basic = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+            command += ["-c", f"http.extraHeader=Authorization: Basic {basic}"]
+        env = {"GIT_TERMINAL_PROMPT": "0"}
+        # GitPython is only needed once clone analysis is actually used
+        from git import Git
+
+        return Git(cwd).execute(command + args, env=env, **kwargs)
+
+    def ensure(self, source_url: str, key: str, token: Optional[str] = None) -> Optional[str]:
+        """
+        Returns the path of an up-to-date bare clone of 'source_url', cloning or fetching as needed.
+        Callers hold in_use(key) while they use the clone so eviction skips it.
+        """
+        from git import GitCommandError
+
+        path = self.path_for(key)
+        try:
+            if os.path.isdir(path):
+                fetch_args = ["fetch", "--prune", "origin"]
+                if self.depth:
+                    fetch_args.insert(1, f"--depth={self.depth}")
+                try:
+                    self.git(fetch_args, cwd=path, token=token)
+                except GitCommandError as e:
+                    # Another worker may hold the ref lock; the existing data is still usable
+                    print(f"⚠️ [CloneCache] Fetch failed for {key}, using cached clone: {e.stderr.strip()}")
+            else:
+                self._clone(source_url, path, token)
+        except GitCommandError as e:
+            print(f"❌ [CloneCache] Clone failed for {source_url}: {e.stderr.strip()}")
+            return None
+
+        self.write_meta(path, size=self._dir_size(path), last_used=time.time())
+        self.evict()
+        return path
+
+    def _clone(self, source_url: str, path: str, token: Optional[str]):
+        # Clone into a temp dir and rename, so concurrent workers never see half a clone
+        tmp_path = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            args = ["clone", "--bare", "--single-branch", "--no-tags"]
+            if self.blob_filter:
+                args.append(f"--filter={self.blob_filter}")
+            if self.depth:
+                args.append(f"--depth={self.depth}")
+            self.git(args + [source_url, tmp_path], token=token)
+
+            # Bare clones have no fetch refspec; track the default branch so `fetch` updates it
+            branch = self.git(["symbolic-ref", "--short", "HEAD"], cwd=tmp_path)
+            self.git(["config", "remote.origin.fetch", f"+refs/heads/{branch}:refs/heads/{branch}"], cwd=tmp_path)
+
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                pass # Lost the race to another worker; use theirs
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    @staticmethod
+    def read_meta(path: str) -> Dict:
+        try:
+            with open(os.path.join(path, META_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_meta(self, path: str, **updates):
+        meta = self.read_meta(path)
+        meta.update(updates)
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump(meta, f)
+
+    def evict(self):
+        """
+        Deletes least recently used clones until the cache fits in 'max_bytes'.
+        """
+        clones = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith((".tmp-", LOCK_PREFIX)) or not os.path.isdir(path):
+                continue
+            meta = self.read_meta(path)
+            clones.append((meta.get("last_used", 0), meta.get("size", 0), name))
+
+        total = sum(size for _, size, _ in clones)
+        for _, size, name in sorted(clones):
+            if total <= self.max_bytes:
+                break
+            # flock conflicts between descriptors even within one process, so this also
+            # skips the clone that the calling thread is using
+            fd = self._lock_file(name)
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue # In use right now, here or in another worker
+                shutil.rmtree(self.path_for(name), ignore_errors=True)
+            finally:
+                os.close(fd)
+            total -= size
+            logger.info("Evicted %s (%d MB)", name, size // 1024 ** 2)
+
+def _log_window_args(max_commits: int, since: Optional[str]) -> List[str]:
+    args = ["-n", str(max_commits), "--no-renames", "--no-merges"]
+    if since:
+        args.append(f"--since={since}")
+    return args
+
+def prefetch_window_blobs(cache: CloneCache, repo_dir: str, max_commits: int, since: Optional[str], token: Optional[str]):
+    """
+    In a blobless clone every diff needs blobs that are fetched lazily, one round trip per
+    commit. Listing the window with `--raw` only needs trees, so we collect the blob ids it
+    references and fetch them in a single batch before running `--numstat`.
+    Blobs already fetched for earlier requests are skipped via the 'prefetched_head' marker.
+    """
+    if not cache.blob_filter:
+        return
+
+    head = cache.git(["rev-parse", "HEAD"], cwd=repo_dir)
+    meta = CloneCache.read_meta(repo_dir)
+    if meta.get("prefetched_head") == head:
+        return
+
+    rev_range = f"{meta['prefetched_head']}..HEAD" if meta.get("prefetched_head") else "HEAD"
+    proc = cache.git(
+        ["log", "--raw", "--no-abbrev", "--format="] + _log_window_args(max_commits, since) + [rev_range],
+        cwd=repo_dir, as_process=True
+    )
+    oids = set()
+    for raw_line in proc.stdout:
+        parts = raw_line.decode("utf-8", "replace").split("\t", 1)[0].split()
+        if len(parts) >= 4 and parts[0].startswith(":"):
+            oids.update(oid for oid in parts[2:4] if set(oid) != {"0"})
+    proc.wait()
+
+    if oids:
+        fetch = cache.git(
+            ["-c", "fetch.negotiationAlgorithm=noop", "fetch", "origin", "--no-tags",
+             "--no-write-fetch-head", "--recurse-submodules=no", "--filter=blob:none", "--stdin"],
+            cwd=repo_dir, token=token, istream=subprocess.PIPE, as_process=True
+        )
+        _, stderr = fetch.proc.communicate(input="\n".join(sorted(oids)).encode())
+        if fetch.proc.returncode != 0:
+            print(f"⚠️ [CloneAnalyzer] Blob prefetch failed, falling back to lazy fetch: {stderr.decode().strip()}")
+            return
+
+    cache.write_meta(repo_dir, prefetched_head=head)
+
+def iter_numstat(
+    cache: CloneCache,
+    repo_dir: str,
+    max_commits: int,
+    since: Optional[str] = None
+) -> Iterator[Tuple[str, float, str, int, int]]:
+    """
+    Streams `git log --numstat` line by line, yielding (sha, commit_time, path, added, deleted).
+    The history is never held in memory; closing the generator stops git.
+    Binary files report 0 lines changed.
+    """
+    proc = cache.git(
+        ["log", "--numstat", "--format=%x00%H %ct"] + _log_window_args(max_commits, since) + ["HEAD"],
+        cwd=repo_dir, as_process=True
+    )
+    sha, committed_at = "", 0.0
+    try:
+        for raw_line in proc.stdout:
+            line = raw_line.decode("utf-8", "replace").rstrip("\n")
+            if line.startswith(COMMIT_MARKER):
+                sha, timestamp = line[1:].split()
+                committed_at = float(timestamp)
+            elif line:
+                added, deleted, path = line.split("\t", 2)
+                yield (
+                    sha,
+                    committed_at,
+                    path,
+                    int(added) if added.isdigit() else 0,
+                    int(deleted) if deleted.isdigit() else 0
+                )
+    finally:
+        if proc.proc.poll() is None:
+            proc.proc.kill()
+        proc.proc.wait()
+
+def count_lines(cache: CloneCache, repo_dir: str, paths: List[str]) -> Dict[str, int]:
+    """
+    Line counts of files at HEAD via one `git cat-file --batch` process, read in chunks.
+    Deleted and binary files are left out.
+    Objects are requested one at a time: writing every request up front can deadlock once
+    git's output fills the pipe while we are still writing to its stdin.
+    """
+    if not paths:
+        return {}
+
+    proc = cache.git(["cat-file", "--batch"], cwd=repo_dir, istream=subprocess.PIPE, as_process=True)
+    counts = {}
+    try:
+        for path in paths:
+            proc.proc.stdin.write(f"HEAD:{path}\n".encode())
+            proc.proc.stdin.flush()
+            header = proc.proc.stdout.readline().decode().split()
+            if len(header) != 3:
+                continue # "<object> missing"
+            remaining = int(header[2])
+            lines, binary = 0, False
+            while remaining:
+                chunk = proc.proc.stdout.read(min(remaining, 65536))
+                if not chunk:
+                    raise OSError("git cat-file exited mid-object")
+                remaining -= len(chunk)
+                binary = binary or b"\x00" in chunk
+                lines += chunk.count(b"\n")
+            proc.proc.stdout.read(1) # Trailing newline after each object
+            if header[1] == "blob" and not binary:
+                counts[path] = lines
+    finally:
+        proc.proc.stdin.close()
+        proc.proc.wait()
+    return counts
+
+def analyze_clone(
+    source_url: str,
+    key: str,
+    token: Optional[str] = None,
+    max_commits: Optional[int] = None,
+    since_days: Optional[int] = None,
+    cache: Optional["CloneCache"] = None
+) -> Optional[CloneAnalysis]:
+    """
+    Clone-based churn and complexity analysis (blocking; see analyze_repo_with_clone).
+    Works with any git URL, including local bare repositories.
+    """
+    from git import GitCommandError
+
+    cache = cache or get_clone_cache()
+    max_commits = max_commits or int(os.getenv("CHURN_MAX_COMMITS", 100))
+    if since_days is None and os.getenv("CHURN_SINCE_DAYS"):
+        since_days = int(os.getenv("CHURN_SINCE_DAYS"))
+    since = None
+    if since_days:
+        since = (datetime.now(timezone.utc) - timedelta(days=since_days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    with cache.in_use(key):
+        repo_dir = cache.ensure(source_url, key, token=token)
+        if repo_dir is None:
+            return None
+
+        try:
+            return _analyze_local_clone(cache, repo_dir, max_commits, since, token)
+        except (GitCommandError, OSError, ValueError) as e:
+            print(f"❌ [CloneAnalyzer] Analysis failed for {key}: {e}")
+            return None
+
+def _analyze_local_clone(
+    cache: CloneCache,
+    repo_dir: str,
+    max_commits: int,
+    since: Optional[str],
+    token: Optional[str]
+) -> CloneAnalysis:
+    half_life_days = float(os.getenv("CHURN_HALF_LIFE_DAYS", 30))
+    candidates = int(os.getenv("CLONE_HOTSPOT_CANDIDATES", 100))
+
+    prefetch_window_blobs(cache, repo_dir, max_commits, since, token)
+
+    churn = ChurnResult(head_sha=cache.git(["rev-parse", "HEAD"], cwd=repo_dir))
+    now = time.time()
+    commits = set()
+    for sha, committed_at, path, added, deleted in iter_numstat(cache, repo_dir, max_commits, since):
+        commits.add(sha)
+        entry = churn.files.setdefault(path, FileChurn(path=path))
+        entry.changes += 1
+        entry.additions += added
+        entry.deletions += deleted
+        entry.score += _change_weight(committed_at, now, half_life_days, added + deleted)
+        entry.last_changed = max(entry.last_changed, committed_at)
+    churn.commits_analyzed = len(commits)
+
+    # Complexity: size of the most churned files, nudged by how often they change
+    top_paths = [f.path for f in churn.top(candidates)]
+    line_counts = count_lines(cache, repo_dir, top_paths)
+    hotspots = sorted(
+        line_counts.items(),
+        key=lambda item: item[1] * (1 + churn.files[item[0]].score),
+        reverse=True
+    )
+
+    return CloneAnalysis(churn=churn, hotspots=hotspots)
+
+def clone_source_url(repo_url: str) -> Tuple[str, str]:
+    """
+    Maps a repository URL to (git URL to clone, cache directory key).
+    The key is readable but hashed with the URL so distinct hosts never collide.
+    """
+    parsed = urlparse(repo_url)
+    if parsed.netloc.endswith("github.com"):
+        owner, repo_name = parsed.path.strip("/").split("/")[-2:]
+        repo_name = repo_name.removesuffix(".git")
+        source = f"https://github.com/{owner}/{repo_name}.git"
+        label = f"{owner}__{repo_name}"
+    else:
+        source = repo_url
+        label = os.path.basename(repo_url.rstrip("/")).removesuffix(".git") or "repo"
+    return source, f"{label}-{hashlib.sha256(source.encode()).hexdigest()[:12]}"
+
+async def analyze_repo_with_clone(repo_url: str, token: Optional[str] = None) -> Optional[CloneAnalysis]:
+    """
+    Runs the clone-based analysis in a worker thread so git I/O never blocks the event loop.
+    Clones are per token scope: a private clone fetched with one token is never reused for another.
+    """
+    source, key = clone_source_url(repo_url)
+    if token:
+        key += "-" + hashlib.sha256(token.encode()).hexdigest()[:8]
+    else:
+        token = get_token_pool().pick() # Server tokens see the same public data and share a clone
+    return await asyncio.to_thread(analyze_clone, source, key, token)
+
+# Shared clone cache (created on first use)
+_clone_cache: Optional[CloneCache] = None
+
+def get_clone_cache() -> CloneCache:
+    global _clone_cache
+
+    if _clone_cache is None:
+        _clone_cache = CloneCache()
+    return _clone_cache
@@ -1,107 +1,476 @@
 import os
-import httpx
+import logging
+import math
+import time
+import asyncio
 from collections import Counter
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from src.models import DeveloperProfileSummary
+from src.data_extraction.github_client import github_get, github_graphql
+from src.data_extraction.rate_limit import get_token_pool
+from src.data_extraction.profile_snapshots import get_profile_store
 
-# GitHub API Base URL
-GITHUB_API_BASE = "https://api.github.com"
+logger = logging.getLogger(__name__)
 
-async def extract_developer_profile(git_id: str) -> Optional[DeveloperProfileSummary]:
+# Authored commits per repository over the last year (deep mode, needs a token)
+CONTRIBUTIONS_QUERY = """
+query($login: String!) {
+  user(login: $login) {
+    contributionsCollection {
+      totalCommitContributions
+      commitContributionsByRepository(maxRepositories: 100) {
+        contributions { totalCount }
+        repository {
+          nameWithOwner
+          isFork
+          languages(first: 10, orderBy: {field: SIZE, direction: DESC}) { edges { size node { name } } }
+        }
+      }
+    }
+  }
+}
+"""
+
+async def extract_developer_profile(
+    git_id: str,
+    mode: str = "fast",
+    max_requests: Optional[int] = None,
+    time_budget: Optional[float] = None
+) -> Optional[DeveloperProfileSummary]:
     """
     Fetches public data for a GitHub user and aggregates their technical profile.
+
+    mode='fast' looks at the 30 most recently updated repos (2 requests).
+    mode='deep' reads every repo's language bytes (and authored commit counts), bounded
+    by 'max_requests' (PROFILE_DEEP_MAX_REQUESTS) and 'time_budget' seconds
+    (PROFILE_DEEP_TIME_BUDGET_SECONDS); see extract_deep_profile.
     """
+    if mode == "deep":
+        return await extract_deep_profile(git_id, max_requests, time_budget)
     
     # 1. Setup Auth (Important for Rate Limits)
     # Even for public data, unauthenticated requests are limited to 60/hr.
-    token = os.getenv("GITHUB_TOKEN")
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "User-Agent": "Commit-Card-App"
-    }
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
+    # token=None lets every call take the server token with the most quota left (GITHUB_TOKENS).
+    token = None
 
-    print(f"🔍 [GitExtractor] Fetching profile for: {git_id}")
+    logger.info("Fetching profile for: %s", git_id)
 
-    async with httpx.AsyncClient() as client:
-        try:
-            # --- Step A: Verify User & Get Basic Info ---
-            user_resp = await client.get(f"{GITHUB_API_BASE}/users/{git_id}", headers=headers)
-            
-            if user_resp.status_code == 404:
-                print(f"❌ User {git_id} not found.")
-                return None
-            elif user_resp.status_code != 200:
-                print(f"❌ GitHub API Error: {user_resp.text}")
-                return None
-
-            user_data = user_resp.json()
-            public_repos_count = user_data.get("public_repos", 0)
-
-            # --- Step B: Fetch Repositories (Limit to top 30 recently updated) ---
-            # We sort by updated to get their *current* skills, not what they did 5 years ago.
-            params = {"sort": "updated", "direction": "desc", "per_page": 30}
-            repos_resp = await client.get(f"{GITHUB_API_BASE}/users/{git_id}/repos", headers=headers, params=params)
-            
-            if repos_resp.status_code != 200:
-                print(f"❌ Failed to fetch repos for {git_id}")
-                return None
+    try:
+        # --- Step A: Verify User & Get Basic Info ---
+        user_resp = await github_get(f"/users/{git_id}", token=token)
+        
+        if user_resp.status_code == 404:
+            print(f"❌ User {git_id} not found.")
+            return None
+        elif user_resp.status_code != 200:
+            print(f"❌ GitHub API Error: {user_resp.text}")
+            return None
 
-            repos = repos_resp.json()
+        user_data = user_resp.json()
+        public_repos_count = user_data.get("public_repos", 0)
 
-            # --- Step C: Aggregate Metrics ---
-            language_counter = Counter()
-            topics = []
-            total_stars = 0
-            
-            for repo in repos:
-                # 1. Languages
-                lang = repo.get("language")
-                if lang:
-                    # We weight the language by the size of the repo (size is in KB)
-                    # This prevents a "Hello World" in Java counting the same as a massive Python app.
-                    weight = repo.get("size", 1) // 100 # Simple weighting heuristic
-                    if weight < 1: weight = 1
-                    language_counter[lang] += weight
-
-                # 2. Tech Focus (Topics)
-                repo_topics = repo.get("topics", [])
-                topics.extend(repo_topics)
-                
-                # 3. Stars (Proxy for quality/impact)
-                total_stars += repo.get("stargazers_count", 0)
-
-            # --- Step D: Format Output ---
+        # --- Step B: Fetch Repositories (Limit to top 30 recently updated) ---
+        # We sort by updated to get their *current* skills, not what they did 5 years ago.
+        params = {"sort": "updated", "direction": "desc", "per_page": 30}
+        repos_resp = await github_get(f"/users/{git_id}/repos", token=token, params=params)
+        
+        if repos_resp.status_code != 200:
+            print(f"❌ Failed to fetch repos for {git_id}")
+            return None
+
+        repos = repos_resp.json()
+
+        # --- Step C: Aggregate Metrics ---
+        language_counter = Counter()
+        topics = []
+        total_stars = 0
+        
+        for repo in repos:
+            # 1. Languages
+            lang = repo.get("language")
+            if lang:
+                # We weight the language by the size of the repo (size is in KB)
+                # This prevents a "Hello World" in Java counting the same as a massive Python app.
+                weight = repo.get("size", 1) // 100 # Simple weighting heuristic
+                if weight < 1: weight = 1
+                language_counter[lang] += weight
+
+            # 2. Tech Focus (Topics)
+            repo_topics = repo.get("topics", [])
+            topics.extend(repo_topics)
             
-            # 1. Top Languages
-            top_langs = [
-                {"name": lang, "score": count} 
-                for lang, count in language_counter.most_common(3)
-            ]
-
-            # 2. Tech Focus (Top 5 keywords)
-            top_topics = [t[0] for t in Counter(topics).most_common(5)]
-
-            # 3. Contribution Style (Heuristic based on data)
-            style_desc = f"Maintains {public_repos_count} public repos with {total_stars} total stars."
-            if not top_langs:
-                style_desc += " No language data available."
+            # 3. Stars (Proxy for quality/impact)
+            total_stars += repo.get("stargazers_count", 0)
+
+        # --- Step D: Format Output ---
+        
+        # 1. Top Languages
+        top_langs = [
+            {"name": lang, "score": count} 
+            for lang, count in language_counter.most_common(3)
+        ]
+
+        # 2. Tech Focus (Top 5 keywords)
+        top_topics = [t[0] for t in Counter(topics).most_common(5)]
+
+        # 3. Contribution Style (Heuristic based on data)
+        style_desc = _style_description(user_data, public_repos_count, total_stars, top_langs)
+
+        logger.info("Success for %s", git_id)
+        
+        return DeveloperProfileSummary(
+            top_languages=top_langs,
+            contribution_style=style_desc,
+            tech_focus=top_topics
+        )
+
+    except Exception as e:
+        print(f"❌ [GitExtractor] Exception: {e}")
+        return None
+
+def _style_description(user_data: Dict[str, Any], public_repos_count: int, total_stars: int, top_langs: List[Dict[str, Any]]) -> str:
+    style_desc = f"Maintains {public_repos_count} public repos with {total_stars} total stars."
+    if not top_langs:
+        style_desc += " No language data available."
+    else:
+        primary_lang = top_langs[0]['name']
+        style_desc += f" Heavily focused on {primary_lang} development."
+    
+    if user_data.get("hireable"):
+        style_desc += " Explicitly marked as 'Hireable' on GitHub."
+    return style_desc
+
+class _RequestBudget:
+    """Caps a deep scan by request count and wall-clock time."""
+
+    def __init__(self, max_requests: int, seconds: float):
+        self.left = max_requests
+        self.deadline = time.monotonic() + seconds
+
+    def remaining_time(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def take(self) -> bool:
+        if self.left <= 0 or self.remaining_time() <= 0:
+            return False
+        self.left -= 1
+        return True
+
+def _finished_result(task: asyncio.Task) -> Any:
+    if not task.done() or task.cancelled() or task.exception():
+        return None
+    return task.result()
+
+def _repo_weight(size_kb: int, commits: Optional[int]) -> float:
+    # Log-damped, so one huge (or vendored) repo does not drown out the rest; authored
+    # commits, when known, count for more than size alone
+    weight = math.log2(2 + size_kb)
+    if commits is not None:
+        weight *= 1 + math.log2(1 + commits)
+    return weight
+
+async def _repo_page(git_id: str, page: int, budget: _RequestBudget) -> Optional[List[Dict[str, Any]]]:
+    """One page of the user's repos, or None if it could not be fetched (failure or budget)."""
+    if not budget.take():
+        return None
+    params = {"sort": "pushed", "direction": "desc", "per_page": 100, "page": page}
+    try:
+        resp = await github_get(f"/users/{git_id}/repos", params=params)
+    except Exception as e:
+        print(f"⚠️ [GitExtractor] Repo page {page} unavailable for {git_id}: {e}")
+        return None
+    return resp.json() if resp.status_code == 200 else None
+
+async def _repo_languages(full_name: str, budget: _RequestBudget, semaphore: asyncio.Semaphore) -> Optional[Dict[str, int]]:
+    async with semaphore:
+        if not budget.take():
+            return None
+        resp = await github_get(f"/repos/{full_name}/languages")
+    return resp.json() if resp.status_code == 200 else None
+
+async def _authored_commits(git_id: str, budget: _RequestBudget) -> Optional[Dict[str, Any]]:
+    if os.getenv("PROFILE_DEEP_COMMITS", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if not get_token_pool().authenticated or not budget.take():
+        return None # GraphQL requires a token
+    try:
+        resp = await github_graphql(CONTRIBUTIONS_QUERY, {"login": git_id})
+        payload = resp.json() if resp.status_code == 200 else {}
+        return ((payload.get("data") or {}).get("user") or {}).get("contributionsCollection")
+    except Exception as e:
+        print(f"⚠️ [GitExtractor] Commit contributions unavailable for {git_id}: {e}")
+        return None
+
+def _repo_record(repo: Dict[str, Any], languages: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    # What a snapshot keeps per repo; 'languages' is the byte breakdown (None = not fetched yet)
+    return {
+        "pushed_at": repo.get("pushed_at") or "",
+        "size": repo.get("size", 0),
+        "stars": repo.get("stargazers_count", 0),
+        "topics": repo.get("topics", []),
+        "language": repo.get("language"),
+        "languages": languages,
+    }
+
+async def _public_events(git_id: str, since: str, budget: _RequestBudget) -> Optional[List[Dict[str, Any]]]:
+    """The user's public events newer than 'since', newest first (None if the feed is unavailable)."""
+    if not budget.take():
+        return None
+    try:
+        resp = await github_get(f"/users/{git_id}/events/public", params={"per_page": 100})
+    except Exception as e:
+        print(f"⚠️ [GitExtractor] Events feed unavailable for {git_id}: {e}")
+        return None
+    if resp.status_code != 200:
+        return None
+    events = resp.json()
+    newer = [event for event in events if event.get("created_at", "") > since]
+    if len(newer) == len(events) == 100:
+        return None # The feed may have overflowed since the watermark; can't trust it
+    return newer
+
+def _summarize(snapshot: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[str], int]:
+    """Top languages, top topics and total stars from a snapshot's per-repo aggregates."""
+    commits = snapshot["commits"]
+    language_weight = Counter()
+    topics = []
+    total_stars = 0
+
+    for name, repo in snapshot["repos"].items():
+        # Repos whose breakdown is still missing count with their primary language only
+        raw = repo["languages"] or ({repo["language"]: 1} if repo["language"] else {})
+        weight = _repo_weight(repo["size"], commits.get(name, 0))
+        total_bytes = sum(raw.values())
+        for lang, bytes_count in raw.items():
+            language_weight[lang] += weight * bytes_count / total_bytes
+        topics.extend(repo["topics"])
+        total_stars += repo["stars"]
+
+    for name, repo in snapshot["external"].items():
+        raw = repo["languages"] or {}
+        weight = _repo_weight(sum(raw.values()) // 1024, commits.get(name, 0))
+        total_bytes = sum(raw.values())
+        for lang, bytes_count in raw.items():
+            language_weight[lang] += weight * bytes_count / total_bytes
+
+    # Deep mode keeps the top 5, so secondary stacks of polyglot developers stay visible
+    top_langs = [
+        {"name": lang, "score": max(1, round(weight))}
+        for lang, weight in language_weight.most_common(5)
+    ]
+    top_topics = [t[0] for t in Counter(topics).most_common(5)]
+    return top_langs, top_topics, total_stars
+
+async def extract_deep_profile(
+    git_id: str,
+    max_requests: Optional[int] = None,
+    time_budget: Optional[float] = None
+) -> Optional[DeveloperProfileSummary]:
+    """
+    Deep variant of extract_developer_profile for prolific / polyglot developers.
+
+    - All repo pages (up to PROFILE_DEEP_MAX_REPOS repos) are fetched concurrently with the
+      user lookup, and each page's language breakdowns are requested as soon as it lands.
+    - Languages are weighted by their byte share of each non-fork repo, scaled by the repo's
+      size and the user's authored commits there (GraphQL contributionsCollection, last year).
+      Repos they committed to but do not own count as well.
+    - Fan-out is capped at PROFILE_DEEP_CONCURRENCY. Repos whose breakdown did not fit in the
+      request or time budget fall back to their primary language (and are fetched next time).
+
+    The per-repo aggregates are saved as a snapshot (profile_snapshots.py). Next time only
+    the events feed is read, and repos pushed after the snapshot's 'last_synced' watermark
+    are re-fetched and merged in; a full rescan happens every PROFILE_SNAPSHOT_MAX_AGE_DAYS
+    and is the only time authored commit counts are updated. A repo page that fails leaves the
+    watermark where it was and makes the next run re-list every page.
+    """
+    budget = _RequestBudget(
+        max_requests or int(os.getenv("PROFILE_DEEP_MAX_REQUESTS", 60)),
+        time_budget or float(os.getenv("PROFILE_DEEP_TIME_BUDGET_SECONDS", 8))
+    )
+    max_repos = int(os.getenv("PROFILE_DEEP_MAX_REPOS", 300))
+    semaphore = asyncio.Semaphore(int(os.getenv("PROFILE_DEEP_CONCURRENCY", 16)))
+
+    store = get_profile_store()
+    snapshot = await store.get(git_id) if store else None
+    max_age = float(os.getenv("PROFILE_SNAPSHOT_MAX_AGE_DAYS", 30)) * 86400
+    if snapshot and time.time() - snapshot["scanned_at"] > max_age:
+        snapshot = None # Periodic full rescan: drops deleted repos and re-bases commit counts
+    incremental = snapshot is not None
+
+    logger.info("Deep profile for: %s (%s)", git_id, "incremental" if incremental else "full scan")
+
+    budget.take()
+    user_task = asyncio.create_task(github_get(f"/users/{git_id}"))
+    if incremental:
+        side_task = asyncio.create_task(_public_events(git_id, snapshot["last_synced"], budget))
+        page_tasks = []
+    else:
+        side_task = asyncio.create_task(_authored_commits(git_id, budget))
+        page_tasks = [asyncio.create_task(_repo_page(git_id, 1, budget))]
+    language_tasks: Dict[str, asyncio.Task] = {}
+
+    def fetch_languages(full_name: str):
+        if full_name not in language_tasks:
+            language_tasks[full_name] = asyncio.create_task(_repo_languages(full_name, budget, semaphore))
+
+    try:
+        # --- Step A: Verify User; it tells us how many repo pages there are ---
+        user_resp = await user_task
+        if user_resp.status_code == 404:
+            print(f"❌ User {git_id} not found.")
+            return None
+        elif user_resp.status_code != 200:
+            print(f"❌ GitHub API Error: {user_resp.text}")
+            return None
+
+        user_data = user_resp.json()
+        public_repos_count = user_data.get("public_repos", 0)
+        pages = math.ceil(min(public_repos_count, max_repos) / 100)
+
+        if incremental:
+            repos, commits, external = snapshot["repos"], snapshot["commits"], snapshot["external"]
+            total_commits = snapshot.get("total_commits")
+            watermark = snapshot["last_synced"]
+            events = await side_task
+
+            # --- Step B (incremental): merge pushes from the events feed ---
+            # Repos were added or removed, or a page was missing last time: list everything
+            relist = public_repos_count != snapshot["public_repos"] or not snapshot.get("listing_complete", True)
+            own_push = events is None or relist
+            # Commit counts stay those of the last full scan: events cannot age old commits out
+            # of the one-year window, and a push's distinct_size also counts other authors' commits
+            for event in events or []:
+                name = (event.get("repo") or {}).get("name", "")
+                if event.get("type") in ("PushEvent", "CreateEvent", "PublicEvent") and name.lower().startswith(git_id.lower() + "/"):
+                    own_push = True
+                if event.get("type") == "PushEvent" and name not in repos and name not in external:
+                    external[name] = {"languages": None}
+            listing_complete = True
+
+            # --- Step C (incremental): re-list only repos pushed after the watermark ---
+            if relist:
+                # Keep the breakdowns of unchanged repos
+                listing = {}
+                page_results = await asyncio.gather(*(_repo_page(git_id, page, budget) for page in range(1, pages + 1)))
+                for page_repos in page_results:
+                    for repo in page_repos or []:
+                        if not repo.get("fork") and len(listing) < max_repos:
+                            old = repos.get(repo["full_name"])
+                            kept = old["languages"] if old and old["pushed_at"] == repo.get("pushed_at") else None
+                            listing[repo["full_name"]] = _repo_record(repo, kept)
+                # Only a listing with every page in it may replace the snapshot's repos
+                listing_complete = None not in page_results
+                if listing_complete:
+                    repos = listing
+            elif own_push:
+                # Newest pushes first: stop at the first page that reaches the watermark
+                for page in range(1, pages + 1):
+                    page_repos = await _repo_page(git_id, page, budget)
+                    if page_repos is None:
+                        listing_complete = False
+                        break
+                    if not page_repos:
+                        break
+                    for repo in page_repos:
+                        name = repo["full_name"]
+                        if repo.get("fork"):
+                            continue
+                        if name in repos and repo.get("pushed_at", "") <= watermark:
+                            repos[name].update(_repo_record(repo, repos[name]["languages"])) # Stars, topics, size
+                        else:
+                            repos[name] = _repo_record(repo)
+                            fetch_languages(name)
+                    if min(repo.get("pushed_at", "") for repo in page_repos) <= watermark:
+                        break
+        else:
+            repos, commits, external = {}, {}, {}
+            watermark = ""
+            page_tasks += [asyncio.create_task(_repo_page(git_id, page, budget)) for page in range(2, pages + 1)]
+
+            # --- Step B (full scan): pipeline repo pages into per-repo language requests ---
+            listing_complete = True
+            for next_page in asyncio.as_completed(page_tasks):
+                page_repos = await next_page
+                if page_repos is None:
+                    listing_complete = False # Repos on this page were never seen; keep the watermark
+                    continue
+                for repo in page_repos:
+                    if repo.get("fork") or len(repos) >= max_repos:
+                        continue
+                    repos[repo["full_name"]] = _repo_record(repo)
+                    fetch_languages(repo["full_name"])
+
+        # Breakdowns still missing from earlier runs (budget ran out) are retried as well
+        for name, repo in [*repos.items(), *external.items()]:
+            if repo["languages"] is None:
+                fetch_languages(name)
+
+        # Whatever has not answered when the time budget runs out is left out
+        await asyncio.wait([side_task, *language_tasks.values()], timeout=budget.remaining_time())
+
+        # --- Step C (full scan): authored commits, incl. repos they do not own ---
+        if not incremental:
+            contributions = _finished_result(side_task)
+            total_commits = contributions.get("totalCommitContributions") if contributions else None
+            for item in (contributions or {}).get("commitContributionsByRepository", []):
+                repository = item.get("repository") or {}
+                name = repository.get("nameWithOwner", "")
+                commits[name] = (item.get("contributions") or {}).get("totalCount", 0)
+                if name not in repos and not repository.get("isFork"):
+                    edges = (repository.get("languages") or {}).get("edges", [])
+                    external[name] = {"languages": {e["node"]["name"]: e["size"] for e in edges}}
+
+        breakdowns = 0
+        for name, task in language_tasks.items():
+            raw = _finished_result(task)
+            target = repos.get(name) or external.get(name)
+            if raw is not None and target is not None:
+                target["languages"] = raw
+                breakdowns += 1
+
+        # --- Step D: Save the snapshot, then Format Output ---
+        if listing_complete:
+            watermark = max([watermark, *(repo["pushed_at"] for repo in repos.values())])
+            if incremental and events:
+                watermark = max(watermark, events[0].get("created_at", ""))
+        snapshot = {
+            "git_id": git_id,
+            "scanned_at": snapshot["scanned_at"] if incremental else time.time(), # Last full scan
+            "refreshed_at": time.time(),
+            "last_synced": watermark,
+            "public_repos": public_repos_count,
+            "listing_complete": listing_complete,
+            "total_commits": total_commits,
+            "repos": repos,
+            "commits": commits,
+            "external": external,
+        }
+        if store:
+            await store.set(git_id, snapshot)
+            if incremental:
+                store.incremental += 1
             else:
-                primary_lang = top_langs[0]['name']
-                style_desc += f" Heavily focused on {primary_lang} development."
-            
-            if user_data.get("hireable"):
-                style_desc += " Explicitly marked as 'Hireable' on GitHub."
+                store.full_scans += 1
 
-            print(f"✅ [GitExtractor] Success for {git_id}")
-            
-            return DeveloperProfileSummary(
-                top_languages=top_langs,
-                contribution_style=style_desc,
-                tech_focus=top_topics
-            )
-
-        except Exception as e:
-            print(f"❌ [GitExtractor] Exception: {e}")
-            return None
\ No newline at end of file
+        top_langs, top_topics, total_stars = _summarize(snapshot)
+        style_desc = _style_description(user_data, public_repos_count, total_stars, top_langs)
+        if total_commits is not None:
+            style_desc += f" Authored {total_commits} commits in the last year."
+
+        logger.info(
+            "Deep profile for %s: %d repos, %d language breakdowns fetched, %d requests to spare",
+            git_id, len(repos), breakdowns, budget.left
+        )
+
+        return DeveloperProfileSummary(
+            top_languages=top_langs,
+            contribution_style=style_desc,
+            tech_focus=top_topics
+        )
+
+    except Exception as e:
+        print(f"❌ [GitExtractor] Exception: {e}")
+        return None
+    finally:
+        for task in [*page_tasks, *language_tasks.values(), side_task]:
+            task.cancel()
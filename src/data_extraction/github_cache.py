@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import time
+import httpx
+from typing import Optional, Dict, Any, Mapping
+from src.cache.stores import CacheStore, create_store
+
+# Response headers worth keeping alongside a cached body ('link' carries pagination)
+KEPT_HEADERS = ("content-type", "etag", "last-modified", "link")
+
+class GitHubResponseCache:
+    """
+    Conditional-request cache for GitHub GET calls.
+
+    - Within 'fresh_for' seconds a stored body is served without touching the network.
+    - After that we revalidate with If-None-Match / If-Modified-Since. A 304 reuses the
+      stored body and does not count against GitHub's rate limit.
+    - Only 200 responses are stored; everything else passes straight through.
+    """
+
+    def __init__(self, store: CacheStore, fresh_for: float = 60.0):
+        self.store = store
+        self.fresh_for = fresh_for
+        self.hits = 0           # Served from cache, no request sent
+        self.revalidations = 0  # Conditional request answered with 304
+        self.misses = 0         # Full body downloaded (new or changed)
+
+    @staticmethod
+    def cache_key(
+        url: str,
+        headers: Mapping[str, str],
+        params: Optional[Dict[str, Any]],
+        scope: Optional[str] = None
+    ) -> str:
+        # Different tokens can see different data (private repos), so the token is part
+        # of the key, hashed so it never lands on disk in clear text. A 'scope' replaces it
+        # for tokens that see the same data (the server token pool).
+        auth = scope or hashlib.sha256(headers.get("Authorization", "").encode()).hexdigest()[:16]
+        query = json.dumps(params or {}, sort_keys=True, default=str)
+        return f"{url}|{query}|{headers.get('Accept', '')}|{auth}"
+
+    @staticmethod
+    def _to_response(request: httpx.Request, body: bytes, meta: Dict[str, Any]) -> httpx.Response:
+        return httpx.Response(200, headers=meta.get("headers", {}), content=body, request=request)
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: Mapping[str, str],
+        params: Optional[Dict[str, Any]] = None,
+        scope: Optional[str] = None
+    ) -> httpx.Response:
+        key = self.cache_key(url, headers, params, scope)
+        entry = await self.store.aget(key)
+        request = client.build_request("GET", url, headers=headers, params=params)
+
+        if entry is not None and time.time() - entry.stored_at < self.fresh_for:
+            self.hits += 1
+            return self._to_response(request, entry.value, entry.meta)
+
+        if entry is not None:
+            validators = entry.meta.get("headers", {})
+            if "etag" in validators:
+                request.headers["If-None-Match"] = validators["etag"]
+            if "last-modified" in validators:
+                request.headers["If-Modified-Since"] = validators["last-modified"]
+
+        response = await client.send(request)
+
+        if response.status_code == 304 and entry is not None:
+            self.revalidations += 1
+            await self.store.atouch(key)
+            return self._to_response(request, entry.value, entry.meta)
+
+        self.misses += 1
+        if response.status_code == 200:
+            kept = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+            await self.store.aset(key, response.content, {"headers": kept})
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.revalidations + self.misses
+        return {
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.revalidations) / total, 3) if total else 0.0,
+            "store": self.store.stats(),
+        }
+
+def create_response_cache() -> Optional[GitHubResponseCache]:
+    """
+    Builds the cache from the environment.
+    GITHUB_CACHE_BACKEND: 'memory' (default), 'tiered' (in-process LRU over SQLite shared by the
+    host's workers), 'sqlite' or 'none'.
+    """
+    backend = os.getenv("GITHUB_CACHE_BACKEND", "memory").lower()
+    store = create_store(
+        backend,
+        namespace="github",
+        path=os.getenv("GITHUB_CACHE_PATH", ".cache/github_cache.sqlite3"),
+        max_entries=int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", 5000)),
+        max_bytes=int(os.getenv("GITHUB_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        ttl=float(os.getenv("GITHUB_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+    )
+    if store is None:
+        return None
+
+    print(f"✅ GitHub response cache enabled ({backend}).")
+    return GitHubResponseCache(store, fresh_for=float(os.getenv("GITHUB_CACHE_FRESH_SECONDS", 60)))
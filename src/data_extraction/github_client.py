@@ -0,0 +1,221 @@
+import os
+import logging
+import httpx
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional, Dict, Any, AsyncIterator
+from src.data_extraction.github_cache import GitHubResponseCache, create_response_cache
+from src.data_extraction.rate_limit import get_token_pool
+from src.observability.metrics import GITHUB_RATE_LIMITED, GITHUB_REQUESTS, span
+
+logger = logging.getLogger(__name__)
+
+# Default GitHub API Base URL (override with GITHUB_API_BASE for GHE or local stubs)
+DEFAULT_GITHUB_API_BASE = "https://api.github.com"
+
+# Global shared client (owned by the FastAPI lifespan in src/main.py)
+_client: Optional[httpx.AsyncClient] = None
+
+# Conditional-request cache sitting under every GitHub GET (None = disabled)
+_response_cache: Optional[GitHubResponseCache] = None
+_response_cache_ready = False
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+def _http2_enabled() -> bool:
+    """
+    HTTP/2 lets concurrent calls multiplex over one connection per host.
+    It needs the optional 'h2' package (httpx[http2]); we fall back to HTTP/1.1 without it.
+    """
+    if os.getenv("GITHUB_HTTP2", "true").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("⚠️ WARNING: GITHUB_HTTP2 is on but 'h2' is not installed. Using HTTP/1.1.")
+        return False
+
+def create_github_client(
+    limits: Optional[httpx.Limits] = None,
+    http2: Optional[bool] = None
+) -> httpx.AsyncClient:
+    """
+    Builds a pooled AsyncClient for the GitHub API.
+    Pool limits and timeouts are read from the environment so they can be tuned per deployment.
+    """
+    if limits is None:
+        limits = httpx.Limits(
+            max_connections=_env_int("GITHUB_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=_env_int("GITHUB_MAX_KEEPALIVE_CONNECTIONS", 20),
+            keepalive_expiry=_env_float("GITHUB_KEEPALIVE_EXPIRY", 30.0),
+        )
+
+    timeout = httpx.Timeout(
+        _env_float("GITHUB_READ_TIMEOUT", 20.0),
+        connect=_env_float("GITHUB_CONNECT_TIMEOUT", 5.0),
+        pool=_env_float("GITHUB_POOL_TIMEOUT", 10.0),
+    )
+
+    return httpx.AsyncClient(
+        base_url=os.getenv("GITHUB_API_BASE", DEFAULT_GITHUB_API_BASE).rstrip("/"),
+        limits=limits,
+        timeout=timeout,
+        http2=_http2_enabled() if http2 is None else http2,
+    )
+
+async def init_github_client(client: Optional[httpx.AsyncClient] = None) -> httpx.AsyncClient:
+    """
+    Creates the application-scoped client. Called once from the app lifespan.
+    A pre-built client can be passed in (benchmarks, local stubs).
+    """
+    global _client, _response_cache, _response_cache_ready
+
+    if _client is not None and _client is not client:
+        await _client.aclose()
+
+    _client = client or create_github_client()
+    _response_cache = create_response_cache()
+    _response_cache_ready = True
+    print(f"✅ GitHub client ready ({_client.base_url}).")
+    return _client
+
+async def close_github_client():
+    """
+    Closes the shared client and its connection pool. Called on app shutdown.
+    """
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_github_client() -> httpx.AsyncClient:
+    """
+    Returns the shared client. Scripts that run outside the FastAPI lifespan
+    get a lazily created one so the extractors stay usable on their own.
+    """
+    global _client
+
+    if _client is None:
+        _client = create_github_client()
+    return _client
+
+def get_response_cache() -> Optional[GitHubResponseCache]:
+    """
+    Returns the GitHub response cache (None when GITHUB_CACHE_BACKEND=none).
+    """
+    global _response_cache, _response_cache_ready
+
+    if not _response_cache_ready:
+        _response_cache = create_response_cache()
+        _response_cache_ready = True
+    return _response_cache
+
+def _record(pool, token: Optional[str], response: httpx.Response, resource: str) -> Optional[float]:
+    # Quota bookkeeping (see TokenPool.record) plus the request/rate-limit counters
+    GITHUB_REQUESTS.labels(resource, str(response.status_code)).inc()
+    backoff = pool.record(token, response, resource)
+    if backoff is not None:
+        GITHUB_RATE_LIMITED.labels(resource).inc()
+    return backoff
+
+async def github_get(
+    path: str,
+    token: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> httpx.Response:
+    """
+    GET against the GitHub API through the shared client and the response cache.
+    'token' is the caller's own PAT; None sends the call with a server token from the
+    pool (see rate_limit.py), retrying on another one if GitHub rate-limits it.
+    'headers' are merged over the token's default header set (e.g. a custom Accept).
+    """
+    pool = get_token_pool()
+    cache = get_response_cache()
+    for attempt in range(pool.max_retries + 1):
+        chosen = await pool.acquire(token, "core")
+        request_headers = github_headers(chosen)
+        if headers:
+            request_headers = {**request_headers, **headers}
+        try:
+            with span("github.core"):
+                if cache is None:
+                    response = await get_github_client().get(path, headers=request_headers, params=params)
+                else:
+                    # Pooled tokens all see the same public data, so they share cache entries
+                    scope = "server" if token is None else None
+                    response = await cache.get(get_github_client(), path, request_headers, params, scope=scope)
+        finally:
+            pool.release(chosen, "core")
+
+        backoff = _record(pool, chosen, response, "core")
+        if backoff is None or attempt == pool.max_retries:
+            return response
+        logger.debug("Rate limited on %s (%d). Retrying (backoff %.0fs).", path, response.status_code, backoff)
+
+@asynccontextmanager
+async def github_stream(
+    path: str,
+    token: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[httpx.Response]:
+    """
+    Streaming GET (async context manager) for large bodies that must not be buffered whole.
+    Bypasses the response cache; the token is picked like github_get's (no retry).
+    """
+    pool = get_token_pool()
+    chosen = await pool.acquire(token, "core")
+    try:
+        with span("github.core"):
+            async with get_github_client().stream("GET", path, headers=github_headers(chosen), params=params) as response:
+                _record(pool, chosen, response, "core")
+                yield response
+    finally:
+        pool.release(chosen, "core")
+
+async def github_graphql(
+    query: str,
+    variables: Optional[Dict[str, Any]] = None,
+    token: Optional[str] = None
+) -> httpx.Response:
+    """
+    POST a query to the GitHub GraphQL API through the shared client (not cached).
+    GraphQL always requires a token (the caller's, or a pooled server token).
+    """
+    pool = get_token_pool()
+    for attempt in range(pool.max_retries + 1):
+        chosen = await pool.acquire(token, "graphql")
+        try:
+            with span("github.graphql"):
+                response = await get_github_client().post(
+                    "/graphql",
+                    json={"query": query, "variables": variables or {}},
+                    headers=github_headers(chosen)
+                )
+        finally:
+            pool.release(chosen, "graphql")
+
+        backoff = _record(pool, chosen, response, "graphql")
+        if backoff is None or attempt == pool.max_retries:
+            return response
+        logger.debug("GraphQL rate limited (%d). Retrying (backoff %.0fs).", response.status_code, backoff)
+
+@lru_cache(maxsize=64)
+def github_headers(token: Optional[str] = None) -> Dict[str, str]:
+    """
+    Returns the request headers for a given token (None = unauthenticated).
+    Header sets are built once per token and reused; treat the result as read-only.
+    """
+    headers = {
+        "Accept": "application/vnd.github.v3+json",
+        "User-Agent": "Commit-Card-App"
+    }
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
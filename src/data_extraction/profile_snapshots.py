@@ -0,0 +1,71 @@
+import os
+from typing import Optional, Dict, Any
+from src.cache import serialization
+from src.cache.stores import CacheStore, create_store
+
+# Bump when the snapshot layout changes; older snapshots are then ignored (full rescan)
+SNAPSHOT_VERSION = 1
+
+class ProfileSnapshotStore:
+    """
+    Persisted per-developer aggregates behind deep profiles (see git_extractor.extract_deep_profile).
+
+    A snapshot holds the raw per-repo data (language bytes, size, stars, topics, pushed_at),
+    authored commit counts and a 'last_synced' watermark: the newest pushed_at / event time
+    seen. Later profiles only re-fetch what changed after the watermark and merge it in.
+    """
+
+    def __init__(self, store: CacheStore):
+        self.store = store
+        self.full_scans = 0
+        self.incremental = 0
+
+    @staticmethod
+    def _key(git_id: str) -> str:
+        return git_id.lower()
+
+    async def get(self, git_id: str) -> Optional[Dict[str, Any]]:
+        entry = await self.store.aget(self._key(git_id))
+        if entry is None:
+            return None
+        snapshot = serialization.loads(entry.value)
+        return snapshot if snapshot and snapshot.get("version") == SNAPSHOT_VERSION else None
+
+    async def set(self, git_id: str, snapshot: Dict[str, Any]):
+        snapshot["version"] = SNAPSHOT_VERSION
+        await self.store.aset(self._key(git_id), serialization.dumps(snapshot))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"full_scans": self.full_scans, "incremental": self.incremental, "store": self.store.stats()}
+
+def create_profile_store() -> Optional[ProfileSnapshotStore]:
+    """
+    Builds the snapshot store from the environment.
+    PROFILE_SNAPSHOT_BACKEND: 'tiered' (default; in-process LRU over SQLite shared by the host's workers,
+    survives restarts), 'sqlite', 'memory' or 'none'.
+    """
+    backend = os.getenv("PROFILE_SNAPSHOT_BACKEND", "tiered").lower()
+    store = create_store(
+        backend,
+        namespace="profiles",
+        path=os.getenv("PROFILE_SNAPSHOT_PATH", ".cache/profile_snapshots.sqlite3"),
+        max_entries=int(os.getenv("PROFILE_SNAPSHOT_MAX_ENTRIES", 10000)),
+        max_bytes=int(os.getenv("PROFILE_SNAPSHOT_MAX_BYTES", 64 * 1024 * 1024))
+    )
+    if store is None:
+        return None
+
+    print(f"✅ Developer profile snapshots enabled ({backend}).")
+    return ProfileSnapshotStore(store)
+
+# Shared store (created on first use)
+_profile_store: Optional[ProfileSnapshotStore] = None
+_profile_store_ready = False
+
+def get_profile_store() -> Optional[ProfileSnapshotStore]:
+    global _profile_store, _profile_store_ready
+
+    if not _profile_store_ready:
+        _profile_store = create_profile_store()
+        _profile_store_ready = True
+    return _profile_store
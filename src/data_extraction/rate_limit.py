@@ -0,0 +1,309 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple
+import httpx
+from src.observability.metrics import GITHUB_ADMISSION_REJECTED, span
+
+logger = logging.getLogger(__name__)
+
+# Quota assumed for a token until GitHub has told us otherwise (per hourly window)
+DEFAULT_LIMITS = {"core": 5000, "graphql": 5000}
+UNAUTHENTICATED_LIMIT = 60
+
+# GitHub asks clients to back off at least a minute on a secondary limit without Retry-After
+SECONDARY_LIMIT_WAIT = 60.0
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when GitHub quota will not be available within GITHUB_MAX_RATE_WAIT_SECONDS.
+    'retry_after' is the number of seconds until it should be (surfaced as HTTP 429).
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+@dataclass
+class TokenQuota:
+    """Last known state of one token's rate-limit window for one resource ('core', 'graphql')."""
+    limit: int
+    remaining: int
+    reset: float = 0.0          # Epoch seconds when the window resets (0 = unknown)
+    paused_until: float = 0.0   # Set by Retry-After / secondary limits
+    in_flight: int = 0          # Requests sent whose headers have not come back yet
+    requests: int = 0
+
+    def headroom(self, now: float) -> int:
+        remaining = self.limit if self.reset and self.reset <= now else self.remaining
+        return remaining - self.in_flight
+
+    def available_in(self, now: float) -> float:
+        """Seconds until this token can take a request again (0 = now)."""
+        if self.paused_until > now:
+            return self.paused_until - now
+        if self.headroom(now) > 0:
+            return 0.0
+        return max(self.reset - now, 1.0) if self.reset else SECONDARY_LIMIT_WAIT
+
+# Reservation of the request the current report/job was admitted with (see TokenPool.admit)
+_current_reservation: contextvars.ContextVar[Optional["Reservation"]] = contextvars.ContextVar(
+    "github_reservation", default=None
+)
+
+class Reservation:
+    """
+    Quota set aside for an admitted report. Calls made while it is active draw it down;
+    whatever is left is handed back on exit. Use as a context manager around the work.
+    """
+
+    def __init__(self, pool: "TokenPool", cost: Dict[str, int]):
+        self.pool = pool
+        self.left = dict(cost)
+        self._token = None
+
+    def spend(self, resource: str):
+        if self.left.get(resource, 0) > 0:
+            self.left[resource] -= 1
+            self.pool.reserved[resource] -= 1
+
+    def release(self):
+        for resource, count in self.left.items():
+            self.pool.reserved[resource] -= count
+        self.left = {}
+
+    def __enter__(self) -> "Reservation":
+        self._token = _current_reservation.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        try:
+            _current_reservation.reset(self._token)
+        except ValueError:
+            pass # Exited from another context (e.g. a stream closed by a different task)
+
+class TokenPool:
+    """
+    Schedules GitHub calls across a pool of server tokens (GITHUB_TOKENS).
+
+    - Quota is tracked per token and resource from the X-RateLimit-* response headers.
+    - Each call goes to the token with the most headroom; when every token is spent or
+      paused the call waits for the earliest reset, up to 'max_wait' seconds, then fails.
+    - 403/429 responses carrying Retry-After, an exhausted window or a secondary-limit
+      message pause the token and the call is retried on another one.
+    - admit() refuses a report up front when its estimated cost will not fit in time.
+    A caller's own token (auth_token) is never pooled, but its limits are honored the same way.
+    """
+
+    def __init__(self, tokens: List[str], reserve: int = 50, max_wait: float = 60.0, max_retries: int = 2):
+        self.tokens: List[Optional[str]] = list(dict.fromkeys(tokens)) or [None]
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.reserved: Dict[str, int] = {resource: 0 for resource in DEFAULT_LIMITS}
+        self._quotas: Dict[Tuple[Optional[str], str], TokenQuota] = {}
+        self.rejected = 0
+
+    @property
+    def authenticated(self) -> bool:
+        return self.tokens != [None]
+
+    def _quota(self, token: Optional[str], resource: str) -> TokenQuota:
+        quota = self._quotas.get((token, resource))
+        if quota is None:
+            if len(self._quotas) > 10000:
+                self._prune()
+            limit = DEFAULT_LIMITS.get(resource, DEFAULT_LIMITS["core"]) if token else UNAUTHENTICATED_LIMIT
+            quota = self._quotas[(token, resource)] = TokenQuota(limit=limit, remaining=limit)
+        return quota
+
+    def _prune(self):
+        # Callers' tokens come and go; forget the ones whose window is over and that are idle
+        now = time.time()
+        for key, quota in list(self._quotas.items()):
+            if key[0] not in self.tokens and quota.in_flight == 0 and max(quota.reset, quota.paused_until) < now:
+                del self._quotas[key]
+
+    def _pick(self, candidates: List[Optional[str]], resource: str) -> Tuple[Optional[str], float]:
+        now = time.time()
+        best, best_headroom, wait = None, 0, float("inf")
+        for token in candidates:
+            quota = self._quota(token, resource)
+            available_in = quota.available_in(now)
+            if available_in == 0 and quota.headroom(now) > best_headroom:
+                best, best_headroom = token, quota.headroom(now)
+            wait = min(wait, available_in)
+        return best, (0.0 if best_headroom else wait)
+
+    async def acquire(self, token: Optional[str] = None, resource: str = "core") -> Optional[str]:
+        """
+        Returns the token to send a call with: 'token' itself if the caller brought one,
+        otherwise the pooled token with the most headroom. Waits while none has quota.
+        """
+        candidates = [token] if token else self.tokens
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            chosen, wait = self._pick(candidates, resource)
+            if wait == 0:
+                quota = self._quota(chosen, resource)
+                quota.in_flight += 1
+                quota.requests += 1
+                return chosen
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(f"GitHub {resource} rate limit exhausted (available again in {wait:.0f}s).", wait)
+            logger.debug("No GitHub %s quota left. Waiting %.1fs.", resource, wait)
+            with span("github.quota_wait"):
+                await asyncio.sleep(wait)
+
+    def release(self, token: Optional[str], resource: str = "core"):
+        quota = self._quota(token, resource)
+        quota.in_flight = max(0, quota.in_flight - 1)
+        if token is None or token in self.tokens:
+            reservation = _current_reservation.get()
+            if reservation is not None:
+                reservation.spend(resource)
+
+    def record(self, token: Optional[str], response: httpx.Response, resource: str = "core") -> Optional[float]:
+        """
+        Updates the token's quota from a response. Returns the seconds to back off if the
+        response was a rate-limit rejection (the call should be retried), otherwise None.
+        """
+        headers = response.headers
+        quota = self._quota(token, headers.get("x-ratelimit-resource", resource))
+        if "x-ratelimit-remaining" in headers:
+            quota.limit = int(headers.get("x-ratelimit-limit", quota.limit))
+            quota.remaining = int(headers["x-ratelimit-remaining"])
+            quota.reset = float(headers.get("x-ratelimit-reset", quota.reset))
+
+        if response.status_code not in (403, 429):
+            return None
+        now = time.time()
+        if "retry-after" in headers:
+            wait = float(headers["retry-after"])
+        elif headers.get("x-ratelimit-remaining") == "0":
+            wait = max(quota.reset - now, 1.0)
+        elif "rate limit" in _body_text(response).lower():
+            wait = SECONDARY_LIMIT_WAIT
+        else:
+            return None # An ordinary 403 (permissions); nothing to back off from
+        quota.paused_until = max(quota.paused_until, now + wait)
+        return wait
+
+    def headroom(self, resource: str = "core") -> int:
+        now = time.time()
+        return sum(max(0, self._quota(token, resource).headroom(now)) for token in self.tokens)
+
+    def kept_free(self, resource: str = "core") -> int:
+        """
+        Requests admission leaves untouched: GITHUB_RATE_LIMIT_RESERVE, capped at a tenth of
+        the pool's hourly limit so a small bucket (60 unauthenticated) still admits reports.
+        """
+        limit = sum(self._quota(token, resource).limit for token in self.tokens)
+        return min(self.reserve, limit // 10)
+
+    def admit(self, cost: Dict[str, int]) -> Reservation:
+        """
+        Reserves 'cost' requests per resource for a report (or batch) about to start.
+        Raises RateLimitExceeded when the pool cannot cover it, on top of what is already
+        reserved and kept free, before the earliest window reset is due within 'max_wait'.
+        """
+        now = time.time()
+        for resource, needed in cost.items():
+            if not needed:
+                continue
+            available = self.headroom(resource) - self.reserved.get(resource, 0) - self.kept_free(resource)
+            if needed <= available:
+                continue
+            # Only a window reset or an expiring pause frees quota; with none ahead, waiting won't help
+            freed_at = [max(q.paused_until, q.reset) for q in (self._quota(t, resource) for t in self.tokens)]
+            upcoming = [at for at in freed_at if at > now]
+            wait = min(upcoming) - now if upcoming else 3600.0
+            if wait > self.max_wait:
+                self.rejected += 1
+                GITHUB_ADMISSION_REJECTED.inc()
+                raise RateLimitExceeded(
+                    f"GitHub {resource} quota too low for this request ({max(available, 0)} of {needed} available).", wait
+                )
+        for resource, needed in cost.items():
+            self.reserved[resource] = self.reserved.get(resource, 0) + needed
+        return Reservation(self, cost)
+
+    def pick(self) -> Optional[str]:
+        """Best pooled token right now without reserving it (for git clones and the like)."""
+        chosen, _ = self._pick(self.tokens, "core")
+        return chosen if chosen is not None else self.tokens[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-token quota gauges. Tokens are identified by a short hash, never in clear text."""
+        now = time.time()
+        tokens = []
+        for token in self.tokens:
+            for resource in DEFAULT_LIMITS:
+                quota = self._quota(token, resource)
+                tokens.append({
+                    "token": token_label(token),
+                    "resource": resource,
+                    "limit": quota.limit,
+                    "remaining": max(0, quota.headroom(now) + quota.in_flight),
+                    "in_flight": quota.in_flight,
+                    "reset_in": max(0, round(quota.reset - now)) if quota.reset else None,
+                    "paused_for": max(0, round(quota.paused_until - now)),
+                    "requests": quota.requests,
+                })
+        return {"tokens": tokens, "reserved": dict(self.reserved), "rejected": self.rejected}
+
+def token_label(token: Optional[str]) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()[:8] if token else "unauthenticated"
+
+def _body_text(response: httpx.Response) -> str:
+    try:
+        return response.text
+    except httpx.ResponseNotRead:
+        return "" # Streamed response; only the headers are available
+
+def _server_tokens() -> List[str]:
+    """GITHUB_TOKENS (comma-separated), plus GITHUB_TOKEN for single-token setups."""
+    tokens = [t.strip() for t in os.getenv("GITHUB_TOKENS", "").split(",") if t.strip()]
+    if os.getenv("GITHUB_TOKEN"):
+        tokens.append(os.getenv("GITHUB_TOKEN"))
+    return tokens
+
+def estimate_report_cost(candidates: int = 1, repos: int = 1, profile_mode: str = "fast") -> Dict[str, int]:
+    """
+    Upper-bound GitHub calls for extracting 'candidates' profiles and 'repos' repo contexts:
+    a fast profile is user + repos (a deep one is capped by PROFILE_DEEP_MAX_REQUESTS, one of
+    them GraphQL), a repo is HEAD lookup + languages + tree plus up to CHURN_MAX_REQUESTS
+    GraphQL pages. GraphQL needs a token, so without server tokens it costs nothing (churn
+    and commit weighting are skipped). Cached responses and the repo index make the real
+    cost lower.
+    """
+    if profile_mode == "deep":
+        profile_cost = {"core": int(os.getenv("PROFILE_DEEP_MAX_REQUESTS", 60)) - 1, "graphql": 1}
+    else:
+        profile_cost = {"core": 2, "graphql": 0}
+    graphql = profile_cost["graphql"] * candidates + int(os.getenv("CHURN_MAX_REQUESTS", 3)) * repos
+    return {
+        "core": profile_cost["core"] * candidates + 3 * repos,
+        "graphql": graphql if get_token_pool().authenticated else 0,
+    }
+
+# Shared pool (created on first use)
+_pool: Optional[TokenPool] = None
+
+def get_token_pool() -> TokenPool:
+    global _pool
+
+    if _pool is None:
+        _pool = TokenPool(
+            _server_tokens(),
+            reserve=int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", 50)),
+            max_wait=float(os.getenv("GITHUB_MAX_RATE_WAIT_SECONDS", 60)),
+            max_retries=int(os.getenv("GITHUB_RATE_LIMIT_RETRIES", 2))
+        )
+        print(f"✅ GitHub token pool ready ({len(_pool.tokens) if _pool.authenticated else 0} server tokens).")
+    return _pool
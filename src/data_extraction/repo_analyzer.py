@@ -1,16 +1,67 @@
 import os
-import httpx
-from collections import Counter
-from typing import Optional, List, Dict, Any
+import logging
+import time
+import asyncio
+import contextlib
+from typing import Optional, List, Dict, Any, Set, Tuple
 from urllib.parse import urlparse
 from src.models import CodebaseContextSummary
+from src.data_extraction.github_client import github_get
+from src.data_extraction.churn import ChurnResult, compute_file_churn
+from src.data_extraction.clone_analyzer import analyze_repo_with_clone
+from src.data_extraction.repo_index import RepoIndex, get_repo_index
+from src.data_extraction.tree_analyzer import fetch_tree_index, rank_hotspots
 
-GITHUB_API_BASE = "https://api.github.com"
+logger = logging.getLogger(__name__)
+
+# Pull request numbers kept per index entry (to count each PR once across updates)
+INDEX_MAX_PULL_REQUESTS = 1000
+
+async def _default_branch_head(full_repo_name: str, token: Optional[str]) -> Tuple[int, Optional[str]]:
+    """
+    The default branch's HEAD SHA in one cheap call: the 'sha' media type returns just the
+    40 characters, and an unchanged ref revalidates with a 304 through the response cache.
+    """
+    resp = await github_get(
+        f"/repos/{full_repo_name}/commits/HEAD", token=token, headers={"Accept": "application/vnd.github.sha"}
+    )
+    return resp.status_code, (resp.text.strip() if resp.status_code == 200 else None)
+
+async def _indexed_churn(
+    owner: str,
+    repo_name: str,
+    token: Optional[str],
+    indexed: Optional[Dict[str, Any]]
+) -> Tuple[Optional[ChurnResult], Set[int], bool]:
+    """
+    Churn for an indexed repo whose HEAD moved: walks only the commits after the indexed
+    one and merges them into the stored aggregates. Falls back to a full recompute when
+    there is no usable entry, after REPO_INDEX_MAX_UPDATES merges in a row, or when the
+    indexed commit is no longer within reach (force push, or too many new commits).
+    Returns (churn, pull requests counted, whether it was incremental).
+    """
+    max_updates = int(os.getenv("REPO_INDEX_MAX_UPDATES", 50))
+    if indexed and indexed.get("churn") and indexed.get("updates", 0) < max_updates:
+        seen = set(indexed.get("pull_requests", []))
+        newer = await compute_file_churn(
+            owner, repo_name, token, stop_at=indexed["churn"]["head_sha"], seen_pull_requests=seen
+        )
+        if newer is not None and newer.reached_stop:
+            churn = ChurnResult.from_dict(indexed["churn"])
+            churn.merge_newer(newer, float(os.getenv("CHURN_HALF_LIFE_DAYS", 30)))
+            return churn, seen, True
+        print(f"⚠️ [RepoAnalyzer] Indexed commit of {owner}/{repo_name} not found in recent history. Recomputing churn.")
+
+    seen = set()
+    return await compute_file_churn(owner, repo_name, token, seen_pull_requests=seen), seen, False
 
 async def analyze_repo_context(repo_url: str, auth_token: Optional[str] = None) -> Optional[CodebaseContextSummary]:
     """
     Analyzes a target repository to understand its stack and hotspots.
-    Uses GitHub API to avoid heavy cloning operations.
+    Uses GitHub API to avoid heavy cloning operations by default.
+    REPO_ANALYSIS_BACKEND=clone reads history from a cached partial clone instead.
+    Results are kept in the repo index (see repo_index.py) under the default-branch HEAD SHA:
+    an unchanged repo costs one ref lookup, a moved one only the commits since.
     """
     
     # 1. Parse URL to get 'owner/repo'
@@ -26,93 +77,147 @@ async def analyze_repo_context(repo_url: str, auth_token: Optional[str] = None)
         print(f"❌ Error parsing URL {repo_url}: {e}")
         return None
 
-    # 2. Setup Headers (Prioritize User Token, fallback to Server Token)
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "User-Agent": "Commit-Card-App"
-    }
-    
+    # 2. Pick the Token (Prioritize User Token, fallback to Server Token)
     # Use the hiring manager's token if provided (access to private repos),
-    # otherwise use our backend's token (public repos only).
-    token_to_use = auth_token if auth_token else os.getenv("GITHUB_TOKEN")
-    if token_to_use:
-        headers["Authorization"] = f"Bearer {token_to_use}"
-
-    print(f"🔍 [RepoAnalyzer] Analyzing {full_repo_name}...")
-
-    async with httpx.AsyncClient() as client:
-        try:
-            # --- Step A: Get Languages ---
-            lang_resp = await client.get(f"{GITHUB_API_BASE}/repos/{full_repo_name}/languages", headers=headers)
-            
-            if lang_resp.status_code == 404:
+    # otherwise (None) each call uses a pooled backend token (public repos only).
+    token_to_use = auth_token
+
+    backend = os.getenv("REPO_ANALYSIS_BACKEND", "api").lower()
+
+    index = get_repo_index()
+    index_key = RepoIndex.key(full_repo_name, auth_token)
+
+    logger.info("Analyzing %s (%s)...", full_repo_name, backend)
+
+    # Holds the index fill lease (if taken) until the new entry is stored
+    leases = contextlib.AsyncExitStack()
+    try:
+        # --- Index lookup: has the default branch moved since the repo was last analyzed? ---
+        head_sha = None
+        indexed = None
+        if index is not None:
+            head_status, head_sha = await _default_branch_head(full_repo_name, token_to_use)
+            if head_status == 404:
                 print(f"❌ Repo {full_repo_name} not found or private (access denied).")
                 return None
-            elif lang_resp.status_code != 200:
-                print(f"❌ Repo API Error: {lang_resp.text}")
-                return None
+            # Anything else without a SHA (e.g. 409 for an empty repo) is analyzed unindexed
+            indexed = await index.get(index_key) if head_sha else None
+            if indexed and indexed.get("backend") != backend:
+                indexed = None
+            if indexed and indexed["head_sha"] == head_sha:
+                index.hits += 1
+                logger.debug("%s unchanged at %s. Served from the repo index.", full_repo_name, head_sha[:7])
+                return CodebaseContextSummary(**indexed["context"])
+            if head_sha:
+                # Another worker may be indexing this HEAD right now; wait for its entry instead of redoing it
+                filled = await leases.enter_async_context(index.fill(index_key, head_sha))
+                if filled and filled.get("backend") == backend:
+                    index.hits += 1
+                    logger.debug("%s indexed at %s by another worker.", full_repo_name, head_sha[:7])
+                    return CodebaseContextSummary(**filled["context"])
 
-            raw_langs = lang_resp.json()
-            total_bytes = sum(raw_langs.values())
-            
-            # Convert bytes to percentage
-            languages = []
-            for lang, bytes_count in raw_langs.items():
-                percentage = round((bytes_count / total_bytes) * 100, 1)
-                if percentage > 1.0: # Filter out trace languages
-                    languages.append({"name": lang, "share": f"{percentage}%"})
-
-            # --- Step B: Identify High Churn Files ---
-            # We fetch the last 100 commits to see which files are changing frequently.
-            commits_resp = await client.get(
-                f"{GITHUB_API_BASE}/repos/{full_repo_name}/commits", 
-                headers=headers, 
-                params={"per_page": 50} # Analyze last 50 commits for speed
+        # --- Step A: Get Languages (history and file tree are analyzed concurrently for Steps B/C) ---
+        languages_request = github_get(f"/repos/{full_repo_name}/languages", token=token_to_use)
+        seen_pull_requests: Set[int] = set()
+        incremental = False
+        clone_analysis = None
+        tree_index = None
+        if backend == "clone":
+            lang_resp, clone_analysis = await asyncio.gather(
+                languages_request, analyze_repo_with_clone(repo_url, token_to_use)
             )
-            
-            file_churn_counter = Counter()
-            
-            if commits_resp.status_code == 200:
-                commits = commits_resp.json()
-                for commit in commits:
-                    # We need to fetch details for each commit to get the file list
-                    # Note: In production, this can eat rate limits. 
-                    # Optimization: Use GraphQL API in future to get this in one query.
-                    sha = commit['sha']
-                    # We skip detailed fetch for this MVP to save rate limits
-                    # instead rely on 'files' if available or skip. 
-                    # A robust implementation would use GraphQL here.
-                    pass 
-                
-                # Fallback for MVP: 
-                # Since REST commit listing doesn't show filenames without fetching each individual commit,
-                # we will use a heuristic or simulate the "Hotspot" based on the Languages for now to save API calls.
-                # In a real deployed app, you'd use the GraphQL API to get `history(first: 50) { nodes { changedFiles } }`.
-                
-                # Mocking the calculation for MVP stability within Rate Limits:
-                high_churn_files = [
-                    f"src/main.{languages[0]['name'].lower()}" if languages else "src/main",
-                    "README.md",
-                    "config/settings.yaml"
-                ]
-            else:
-                high_churn_files = ["Unable to analyze commit history due to access limits."]
+            churn = clone_analysis.churn if clone_analysis else None
+        else:
+            # Languages and file sizes cannot be derived from commit metadata, so both are
+            # re-read at the new HEAD; history is the part that grows and is merged incrementally
+            lang_resp, (churn, seen_pull_requests, incremental), tree_index = await asyncio.gather(
+                languages_request,
+                _indexed_churn(owner, repo_name, token_to_use, indexed),
+                fetch_tree_index(full_repo_name, token_to_use, ref=head_sha or "HEAD")
+            )
+        
+        if lang_resp.status_code == 404:
+            print(f"❌ Repo {full_repo_name} not found or private (access denied).")
+            return None
+        elif lang_resp.status_code != 200:
+            print(f"❌ Repo API Error: {lang_resp.text}")
+            return None
+
+        raw_langs = lang_resp.json()
+        total_bytes = sum(raw_langs.values())
+        
+        # Convert bytes to percentage
+        languages = []
+        for lang, bytes_count in raw_langs.items():
+            percentage = round((bytes_count / total_bytes) * 100, 1)
+            if percentage > 1.0: # Filter out trace languages
+                languages.append({"name": lang, "share": f"{percentage}%"})
 
-            # --- Step C: Complexity Hotspots (Heuristic) ---
-            # In a non-cloning environment, large files are often proxies for complexity.
-            # We fetch the file tree.
-            complexity_hotspots = []
-            # (Skipped for MVP to keep response time fast - logic would go here)
+        # --- Step B: Identify High Churn Files ---
+        # Ranked by recency-weighted change frequency over recent default-branch history
+        # (see src/data_extraction/churn.py and clone_analyzer.py).
+        top_n = int(os.getenv("CHURN_TOP_FILES", 10))
+        if churn is None:
+            high_churn_files = ["Unable to analyze commit history due to access limits."]
+        elif not churn.files:
+            high_churn_files = ["No pull request history available to measure churn."]
+        else:
+            high_churn_files = [f.path for f in churn.top(top_n)]
+
+        # --- Step C: Complexity Hotspots (Heuristic) ---
+        # Large, frequently changed files are often proxies for complexity.
+        # API mode scores the recursive file tree (size, depth, fan-out, churn; see tree_analyzer.py).
+        complexity_hotspots = []
+        if clone_analysis and clone_analysis.hotspots:
+            complexity_hotspots = [f"{path} ({lines} lines)" for path, lines in clone_analysis.hotspots[:top_n]]
+        elif tree_index is not None:
+            complexity_hotspots = rank_hotspots(tree_index, churn, top_n)
+        else:
             complexity_hotspots.append("Analysis limited without cloning. Assuming standard architecture.")
 
-            print(f"✅ [RepoAnalyzer] Success for {full_repo_name}")
-            
-            return CodebaseContextSummary(
-                languages=languages,
-                high_churn_files=high_churn_files,
-                complexity_hotspots=complexity_hotspots
-            )
+        logger.info("Success for %s", full_repo_name)
+        
+        summary = CodebaseContextSummary(
+            languages=languages,
+            high_churn_files=high_churn_files,
+            complexity_hotspots=complexity_hotspots
+        )
+
+        if index is not None and head_sha:
+            if incremental:
+                index.incremental += 1
+            else:
+                index.rebuilds += 1
+            await index.set(index_key, {
+                "head_sha": head_sha,
+                "backend": backend,
+                "context": summary.model_dump(),
+                # Clones keep their own history; only API-mode churn is merged incrementally
+                "churn": churn.to_dict() if churn is not None and backend != "clone" else None,
+                "pull_requests": sorted(seen_pull_requests)[-INDEX_MAX_PULL_REQUESTS:],
+                "updates": indexed.get("updates", 0) + 1 if incremental else 0,
+                "indexed_at": time.time(),
+            })
+        return summary
+
+    except Exception as e:
+        print(f"❌ [RepoAnalyzer] Exception: {e}")
+        return None
+    finally:
+        await leases.aclose()
+
+async def prewarm_repo_index(repo_urls: List[str]):
+    """
+    Analyzes 'repo_urls' (REPO_INDEX_PREWARM) into the repo index in the background at startup,
+    REPO_INDEX_PREWARM_CONCURRENCY at a time, so their first reports only pay the ref lookup.
+    """
+    semaphore = asyncio.Semaphore(int(os.getenv("REPO_INDEX_PREWARM_CONCURRENCY", 4)))
+
+    async def warm(repo_url: str) -> bool:
+        async with semaphore:
+            return await analyze_repo_context(repo_url) is not None
 
-        except Exception as e:
-            print(f"❌ [RepoAnalyzer] Exception: {e}")
-            return None
\ No newline at end of file
+    started = time.monotonic()
+    results = await asyncio.gather(*(warm(url) for url in repo_urls), return_exceptions=True)
+    warmed = sum(1 for result in results if result is True)
+    print(f"🔥 [RepoAnalyzer] Pre-warmed {warmed}/{len(repo_urls)} repos in {time.monotonic() - started:.1f}s.")
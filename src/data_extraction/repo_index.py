@@ -0,0 +1,103 @@
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator, List
+from src.cache import serialization
+from src.cache.stores import CacheEntry, CacheStore, create_store, fill_lease
+
+# Bump when the entry layout changes; older entries are then ignored (full rebuild)
+INDEX_VERSION = 1
+
+class RepoIndex:
+    """
+    Persisted repo contexts keyed by 'owner/repo' (and who may read it), tagged with the
+    default-branch HEAD SHA they were computed at (see repo_analyzer.analyze_repo_context).
+
+    An entry holds the CodebaseContextSummary, the churn aggregates behind it and the
+    pull requests already counted. When HEAD has not moved the summary is served as is;
+    when it has, only commits after the indexed SHA are walked and merged into the churn.
+    Eviction is LRU, bounded by REPO_INDEX_MAX_ENTRIES (and REPO_INDEX_MAX_BYTES in memory).
+    """
+
+    def __init__(self, store: CacheStore):
+        self.store = store
+        self.hits = 0
+        self.incremental = 0
+        self.rebuilds = 0
+
+    @staticmethod
+    def key(full_repo_name: str, token: Optional[str] = None) -> str:
+        # A caller's token may see private repos; never share its entries with anyone else
+        scope = hashlib.sha256(token.encode()).hexdigest()[:16] if token else "server"
+        return f"{full_repo_name.lower()}|{scope}"
+
+    @staticmethod
+    def _decode(entry: Optional[CacheEntry]) -> Optional[Dict[str, Any]]:
+        if entry is None:
+            return None
+        indexed = serialization.loads(entry.value)
+        return indexed if indexed and indexed.get("version") == INDEX_VERSION else None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._decode(await self.store.aget(key))
+
+    @asynccontextmanager
+    async def fill(self, key: str, head_sha: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Held while (re)indexing 'key' at 'head_sha'. Yields the entry when another worker on
+        the host indexed that same HEAD meanwhile (see fill_lease), otherwise None.
+        """
+        def at_head(entry: CacheEntry) -> bool:
+            indexed = self._decode(entry)
+            return indexed is not None and indexed.get("head_sha") == head_sha
+
+        async with fill_lease(self.store, key, ready=at_head) as entry:
+            yield self._decode(entry)
+
+    async def set(self, key: str, indexed: Dict[str, Any]):
+        indexed["version"] = INDEX_VERSION
+        await self.store.aset(key, serialization.dumps(indexed))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "incremental": self.incremental,
+            "rebuilds": self.rebuilds,
+            "store": self.store.stats(),
+        }
+
+def create_repo_index() -> Optional[RepoIndex]:
+    """
+    Builds the repo index from the environment.
+    REPO_INDEX_BACKEND: 'tiered' (default; in-process LRU over SQLite shared by the host's workers,
+    survives restarts), 'sqlite', 'memory' or 'none'.
+    """
+    backend = os.getenv("REPO_INDEX_BACKEND", "tiered").lower()
+    store = create_store(
+        backend,
+        namespace="repo_index",
+        path=os.getenv("REPO_INDEX_PATH", ".cache/repo_index.sqlite3"),
+        max_entries=int(os.getenv("REPO_INDEX_MAX_ENTRIES", 2000)),
+        max_bytes=int(os.getenv("REPO_INDEX_MAX_BYTES", 64 * 1024 * 1024))
+    )
+    if store is None:
+        return None
+
+    print(f"✅ Repo context index enabled ({backend}).")
+    return RepoIndex(store)
+
+def prewarm_repo_urls() -> List[str]:
+    """REPO_INDEX_PREWARM: comma-separated repo URLs to index at startup."""
+    return [url.strip() for url in os.getenv("REPO_INDEX_PREWARM", "").split(",") if url.strip()]
+
+# Shared index (created on first use)
+_repo_index: Optional[RepoIndex] = None
+_repo_index_ready = False
+
+def get_repo_index() -> Optional[RepoIndex]:
+    global _repo_index, _repo_index_ready
+
+    if not _repo_index_ready:
+        _repo_index = create_repo_index()
+        _repo_index_ready = True
+    return _repo_index
@@ -0,0 +1,252 @@
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+import re
+from array import array
+from typing import Optional, List, Dict, Tuple, AsyncIterator
+from src.data_extraction.churn import ChurnResult
+from src.data_extraction.github_client import github_get, github_stream
+
+logger = logging.getLogger(__name__)
+
+# Files that are big but say nothing about code complexity
+IGNORED_DIRS = ("node_modules/", "vendor/", "third_party/", "dist/", "build/", ".git/")
+IGNORED_SUFFIXES = (
+    ".lock", "-lock.json", ".min.js", ".min.css", ".map", ".svg", ".png", ".jpg", ".jpeg",
+    ".gif", ".ico", ".pdf", ".woff", ".woff2", ".ttf", ".zip", ".gz", ".jar", ".bin", ".csv",
+)
+
+DEFAULT_HOTSPOT_WEIGHTS = {"size": 1.0, "depth": 0.3, "fanout": 0.5, "churn": 2.0}
+
+_TREE_KEY = re.compile(r'"tree"\s*:\s*\[')
+_TRUNCATED_KEY = re.compile(r'"truncated"\s*:\s*(true|false)')
+_DECODER = json.JSONDecoder()
+
+class TreeIndex:
+    """
+    Compact, array-backed listing of a repository tree.
+    Directory paths are stored once; each file is a (directory id, name, size) row.
+    """
+
+    def __init__(self):
+        self.dirs: List[str] = [""]
+        self.dir_ids: Dict[str, int] = {"": 0}
+        self.fanout = array("I", [0])   # Entries (files + subdirectories) per directory
+        self.file_dirs = array("I")
+        self.file_names: List[str] = []
+        self.file_sizes = array("Q")
+        self.truncated = False
+
+    def __len__(self) -> int:
+        return len(self.file_names)
+
+    def _dir_id(self, directory: str) -> int:
+        dir_id = self.dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(directory)
+            self.dir_ids[directory] = dir_id
+            self.fanout.append(0)
+        return dir_id
+
+    def add(self, path: str, entry_type: str, size: int = 0):
+        directory, _, name = path.rpartition("/")
+        dir_id = self._dir_id(directory)
+        self.fanout[dir_id] += 1
+
+        if entry_type != "blob" or path.endswith(IGNORED_SUFFIXES) or any(d in f"/{path}" for d in IGNORED_DIRS):
+            return
+        self.file_dirs.append(dir_id)
+        self.file_names.append(name)
+        self.file_sizes.append(size)
+
+    def merge(self, other: "TreeIndex", prefix: str = ""):
+        """Adds a subtree index fetched separately, rooted at 'prefix' (e.g. 'src/')."""
+        base = prefix.rstrip("/")
+        join = lambda directory: f"{base}/{directory}" if base and directory else (base or directory)
+
+        for dir_id, directory in enumerate(other.dirs):
+            self.fanout[self._dir_id(join(directory))] += other.fanout[dir_id]
+        for dir_id, name, size in zip(other.file_dirs, other.file_names, other.file_sizes):
+            self.file_dirs.append(self._dir_id(join(other.dirs[dir_id])))
+            self.file_names.append(name)
+            self.file_sizes.append(size)
+        self.truncated = self.truncated or other.truncated
+
+    def files(self):
+        """Yields (path, directory id, size) without materializing a list."""
+        for dir_id, name, size in zip(self.file_dirs, self.file_names, self.file_sizes):
+            directory = self.dirs[dir_id]
+            yield (f"{directory}/{name}" if directory else name), dir_id, size
+
+async def parse_tree_stream(chunks: AsyncIterator[str], index: TreeIndex, max_entries: int) -> bool:
+    """
+    Incrementally parses a git/trees JSON body into 'index', one tree entry at a time.
+    Only the unparsed tail of the body is kept in memory. Returns GitHub's 'truncated' flag,
+    which may come before or after the 'tree' array.
+    """
+    buffer = ""
+    in_tree = False
+    tree_done = False
+    truncated = None
+    entries = 0
+
+    async for chunk in chunks:
+        buffer += chunk
+
+        if not in_tree and not tree_done:
+            match = _TREE_KEY.search(buffer)
+            if truncated is None:
+                flag = _TRUNCATED_KEY.search(buffer, 0, match.start() if match else len(buffer))
+                if flag:
+                    truncated = flag.group(1) == "true"
+            if not match:
+                buffer = buffer[-64:] # Enough to hold a key split across chunks
+                continue
+            buffer = buffer[match.end():]
+            in_tree = True
+
+        pos = 0
+        while in_tree:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == "]":
+                pos += 1
+                in_tree, tree_done = False, True
+                break
+            try:
+                entry, pos = _DECODER.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break # Entry split across chunks; wait for more data
+
+            if entries < max_entries:
+                index.add(entry["path"], entry["type"], entry.get("size", 0))
+                entries += 1
+            else:
+                index.truncated = True
+        buffer = buffer[pos:]
+
+        if tree_done:
+            if truncated is not None:
+                return truncated or index.truncated
+            match = _TRUNCATED_KEY.search(buffer)
+            if match:
+                return match.group(1) == "true" or index.truncated
+            buffer = buffer[-64:] # The flag is all we still need
+
+    return bool(truncated) or index.truncated
+
+async def _stream_tree(full_repo_name: str, sha: str, token: Optional[str], max_entries: int) -> Optional[Tuple[TreeIndex, bool]]:
+    index = TreeIndex()
+    async with github_stream(
+        f"/repos/{full_repo_name}/git/trees/{sha}", token=token, params={"recursive": 1}
+    ) as resp:
+        if resp.status_code != 200:
+            print(f"❌ [TreeAnalyzer] Tree API Error ({resp.status_code}) for {full_repo_name}@{sha}")
+            return None
+        truncated = await parse_tree_stream(resp.aiter_text(), index, max_entries)
+    return index, truncated
+
+async def _collect_tree(
+    full_repo_name: str,
+    sha: str,
+    prefix: str,
+    token: Optional[str],
+    index: TreeIndex,
+    split_depth: int,
+    semaphore: asyncio.Semaphore,
+    max_entries: int
+):
+    """
+    Fetches 'sha' recursively into 'index'. If GitHub truncates the listing we list this
+    level only and fetch each subdirectory recursively in parallel, down to TREE_MAX_SPLIT_DEPTH.
+    """
+    async with semaphore:
+        fetched = await _stream_tree(full_repo_name, sha, token, max_entries)
+    if fetched is None:
+        return
+    subtree, truncated = fetched
+
+    if not truncated or split_depth <= 0:
+        index.merge(subtree, prefix)
+        return
+
+    del subtree
+    logger.debug("Tree truncated at '%s'. Fetching subtrees in parallel.", prefix or "/")
+    level_resp = await github_get(f"/repos/{full_repo_name}/git/trees/{sha}", token=token)
+    if level_resp.status_code != 200:
+        return
+
+    children = []
+    for entry in level_resp.json().get("tree", []):
+        path = prefix + entry["path"]
+        index.add(path, entry["type"], entry.get("size", 0))
+        if entry["type"] == "tree":
+            children.append(_collect_tree(
+                full_repo_name, entry["sha"], path + "/", token, index, split_depth - 1, semaphore, max_entries
+            ))
+    await asyncio.gather(*children)
+
+async def fetch_tree_index(full_repo_name: str, token: Optional[str], ref: str = "HEAD") -> Optional[TreeIndex]:
+    """
+    Builds a TreeIndex of 'ref' from the recursive git/trees endpoint, streaming the body.
+    """
+    max_entries = int(os.getenv("TREE_MAX_ENTRIES", 500000))
+    split_depth = int(os.getenv("TREE_MAX_SPLIT_DEPTH", 2))
+    semaphore = asyncio.Semaphore(int(os.getenv("TREE_FETCH_CONCURRENCY", 8)))
+
+    index = TreeIndex()
+    try:
+        await _collect_tree(full_repo_name, ref, "", token, index, split_depth, semaphore, max_entries)
+    except Exception as e:
+        print(f"❌ [TreeAnalyzer] Exception: {e}")
+        return None
+    return index if len(index) else None
+
+def _hotspot_weights() -> Dict[str, float]:
+    """HOTSPOT_WEIGHTS, e.g. 'size=1,depth=0.3,fanout=0.5,churn=2'."""
+    weights = dict(DEFAULT_HOTSPOT_WEIGHTS)
+    for part in os.getenv("HOTSPOT_WEIGHTS", "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() in weights and value:
+            weights[name.strip()] = float(value)
+    return weights
+
+def rank_hotspots(index: TreeIndex, churn: Optional[ChurnResult] = None, top_n: int = 10) -> List[str]:
+    """
+    Scores every file by size, directory depth, directory fan-out and (if available) churn,
+    each normalized to 0..1 and combined with HOTSPOT_WEIGHTS.
+    """
+    weights = _hotspot_weights()
+    churn_files = churn.files if churn else {}
+
+    max_size = math.log1p(max(index.file_sizes, default=0)) or 1.0
+    max_fanout = math.log1p(max(index.fanout, default=0)) or 1.0
+    max_depth = max((d.count("/") + 1 for d in index.dirs if d), default=1)
+    max_churn = max((f.score for f in churn_files.values()), default=0.0) or 1.0
+
+    def scored():
+        for path, dir_id, size in index.files():
+            directory = index.dirs[dir_id]
+            depth = directory.count("/") + 1 if directory else 0
+            file_churn = churn_files.get(path)
+            score = (
+                weights["size"] * math.log1p(size) / max_size
+                + weights["depth"] * depth / max_depth
+                + weights["fanout"] * math.log1p(index.fanout[dir_id]) / max_fanout
+                + weights["churn"] * (file_churn.score / max_churn if file_churn else 0.0)
+            )
+            yield score, path, size, index.fanout[dir_id], file_churn
+
+    hotspots = []
+    for _, path, size, fanout, file_churn in heapq.nlargest(top_n, scored(), key=lambda item: item[0]):
+        detail = f"{max(1, size // 1024)} KB, {fanout} entries in dir"
+        if file_churn:
+            detail += f", {file_churn.changes} recent changes"
+        hotspots.append(f"{path} ({detail})")
+    return hotspots
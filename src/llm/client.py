@@ -1,65 +1,309 @@
 import os
-import google.generativeai as genai
-from typing import Dict, Any, Optional
+import logging
+import asyncio
+import inspect
+import threading
+from contextlib import nullcontext
+from typing import Dict, Any, Optional, AsyncContextManager, AsyncIterator, Tuple, TYPE_CHECKING
 
 # Import the Pydantic models for type hinting
 from src.models import DeveloperProfileSummary, CodebaseContextSummary
+from src.llm.hedging import hedged_call
+from src.llm.prompt import SYSTEM_INSTRUCTION, ReportPrompt, build_report_prompt, prompt_cache_version
+from src.llm.report_cache import ReportCache, create_report_cache
+from src.observability.metrics import LLM_REQUESTS, record_llm_tokens, span
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    # The SDK (and its gRPC/protobuf stack) is imported in init_llm, not when the app loads
+    import google.generativeai as genai
+
+# We use a 'flash' model for high speed and low cost, perfect for summarization.
+DEFAULT_GEMINI_MODEL = "models/gemini-2.5-flash-preview-09-2025"
+
+# Global model + concurrency gate (owned by the FastAPI lifespan in src/main.py)
+_model: Optional["genai.GenerativeModel"] = None
+# Model that hedged/failed-over calls go to (GEMINI_FALLBACK_MODEL); None = the primary again
+_fallback_model: Optional[Any] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+_init_attempted = False
+# init_llm may run in the startup warm-up thread while a request asks for the model
+_init_lock = threading.RLock()
+# True when SYSTEM_INSTRUCTION was given to the model itself (calls then send only the data)
+_system_in_model = False
+
+# Generated reports keyed by their inputs (None = disabled)
+_report_cache: Optional[ReportCache] = None
+_report_cache_ready = False
+
+def init_llm(model: Optional[Any] = None, fallback: Optional[Any] = None) -> Optional["genai.GenerativeModel"]:
+    """
+    Configures the Gemini SDK and builds the model (plus the GEMINI_FALLBACK_MODEL one, if
+    set) once. Called from the app lifespan's warm-up, in a worker thread, since importing
+    the SDK takes a while. Pre-built models (anything with 'generate_content_async') can
+    be passed in (benchmarks).
+    """
+    global _model, _fallback_model, _semaphore, _report_cache, _report_cache_ready, _init_attempted, _system_in_model
+
+    with _init_lock:
+        try:
+            _semaphore = asyncio.Semaphore(int(os.getenv("LLM_MAX_CONCURRENCY", 8)))
+            _report_cache = create_report_cache()
+            _report_cache_ready = True
+            _system_in_model = False
+
+            if model is not None:
+                _model, _fallback_model = model, fallback
+                return _model
+
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                print("❌ Error: GOOGLE_API_KEY not found in environment variables.")
+                _model = None
+                return None
+
+            import google.generativeai as genai
+
+            genai.configure(api_key=api_key)
+            model_name = os.getenv("GEMINI_MODEL", DEFAULT_GEMINI_MODEL)
+            # google-generativeai >= 0.5 takes the static instructions once, as the system instruction;
+            # older SDKs get them as a fixed prompt prefix (see ReportPrompt.text)
+            _system_in_model = "system_instruction" in inspect.signature(genai.GenerativeModel.__init__).parameters
+            _model = _build_model(genai, model_name)
+            fallback_name = os.getenv("GEMINI_FALLBACK_MODEL")
+            _fallback_model = _build_model(genai, fallback_name) if fallback_name else None
+            print(f"✅ Gemini model ready ({_model.model_name}" + (f", fallback {fallback_name})." if fallback_name else ")."))
+            return _model
+        finally:
+            # Set last, so callers waiting on the lock see the finished model
+            _init_attempted = True
+
+def _build_model(genai: Any, model_name: str) -> "genai.GenerativeModel":
+    if _system_in_model:
+        return genai.GenerativeModel(model_name, system_instruction=SYSTEM_INSTRUCTION)
+    return genai.GenerativeModel(model_name)
+
+def get_llm_model() -> Optional["genai.GenerativeModel"]:
+    """
+    Returns the shared model, initializing it lazily for scripts that run outside the lifespan
+    (or for a request that arrives before the warm-up is done; it waits for it).
+    Initialization is attempted once; a missing API key is not retried on every call.
+    """
+    if _model is None and not _init_attempted:
+        with _init_lock:
+            if not _init_attempted:
+                init_llm()
+    return _model
+
+async def wait_for_llm_model() -> Optional["genai.GenerativeModel"]:
+    """
+    get_llm_model for async callers. While the warm-up thread holds the init lock (SDK
+    import), waiting for it happens in a worker thread, so the event loop keeps serving.
+    """
+    if _model is None and not _init_attempted:
+        return await asyncio.to_thread(get_llm_model)
+    return _model
+
+def llm_ready() -> bool:
+    return _model is not None
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(int(os.getenv("LLM_MAX_CONCURRENCY", 8)))
+    return _semaphore
+
+def get_report_cache() -> Optional[ReportCache]:
+    """
+    Returns the report cache (None when REPORT_CACHE_BACKEND=none).
+    """
+    global _report_cache, _report_cache_ready
+
+    if not _report_cache_ready:
+        _report_cache = create_report_cache()
+        _report_cache_ready = True
+    return _report_cache
+
+async def _cached_report(
+    model: Any,
+    dev_profile: DeveloperProfileSummary,
+    repo_context: CodebaseContextSummary,
+    force_refresh: bool
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Returns (cache key, cached report). The key is None when caching is off."""
+    cache = get_report_cache()
+    if cache is None:
+        return None, None
+    key = ReportCache.cache_key(dev_profile, repo_context, getattr(model, "model_name", ""), prompt_cache_version())
+    if force_refresh:
+        cache.refreshes += 1
+        return key, None
+    return key, await cache.get(key)
+
+def _report_fill(cache_key: Optional[str], force_refresh: bool) -> AsyncContextManager[Optional[Dict[str, Any]]]:
+    """
+    Held while a missed report is generated, so other workers missing the same key wait for it
+    (ReportCache.fill). A forced refresh wants its own report and does not wait.
+    """
+    if cache_key is None or force_refresh:
+        return nullcontext(None)
+    return get_report_cache().fill(cache_key)
+
+def _prompt_contents(prompt: ReportPrompt) -> str:
+    return prompt.data if _system_in_model else prompt.text
+
+def _model_name(model: Any) -> str:
+    return getattr(model, "model_name", "") or type(model).__name__
+
+def _arms(model: Any) -> Tuple[Tuple[str, Any], Tuple[str, Any]]:
+    """(name, model) for the primary call and for hedges / fail-over."""
+    backup = _fallback_model or model
+    return (_model_name(model), model), (_model_name(backup), backup)
 
 async def generate_hiring_report(
-    dev_profile: DeveloperProfileSummary, 
-    repo_context: CodebaseContextSummary
+    dev_profile: DeveloperProfileSummary,
+    repo_context: CodebaseContextSummary,
+    force_refresh: bool = False
 ) -> Optional[Dict[str, Any]]:
     """
     Synthesizes the developer profile and codebase context into a hiring report.
+    Uses the async Gemini API so the event loop keeps serving other requests meanwhile.
+    At most LLM_MAX_CONCURRENCY reports are generated at once; each is capped at LLM_TIMEOUT_SECONDS.
+    A slow or failing call is hedged / retried (see src/llm/hedging.py) within that time.
+    Identical inputs are served from the report cache unless 'force_refresh' is set.
     """
-    
-    # 1. Setup API Key
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        print("❌ Error: GOOGLE_API_KEY not found in environment variables.")
+
+    # 1. Get the shared model (configured once at startup)
+    model = await wait_for_llm_model()
+    if model is None:
         return None
 
-    genai.configure(api_key=api_key)
-
-    # 2. Configure the Model
-    # We use 'gemini-1.5-flash' for high speed and low cost, perfect for summarization.
-    model = genai.GenerativeModel('models/gemini-2.5-flash-preview-09-2025')
-
-    # 3. Construct the Prompt
-    # We convert Pydantic models to dicts for clean JSON formatting
-    dev_json = dev_profile.model_dump_json(indent=2)
-    repo_json = repo_context.model_dump_json(indent=2)
-
-    system_instruction = (
-        "You are a Senior Engineering Architect. Your goal is to assess if a developer "
-        "is a good fit for a specific codebase based on their contribution history and the "
-        "codebase's current needs.\n\n"
-        "Input Data:\n"
-        f"--- Developer Profile ---\n{dev_json}\n\n"
-        f"--- Codebase Context ---\n{repo_json}\n\n"
-        "Task:\n"
-        "Generate a report in Markdown format. Do not use JSON in the output.\n"
-        "Structure the report exactly as follows:\n"
-        "1. **Core Fit Assessment**: A honest summary (Strong/Moderate/Weak) with reasoning.\n"
-        "2. **Immediate Impact**: Recommend a specific file or module they should work on first.\n"
-        "3. **Strategic Value**: Where can they help in the long run?\n"
-        "4. **Potential Risks**: Gaps in their stack vs the repo's stack."
-    )
-
-    try:
-        # 4. Call the API
-        # functionality: "google_search_retrieval" could be added here if needed for deeper context
-        response = model.generate_content(system_instruction)
-
-        # 5. Extract Text
-        if response.text:
-            return {
-                "text": response.text,
-                "sources": [] # Standard Gemini text generation usually doesn't return sources unless using grounding tools
-            }
-        else:
+    cache_key, cached = await _cached_report(model, dev_profile, repo_context, force_refresh)
+    if cached is not None:
+        logger.debug("Report served from cache.")
+        LLM_REQUESTS.labels("generate", "cached").inc()
+        return cached
+
+    async with _report_fill(cache_key, force_refresh) as filled:
+        if filled is not None:
+            logger.debug("Report generated by another worker, served from cache.")
+            LLM_REQUESTS.labels("generate", "cached").inc()
+            return filled
+
+        # 2. Construct the Prompt (compact, within LLM_PROMPT_MAX_TOKENS)
+        prompt = build_report_prompt(dev_profile, repo_context)
+
+        timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+
+        try:
+            # 3. Call the API
+            # functionality: "google_search_retrieval" could be added here if needed for deeper context
+            # A hedge shares its report's slot: it replaces a stalled call rather than adding load
+            async with _get_semaphore():
+                with span("llm.generate"):
+                    contents = _prompt_contents(prompt)
+                    response, model_name = await asyncio.wait_for(
+                        hedged_call(lambda m: m.generate_content_async(contents), *_arms(model), "complete", "generate"),
+                        timeout
+                    )
+
+            # 4. Extract Text
+            LLM_REQUESTS.labels("generate", "success" if response.text else "empty").inc()
+            record_llm_tokens(response, prompt, response.text or "")
+            if response.text:
+                report = {
+                    "text": response.text,
+                    "sources": [] # Standard Gemini text generation usually doesn't return sources unless using grounding tools
+                }
+                # A report from a different fallback model is not filed under the primary model's key
+                if cache_key and model_name == _model_name(model):
+                    await get_report_cache().set(cache_key, report)
+                return report
+            else:
+                return None
+
+        except asyncio.TimeoutError:
+            print(f"❌ Gemini API Error: no response within {timeout:.0f}s")
+            LLM_REQUESTS.labels("generate", "timeout").inc()
+            return None
+        except Exception as e:
+            print(f"❌ Gemini API Error: {e}")
+            LLM_REQUESTS.labels("generate", "error").inc()
             return None
 
-    except Exception as e:
-        print(f"❌ Gemini API Error: {e}")
-        return None
\ No newline at end of file
+async def stream_hiring_report(
+    dev_profile: DeveloperProfileSummary,
+    repo_context: CodebaseContextSummary,
+    force_refresh: bool = False
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of generate_hiring_report: yields Markdown text chunks as Gemini
+    produces them. LLM_TIMEOUT_SECONDS applies to the wait for each chunk; the wait for
+    the first one is hedged / retried (see src/llm/hedging.py).
+    Raises on failure, since a partially streamed report cannot be replaced by None.
+    A cached report is yielded as a single chunk.
+    """
+    model = await wait_for_llm_model()
+    if model is None:
+        raise RuntimeError("Gemini model is not configured (GOOGLE_API_KEY missing).")
+
+    cache_key, cached = await _cached_report(model, dev_profile, repo_context, force_refresh)
+    if cached is not None:
+        logger.debug("Report served from cache.")
+        LLM_REQUESTS.labels("stream", "cached").inc()
+        yield cached["text"]
+        return
+
+    async with _report_fill(cache_key, force_refresh) as filled:
+        if filled is not None:
+            logger.debug("Report generated by another worker, served from cache.")
+            LLM_REQUESTS.labels("stream", "cached").inc()
+            yield filled["text"]
+            return
+
+        timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+        prompt = build_report_prompt(dev_profile, repo_context)
+
+        contents = _prompt_contents(prompt)
+
+        async def first_chunk(m: Any) -> Tuple[Any, Any]:
+            # The hedge races the time to the first token; once text flows there is no switching models
+            response = await m.generate_content_async(contents, stream=True)
+            chunks = response.__aiter__()
+            try:
+                return chunks, await chunks.__anext__()
+            except StopAsyncIteration:
+                return chunks, None
+
+        outcome = "error"
+        parts = []
+        try:
+            async with _get_semaphore():
+                # Time to the last chunk (includes time the caller spends consuming each one)
+                with span("llm.stream"):
+                    (chunks, chunk), model_name = await asyncio.wait_for(
+                        hedged_call(first_chunk, *_arms(model), "first_token", "stream"), timeout
+                    )
+                    last = chunk
+                    while chunk is not None:
+                        last = chunk
+                        if chunk.text:
+                            parts.append(chunk.text)
+                            yield chunk.text
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                        except StopAsyncIteration:
+                            chunk = None
+            outcome = "success" if parts else "empty"
+            record_llm_tokens(last if parts else None, prompt, "".join(parts))
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            LLM_REQUESTS.labels("stream", outcome).inc()
+
+        # Only a stream that ran to completion is worth caching
+        if cache_key and parts and model_name == _model_name(model):
+            await get_report_cache().set(cache_key, {"text": "".join(parts), "sources": []})
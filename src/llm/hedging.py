@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import math
+import os
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from src.observability.metrics import LLM_ATTEMPTS, LLM_HEDGE_THRESHOLD, LLM_HEDGES
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses google.api_core puts on errors worth another try (rate limits, server side)
+TRANSIENT_CODES = {429, 500, 502, 503, 504}
+
+# Hedge thresholds until a model has LLM_HEDGE_MIN_SAMPLES latencies of that kind:
+# 'first_token' for streamed reports, 'complete' for buffered ones
+COLD_THRESHOLDS = {"first_token": 3.0, "complete": 20.0}
+MIN_THRESHOLD = 0.05
+
+@dataclass
+class HedgePolicy:
+    enabled: bool = True
+    fixed_threshold: Optional[float] = None # Seconds; None = adaptive (LatencyStats)
+    max_retries: int = 2
+    backoff: float = 0.5                    # Seconds before the first retry, doubled per retry
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        fixed = os.getenv("LLM_HEDGE_AFTER_MS")
+        return cls(
+            enabled=os.getenv("LLM_HEDGE", "true").lower() in ("1", "true", "yes"),
+            fixed_threshold=float(fixed) / 1000 if fixed else None,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", 2)),
+            backoff=float(os.getenv("LLM_RETRY_BACKOFF_MS", 500)) / 1000,
+        )
+
+class LatencyStats:
+    """
+    Recent latencies per (model, kind) in a sliding window. The adaptive hedge threshold
+    is their 'quantile': with 0.95, about one request in twenty sends a second call.
+
+    Attempts cancelled because the other one won are recorded with the time they had
+    run. That is a lower bound, so a model that keeps losing pushes its threshold up
+    instead of hedging ever earlier.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20, quantile: float = 0.95):
+        self.window = window
+        self.min_samples = min_samples
+        self.quantile = quantile
+        self.samples: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def record(self, model: str, kind: str, seconds: float):
+        self.samples.setdefault((model, kind), deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model: str, kind: str, q: float) -> Optional[float]:
+        samples = self.samples.get((model, kind))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    def threshold(self, model: str, kind: str) -> float:
+        value = self.percentile(model, kind, self.quantile)
+        if value is None:
+            value = COLD_THRESHOLDS[kind]
+        value = max(MIN_THRESHOLD, value)
+        LLM_HEDGE_THRESHOLD.labels(model, kind).set(value)
+        return value
+
+_latency_stats: Optional[LatencyStats] = None
+
+def get_latency_stats() -> LatencyStats:
+    global _latency_stats
+
+    if _latency_stats is None:
+        _latency_stats = LatencyStats(
+            window=int(os.getenv("LLM_HEDGE_WINDOW", 200)),
+            min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20)),
+            quantile=float(os.getenv("LLM_HEDGE_QUANTILE", 0.95)),
+        )
+    return _latency_stats
+
+def is_transient(error: BaseException) -> bool:
+    """Rate limits, 5xx and dropped connections; bad requests or auth errors would only fail again."""
+    return getattr(error, "code", None) in TRANSIENT_CODES or isinstance(error, ConnectionError)
+
+async def hedged_call(
+    call: Callable[[Any], Awaitable[Any]],
+    primary: Tuple[str, Any],
+    backup: Tuple[str, Any],
+    kind: str,
+    mode: str,
+    policy: Optional[HedgePolicy] = None,
+    stats: Optional[LatencyStats] = None
+) -> Tuple[Any, str]:
+    """
+    Runs 'call(model)' on the primary (name, model). If it has not returned after the
+    hedge threshold for 'kind', or fails with a transient error first, the same call
+    starts on 'backup' (the fallback model, or the primary again) and whichever returns
+    first wins; the other is cancelled. Transient failures after that are retried with
+    exponential backoff and jitter, up to policy.max_retries in total.
+
+    Returns (result, name of the model that produced it). Raises the last error when
+    every attempt failed, and at once on a non-transient one.
+    """
+    policy = policy or HedgePolicy.from_env()
+    stats = stats or get_latency_stats()
+    loop = asyncio.get_running_loop()
+    attempts: Dict[asyncio.Future, Tuple[str, Any, str, float]] = {} # task -> (model name, model, role, start)
+    retries = 0
+    hedged = False
+    last_error: Optional[BaseException] = None
+
+    def launch(role: str, name: str, model: Any, delay: float = 0.0):
+        async def attempt():
+            if delay:
+                await asyncio.sleep(delay)
+            return await call(model)
+
+        attempts[asyncio.ensure_future(attempt())] = (name, model, role, loop.time() + delay)
+
+    launch("primary", *primary)
+    threshold = policy.fixed_threshold or stats.threshold(primary[0], kind)
+    hedge_at = loop.time() + threshold
+    try:
+        while attempts:
+            timeout = max(0.0, hedge_at - loop.time()) if policy.enabled and not hedged else None
+            done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                logger.debug("No answer from %s after %.2fs, hedging with %s.", primary[0], threshold, backup[0])
+                launch("hedge", *backup)
+                continue
+
+            # A success finishing together with a failure still wins
+            for task in sorted(done, key=lambda task: task.exception() is not None):
+                name, model, role, started = attempts.pop(task)
+                error = task.exception()
+                if error is None:
+                    stats.record(name, kind, loop.time() - started)
+                    LLM_ATTEMPTS.labels(role, "success").inc()
+                    if hedged:
+                        LLM_HEDGES.labels(mode, "primary" if role == "primary" else "hedge").inc()
+                    return task.result(), name
+
+                LLM_ATTEMPTS.labels(role, "error").inc()
+                last_error = error
+                if not is_transient(error):
+                    raise error
+                if policy.enabled and not hedged:
+                    # Failing fast is as good a reason to hedge as answering slowly
+                    hedged = True
+                    logger.debug("%s failed (%s), hedging with %s.", name, error, backup[0])
+                    launch("hedge", *backup)
+                elif retries < policy.max_retries:
+                    retries += 1
+                    delay = policy.backoff * 2 ** (retries - 1) * random.uniform(0.5, 1.5)
+                    logger.debug("%s failed (%s), retry %d/%d in %.2fs.", name, error, retries, policy.max_retries, delay)
+                    launch("retry", name, model, delay)
+        raise last_error
+    finally:
+        for task, (name, _, role, started) in attempts.items():
+            task.cancel()
+            LLM_ATTEMPTS.labels(role, "cancelled").inc()
+            if loop.time() > started:
+                stats.record(name, kind, loop.time() - started)
@@ -0,0 +1,176 @@
+import logging
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Tuple
+
+from src.models import DeveloperProfileSummary, CodebaseContextSummary
+from src.scoring.similarity import score_breakdown
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompt text or layout changes, so cached reports from the old prompt are not reused
+PROMPT_VERSION = "3"
+
+# Identical for every report. Sent as the system instruction where the SDK supports it,
+# otherwise as a fixed prompt prefix; either way Gemini sees the same leading tokens on
+# every call, which is what its implicit prefix caching keys on.
+SYSTEM_INSTRUCTION = (
+    "You are a Senior Engineering Architect. Your goal is to assess if a developer "
+    "is a good fit for a specific codebase based on their contribution history and the "
+    "codebase's current needs.\n\n"
+    "Input format: one 'key: values' line per field. Lists are ordered most important "
+    "first and separated by ';'. '(+N more)' means lower-ranked entries were left out.\n\n"
+    "Task:\n"
+    "Generate a report in Markdown format. Do not use JSON in the output.\n"
+    "Structure the report exactly as follows:\n"
+    "1. **Core Fit Assessment**: A honest summary (Strong/Moderate/Weak) with reasoning.\n"
+    "2. **Immediate Impact**: Recommend a specific file or module they should work on first.\n"
+    "3. **Strategic Value**: Where can they help in the long run?\n"
+    "4. **Potential Risks**: Gaps in their stack vs the repo's stack."
+)
+
+# Value of each list's entries when the budget forces cuts; an entry at position i is
+# worth weight / (1 + i), so long tails go first and every list keeps its head
+FIELD_WEIGHTS = {
+    "dev_languages": 4.0,
+    "repo_languages": 4.0,
+    "tech_focus": 2.0,
+    "high_churn_files": 1.5,
+    "complexity_hotspots": 1.0,
+}
+MIN_KEPT = 3 # Entries every list keeps whatever the budget
+MAX_ENTRY_CHARS = 120
+
+@dataclass
+class ReportPrompt:
+    system: str
+    data: str
+    estimated_tokens: int               # System instruction + data, see estimate_tokens()
+    budget: int
+    omitted: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        """System instruction and data as a single prompt (SDKs without system instructions)."""
+        return f"{self.system}\n\n{self.data}"
+
+def estimate_tokens(text: str) -> int:
+    """Gemini averages about 4 characters per token on English and code; no API call needed."""
+    return math.ceil(len(text) / 4)
+
+def prompt_token_budget() -> int:
+    return int(os.getenv("LLM_PROMPT_MAX_TOKENS", 1500))
+
+def prompt_cache_version() -> str:
+    # The budget changes what reaches the model, so cached reports are per budget too
+    return f"{PROMPT_VERSION}/{prompt_token_budget()}"
+
+def _shorten(value: str) -> str:
+    if len(value) <= MAX_ENTRY_CHARS:
+        return value
+    keep = (MAX_ENTRY_CHARS - 1) // 2
+    return f"{value[:keep]}…{value[-keep:]}"
+
+def _entry(item: Any) -> str:
+    """'Python score=12' for {"name": "Python", "score": 12}; strings as they are."""
+    if isinstance(item, dict):
+        name = item.get("name", "")
+        extras = " ".join(f"{key}={value}" for key, value in item.items() if key != "name")
+        return _shorten(f"{name} {extras}".strip())
+    return _shorten(str(item))
+
+def _entries(items: List[Any], max_chars: int) -> List[str]:
+    # Formats entries only while they could still fit: a list never gets more than the whole budget
+    entries, used = [], 0
+    for item in items:
+        if used > max_chars:
+            break
+        entries.append(_entry(item))
+        used += len(entries[-1]) + 2
+    return entries
+
+def _line(key: str, entries: List[str], omitted: int) -> str:
+    text = "; ".join(entries) if entries else "none"
+    return f"{key}: {text}" + (f" (+{omitted} more)" if omitted else "")
+
+def _render(fields: Dict[str, List[str]], kept: Dict[str, int], totals: Dict[str, int], scalars: Dict[str, str]) -> str:
+    def line(name: str, key: str) -> str:
+        return _line(key, fields[name][:kept[name]], totals[name] - kept[name])
+
+    return "\n".join([
+        "## Developer",
+        line("dev_languages", "languages"),
+        f"style: {scalars['style']}",
+        line("tech_focus", "focus"),
+        "## Codebase",
+        line("repo_languages", "languages"),
+        line("high_churn_files", "high_churn"),
+        line("complexity_hotspots", "hotspots"),
+        "## Skill similarity (one input, not the verdict)",
+        scalars["fit"],
+    ])
+
+def build_report_prompt(
+    dev_profile: DeveloperProfileSummary,
+    repo_context: CodebaseContextSummary,
+    budget: int = 0
+) -> ReportPrompt:
+    """
+    Builds the hiring report prompt shared by the buffered and streaming calls.
+
+    Inputs are written as compact 'key: a; b; c' lines instead of indented JSON. When the
+    estimated size exceeds 'budget' tokens (LLM_PROMPT_MAX_TOKENS), the lowest-value list
+    entries (see FIELD_WEIGHTS) are dropped until it fits, down to MIN_KEPT per list.
+    """
+    budget = budget or prompt_token_budget()
+    items = {
+        "dev_languages": dev_profile.top_languages,
+        "tech_focus": dev_profile.tech_focus,
+        "repo_languages": repo_context.languages,
+        "high_churn_files": repo_context.high_churn_files,
+        "complexity_hotspots": repo_context.complexity_hotspots,
+    }
+    fields = {name: _entries(values, budget * 4) for name, values in items.items()}
+    totals = {name: len(values) for name, values in items.items()}
+    # Deterministic similarity score, so the assessment is anchored to the same signal used for ranking
+    fit = score_breakdown(dev_profile, repo_context)
+    scalars = {
+        "style": _shorten(dev_profile.contribution_style),
+        "fit": f"overall {fit['score']}/100; language {fit['language']}/100; topic {fit['topic']}/100",
+    }
+
+    kept = {name: len(entries) for name, entries in fields.items()}
+    system_tokens = estimate_tokens(SYSTEM_INSTRUCTION) + 1
+    data = _render(fields, kept, totals, scalars)
+    excess = system_tokens + estimate_tokens(data) - budget
+
+    if excess > 0:
+        # Cheapest entries first; each cut saves its text plus the '; ' separator
+        droppable: List[Tuple[float, str, int]] = sorted(
+            (FIELD_WEIGHTS[name] / (1 + i), name, i)
+            for name, entries in fields.items()
+            for i in range(MIN_KEPT, len(entries))
+        )
+        position, saved, target = 0, 0, excess * 4
+        while excess > 0 and position < len(droppable):
+            while saved < target and position < len(droppable):
+                _, name, i = droppable[position]
+                kept[name] = min(kept[name], i)
+                saved += len(fields[name][i]) + 2
+                position += 1
+            # '(+N more)' markers cost a little; re-check and keep cutting if still over
+            data = _render(fields, kept, totals, scalars)
+            excess = system_tokens + estimate_tokens(data) - budget
+            target += max(0, excess) * 4
+
+    prompt = ReportPrompt(
+        system=SYSTEM_INSTRUCTION,
+        data=data,
+        estimated_tokens=system_tokens + estimate_tokens(data),
+        budget=budget,
+        omitted={name: totals[name] - kept[name] for name in fields if kept[name] < totals[name]},
+    )
+    if prompt.omitted:
+        logger.debug("Prompt trimmed to ~%d/%d tokens, left out: %s", prompt.estimated_tokens, budget, prompt.omitted)
+    return prompt
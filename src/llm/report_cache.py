@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator
+from src.cache import serialization
+from src.cache.stores import CacheStore, create_store, fill_lease
+from src.models import DeveloperProfileSummary, CodebaseContextSummary
+
+class ReportCache:
+    """
+    Content-addressed cache of generated hiring reports.
+
+    The key is a hash of everything that determines the LLM output: both input
+    summaries (canonical JSON), the model name and the prompt template version.
+    Changing any of them yields a new key, so entries never need invalidating.
+    """
+
+    def __init__(self, store: CacheStore):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0 # Lookups skipped because the caller asked for force_refresh
+        self.filled_elsewhere = 0 # Misses answered by another worker's generation (see fill())
+
+    @staticmethod
+    def cache_key(
+        dev_profile: DeveloperProfileSummary,
+        repo_context: CodebaseContextSummary,
+        model_name: str,
+        prompt_version: str
+    ) -> str:
+        canonical = json.dumps(
+            {
+                "developer": dev_profile.model_dump(mode="json"),
+                "codebase": repo_context.model_dump(mode="json"),
+                "model": model_name,
+                "prompt_version": prompt_version,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = await self.store.aget(key)
+        report = serialization.loads(entry.value) if entry is not None else None
+        if report is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return report
+
+    @asynccontextmanager
+    async def fill(self, key: str) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Held while generating the report for a missed 'key'. Yields the report when another
+        worker on the host generated it meanwhile (see fill_lease), otherwise None.
+        """
+        async with fill_lease(self.store, key) as entry:
+            report = serialization.loads(entry.value) if entry is not None else None
+            if report is not None:
+                self.filled_elsewhere += 1
+            yield report
+
+    async def set(self, key: str, report: Dict[str, Any]):
+        await self.store.aset(key, serialization.dumps(report))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "filled_elsewhere": self.filled_elsewhere,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "store": self.store.stats(),
+        }
+
+def create_report_cache() -> Optional[ReportCache]:
+    """
+    Builds the cache from the environment.
+    REPORT_CACHE_BACKEND: 'tiered' (default; in-process LRU over SQLite shared by the host's workers,
+    survives restarts), 'sqlite', 'memory' (per process) or 'none'.
+    """
+    backend = os.getenv("REPORT_CACHE_BACKEND", "tiered").lower()
+    store = create_store(
+        backend,
+        namespace="reports",
+        path=os.getenv("REPORT_CACHE_PATH", ".cache/report_cache.sqlite3"),
+        max_entries=int(os.getenv("REPORT_CACHE_MAX_ENTRIES", 1000)),
+        max_bytes=int(os.getenv("REPORT_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+        ttl=float(os.getenv("REPORT_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+    )
+    if store is None:
+        return None
+
+    print(f"✅ LLM report cache enabled ({backend}).")
+    return ReportCache(store)
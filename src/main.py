@@ -1,26 +1,100 @@
 import os
-from contextlib import asynccontextmanager
+import json
+import logging
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response, PlainTextResponse, JSONResponse
 
 # Import our data models
-from src.models import ReportRequest, ReportResponse
+from src.models import (
+    ReportRequest, ReportResponse, RankRequest, ScoreRequest, ScoreResponse, JobSubmitResponse, JobStatusResponse
+)
 
 # Import the core logic (We will build this file next)
-from src.orchestration.manager import orchestrate_report_generation
+from src.orchestration.manager import (
+    orchestrate_report_generation, stream_report_generation, stream_candidate_ranking,
+    score_candidates_against_repos, singleflight_stats
+)
+from src.data_extraction.github_client import init_github_client, close_github_client, get_response_cache
+from src.data_extraction.rate_limit import RateLimitExceeded, Reservation, estimate_report_cost, get_token_pool
+from src.data_extraction.profile_snapshots import get_profile_store
+from src.data_extraction.repo_analyzer import prewarm_repo_index
+from src.data_extraction.repo_index import get_repo_index, prewarm_repo_urls
+from src.llm.client import init_llm, get_report_cache, llm_ready
+from src.orchestration.jobs import Job, JobQueueFull, start_job_manager, stop_job_manager, get_job_manager
+from src.persistence.firestore import (
+    get_report_by_id, initialize_firebase, persistence_ready, start_report_writer, stop_report_writer, get_report_writer
+)
+from src.observability.metrics import HTTP_SECONDS, render_metrics, server_timing, start_trace
+from src.observability.profiling import (
+    finish_request_profile, new_profile_id, profiling_enabled, read_profile, start_request_profile
+)
 
 # --- 1. Setup & Configuration ---
 load_dotenv()  # Load variables from .env
+# Request lines are logged at INFO, per-call details (cache hits, hedges, quota waits, write retries) at DEBUG
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logging.getLogger("src").setLevel(os.getenv("LOG_LEVEL", "WARNING").upper())
+logger = logging.getLogger(__name__)
+
+# Progress of the startup warm-up, reported by /ready
+_warmup: Dict[str, Any] = {"done": False, "seconds": None, "error": None}
+
+async def warm_up():
+    """
+    Imports and configures the heavy SDKs (Gemini, Firebase/gRPC) in worker threads, so
+    the event loop is serving /health while they load. A request that needs one of them
+    before this finishes waits for it (see wait_for_llm_model / wait_for_db).
+    """
+    started = time.perf_counter()
+    try:
+        # init_llm looked up at call time: benchmarks replace it with a fake model
+        await asyncio.gather(asyncio.to_thread(init_llm), asyncio.to_thread(initialize_firebase))
+    except Exception as e:
+        _warmup["error"] = str(e)
+        print(f"❌ Warm-up failed: {e}")
+    _warmup["seconds"] = round(time.perf_counter() - started, 3)
+    _warmup["done"] = True
+    print(f"🔥 Warm-up finished in {_warmup['seconds'] * 1000:.0f} ms.")
 
 # Lifecycle manager (optional, but good practice for DB connections)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic (e.g., connect to DB)
     print("🚀 Commit Card Backend starting up...")
+    _warmup.update(done=False, seconds=None, error=None)
+    # One pooled GitHub client shared by every request (keep-alive + HTTP/2), plus the token pool
+    await init_github_client()
+    get_token_pool()
+    # Gemini model and Firestore client are built once, in the background unless STARTUP_WARMUP=blocking
+    warmup_task = asyncio.create_task(warm_up())
+    if os.getenv("STARTUP_WARMUP", "background").lower() == "blocking":
+        await warmup_task
+    # Batched write-behind queue for reports (connects through get_db, after the warm-up)
+    start_report_writer(connect=False)
+    # Worker pool for the asynchronous /api/jobs mode
+    start_job_manager()
+    # Index the configured repos in the background; startup does not wait for it
+    prewarm_urls = prewarm_repo_urls()
+    prewarm_task = asyncio.create_task(prewarm_repo_index(prewarm_urls)) if prewarm_urls else None
     yield
     # Shutdown logic
     print("🛑 Commit Card Backend shutting down...")
+    # Threads cannot be interrupted; a warm-up still running is waited for
+    await asyncio.gather(warmup_task, return_exceptions=True)
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+        await asyncio.gather(prewarm_task, return_exceptions=True)
+    await stop_job_manager()
+    # Flush reports still waiting in the write-behind queue
+    await stop_report_writer()
+    await close_github_client()
 
 app = FastAPI(
     title="Commit Card API",
@@ -45,6 +119,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """
+    Times every request (commitcard_http_request_seconds, until the last body byte, so SSE
+    streams count in full) and returns the stages it went through as a Server-Timing header.
+    With PROFILING_ENABLED=true, an 'X-Profile: 1' header also samples the event loop's stack
+    for the request; the profile ID comes back in X-Profile-Id (see /debug/profiles/{id}).
+    """
+    started = time.perf_counter()
+    trace = start_trace()
+    sampler = None
+    if profiling_enabled() and request.headers.get("x-profile") == "1":
+        sampler = start_request_profile()
+    profile_id = new_profile_id() if sampler else None
+
+    try:
+        response = await call_next(request)
+    except Exception:
+        if sampler is not None:
+            finish_request_profile(sampler, profile_id, f"{request.method} {request.url.path}")
+        raise
+
+    # Route templates, not raw paths, keep the label set bounded
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", "unmatched")
+    if trace:
+        response.headers["Server-Timing"] = server_timing(trace)
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+
+    body = response.body_iterator
+
+    async def observed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            HTTP_SECONDS.labels(request.method, route_path, str(response.status_code)).observe(time.perf_counter() - started)
+            if sampler is not None:
+                finish_request_profile(sampler, profile_id, f"{request.method} {request.url.path}")
+
+    response.body_iterator = observed_body()
+    return response
+
 # --- 3. Routes ---
 
 @app.get("/health")
@@ -52,21 +170,86 @@ async def health_check():
     """Simple health check to ensure server is running."""
     return {"status": "active", "environment": os.getenv("APP_ENV", "unknown")}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the startup warm-up (Gemini and Firestore SDKs) has finished."""
+    body = {
+        "status": "ready" if _warmup["done"] and not _warmup["error"] else "warming_up",
+        "warmup_seconds": _warmup["seconds"],
+        "llm": llm_ready(),
+        "persistence": persistence_ready(),
+    }
+    if _warmup["error"]:
+        body.update(status="failed", error=_warmup["error"])
+    return JSONResponse(body, status_code=200 if body["status"] == "ready" else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: request, report and per-stage latency histograms; GitHub, Gemini and Firestore counters."""
+    body, content_type = render_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """A saved request profile in folded-stack format (flamegraph.pl / speedscope). Needs PROFILING_ENABLED."""
+    folded = read_profile(profile_id) if profiling_enabled() else None
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded)
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the GitHub, profile snapshot, repo index and LLM report caches, in-flight coalescing and the write queue."""
+    github_cache = get_response_cache()
+    profile_store = get_profile_store()
+    repo_index = get_repo_index()
+    report_cache = get_report_cache()
+    report_writer = get_report_writer()
+    # SQLite-backed stores count their rows, which may wait on another worker's write lock
+    stores = await asyncio.to_thread(lambda: {
+        "github": github_cache.stats() if github_cache else None,
+        "profiles": profile_store.stats() if profile_store else None,
+        "repo_index": repo_index.stats() if repo_index else None,
+        "reports": report_cache.stats() if report_cache else None,
+    })
+    return {
+        **stores,
+        "singleflight": singleflight_stats(),
+        "report_writer": report_writer.stats() if report_writer else None
+    }
+
+@app.get("/api/github/quota")
+async def github_quota():
+    """Per-token GitHub quota gauges (remaining, reset, pauses) and admission counters."""
+    return get_token_pool().stats()
+
+def _admit(cost: Dict[str, int]) -> Reservation:
+    """Reserves GitHub quota for a request, or refuses it with 429 before any work starts."""
+    try:
+        return get_token_pool().admit(cost)
+    except RateLimitExceeded as e:
+        print(f"⛔ Request refused: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
 @app.post("/api/generate-report", response_model=ReportResponse)
 async def generate_report_endpoint(request: ReportRequest):
     """
     Main Endpoint: Receives Git ID and Repo URL, returns the LLM analysis.
     """
+    reservation = _admit(estimate_report_cost(repos=0 if request.auth_token else 1, profile_mode=request.profile_mode))
     try:
-        print(f"📥 Received request: Developer={request.git_id}, Repo={request.repo_url}")
+        logger.info("Received request: Developer=%s, Repo=%s", request.git_id, request.repo_url)
         
         # Delegate the heavy lifting to the Orchestration Layer
-        result = await orchestrate_report_generation(
-            git_id=request.git_id,
-            repo_url=str(request.repo_url),
-            auth_token=request.auth_token,
-            user_id=request.user_id
-        )
+        with reservation:
+            result = await orchestrate_report_generation(
+                git_id=request.git_id,
+                repo_url=str(request.repo_url),
+                auth_token=request.auth_token,
+                user_id=request.user_id,
+                force_refresh=request.force_refresh,
+                profile_mode=request.profile_mode
+            )
 
         # Check for logical errors returned by the orchestrator
         if not result.success:
@@ -79,6 +262,160 @@ async def generate_report_endpoint(request: ReportRequest):
         print(f"❌ Critical Error in Main: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+class ReservedStreamingResponse(StreamingResponse):
+    """
+    Releases the GitHub quota 'reservation' once the response is over, however it ended.
+    The stream body may never run (client gone before the first chunk is pulled), so its
+    own 'with reservation' cannot be relied on for that.
+    """
+
+    def __init__(self, *args, reservation: Optional[Reservation] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reservation = reservation
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.reservation is not None:
+                self.reservation.release()
+
+def _sse_response(events, reservation: Optional[Reservation] = None) -> StreamingResponse:
+    """
+    Wraps an async iterator of (event, data) pairs as a Server-Sent Events response.
+    The GitHub quota 'reservation' is held until the stream ends.
+    """
+    async def event_stream():
+        # Opening comment flushes headers immediately, so the client sees the first byte at once
+        yield ": stream opened\n\n"
+        # Entered here so the GitHub calls made while streaming draw it down
+        with reservation or nullcontext():
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    return ReservedStreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        reservation=reservation
+    )
+
+@app.post("/api/generate-report/stream")
+async def generate_report_stream_endpoint(request: ReportRequest):
+    """
+    Streaming variant of /api/generate-report (Server-Sent Events).
+    Emits 'developer_profile' and 'codebase_context' as extraction finishes, then 'token'
+    events with report Markdown as Gemini writes it, and finally 'complete' or 'error'.
+    """
+    logger.info("Received streaming request: Developer=%s, Repo=%s", request.git_id, request.repo_url)
+    reservation = _admit(estimate_report_cost(repos=0 if request.auth_token else 1, profile_mode=request.profile_mode))
+
+    return _sse_response(stream_report_generation(
+        git_id=request.git_id,
+        repo_url=str(request.repo_url),
+        auth_token=request.auth_token,
+        user_id=request.user_id,
+        force_refresh=request.force_refresh,
+        profile_mode=request.profile_mode
+    ), reservation)
+
+@app.post("/api/rank")
+async def rank_candidates_endpoint(request: RankRequest):
+    """
+    Ranks many developers against one repository (Server-Sent Events).
+    The repo is analyzed once; every candidate gets a quick fit score ('candidate' events,
+    as each profile lands) and only the 'top_k' best get full LLM reports ('report' events).
+    """
+    logger.info("Received ranking request: %d candidates, Repo=%s", len(request.git_ids), request.repo_url)
+    reservation = _admit(estimate_report_cost(
+        candidates=len(set(request.git_ids)), repos=0 if request.auth_token else 1
+    ))
+
+    return _sse_response(stream_candidate_ranking(
+        repo_url=str(request.repo_url),
+        git_ids=request.git_ids,
+        auth_token=request.auth_token,
+        user_id=request.user_id,
+        top_k=request.top_k,
+        force_refresh=request.force_refresh
+    ), reservation)
+
+@app.post("/api/score", response_model=ScoreResponse)
+async def score_candidates_endpoint(request: ScoreRequest):
+    """
+    Deterministic skill-similarity scores (0-100) for every candidate x repo pair, no LLM involved.
+    """
+    logger.info("Received scoring request: %d candidates x %d repos", len(request.git_ids), len(request.repo_urls))
+    reservation = _admit(estimate_report_cost(
+        candidates=len(set(request.git_ids)), repos=0 if request.auth_token else len(set(request.repo_urls))
+    ))
+    try:
+        with reservation:
+            result = await score_candidates_against_repos(
+                git_ids=request.git_ids,
+                repo_urls=[str(url) for url in request.repo_urls],
+                auth_token=request.auth_token,
+                top_k=request.top_k
+            )
+    except Exception as e:
+        print(f"❌ Scoring Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return ScoreResponse(**result)
+
+@app.post("/api/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_job_endpoint(request: ReportRequest, http_request: Request):
+    """
+    Asynchronous variant of /api/generate-report: queues the report and returns a job ID at once.
+    Responds 429 when the queue is full or GitHub quota cannot cover it; retry after the suggested delay.
+    """
+    job = Job(
+        git_id=request.git_id,
+        repo_url=str(request.repo_url),
+        auth_token=request.auth_token,
+        user_id=request.user_id,
+        force_refresh=request.force_refresh,
+        profile_mode=request.profile_mode,
+        reservation=_admit(estimate_report_cost(repos=0 if request.auth_token else 1, profile_mode=request.profile_mode))
+    )
+    try:
+        get_job_manager().submit(job)
+    except JobQueueFull as e:
+        job.reservation.release()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": os.getenv("JOB_RETRY_AFTER_SECONDS", "5")})
+
+    logger.info("Queued job %s: Developer=%s, Repo=%s", job.id, job.git_id, job.repo_url)
+    return JobSubmitResponse(
+        job_id=job.id,
+        status=job.status,
+        status_url=str(http_request.url_for("job_status_endpoint", job_id=job.id))
+    )
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def job_status_endpoint(job_id: str):
+    """Status, current stage and (once finished) the result of a queued report."""
+    job = get_job_manager().queue.lookup(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+
+    return JobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        stage=job.stage,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error
+    )
+
+@app.get("/api/reports/{report_id}")
+async def get_report_endpoint(report_id: str, user_id: str):
+    """Fetches a saved report by its Firestore ID (as returned in job results)."""
+    report = await asyncio.to_thread(get_report_by_id, report_id, "commit-card", user_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found.")
+    return report
+
 if __name__ == "__main__":
     import uvicorn
     # Run the server directly for debugging
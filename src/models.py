@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 
 # --- Request Model ---
 # This is what the Frontend MUST send to /api/generate-report
@@ -8,6 +8,24 @@ class ReportRequest(BaseModel):
     repo_url: HttpUrl = Field(..., description="The full URL of the target repository", example="https://github.com/fastapi/fastapi")
     auth_token: Optional[str] = Field(None, description="Optional GitHub PAT for accessing private repos")
     user_id: str = Field(..., description="The ID of the hiring manager requesting the report")
+    force_refresh: bool = Field(False, description="Regenerate the report even if an identical one is cached")
+    profile_mode: Literal["fast", "deep"] = Field("fast", description="'deep' reads every repo's language bytes and authored commits (slower, more requests)")
+
+# Sent to /api/rank: many candidates against one repository
+class RankRequest(BaseModel):
+    repo_url: HttpUrl = Field(..., description="The full URL of the target repository", example="https://github.com/fastapi/fastapi")
+    git_ids: List[str] = Field(..., min_length=1, max_length=500, description="Candidate GitHub usernames", example=["torvalds", "gvanrossum"])
+    top_k: int = Field(10, ge=0, le=100, description="How many of the best pre-scored candidates get a full LLM report")
+    auth_token: Optional[str] = Field(None, description="Optional GitHub PAT for accessing private repos")
+    user_id: str = Field(..., description="The ID of the hiring manager requesting the ranking")
+    force_refresh: bool = Field(False, description="Regenerate reports even if identical ones are cached")
+
+# Sent to /api/score: deterministic candidates x repos similarity, no LLM involved
+class ScoreRequest(BaseModel):
+    git_ids: List[str] = Field(..., min_length=1, max_length=5000, description="Candidate GitHub usernames")
+    repo_urls: List[HttpUrl] = Field(..., min_length=1, max_length=100, description="Target repository URLs")
+    top_k: int = Field(10, ge=1, le=1000, description="Best candidates listed per repo")
+    auth_token: Optional[str] = Field(None, description="Optional GitHub PAT for accessing private repos")
 
 # --- Response Models ---
 # These define the structured data we return to the UI
@@ -31,4 +49,29 @@ class ReportResponse(BaseModel):
 
     # We also include the raw data used, in case the UI wants to show graphs later
     developer_summary: Optional[DeveloperProfileSummary] = None
-    codebase_summary: Optional[CodebaseContextSummary] = None
\ No newline at end of file
+    codebase_summary: Optional[CodebaseContextSummary] = None
+
+class ScoreResponse(BaseModel):
+    git_ids: List[str] = Field(..., description="Candidates whose profiles could be extracted (matrix rows)")
+    repo_urls: List[str] = Field(..., description="Repos that could be analyzed (matrix columns)")
+    scores: List[List[float]] = Field(..., description="Fit scores 0-100, one row per candidate")
+    top_candidates: Dict[str, List[str]] = Field(..., description="Best 'top_k' git_ids per repo URL")
+    unavailable: List[str] = Field(default_factory=list, description="git_ids / repo URLs that could not be fetched")
+
+# --- Job Models ---
+# Returned by the asynchronous /api/jobs endpoints
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str = Field(..., description="Poll this URL for progress and the result")
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued | running | succeeded | failed")
+    stage: str = Field(..., description="queued | extraction | synthesis | persistence | done")
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ReportResponse] = None
+    error: Optional[str] = None
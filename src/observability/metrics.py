@@ -0,0 +1,122 @@
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Tuple, Iterator, Any
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans range from sub-millisecond cache hits to minute-long Gemini calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+HTTP_SECONDS = Histogram(
+    "commitcard_http_request_seconds", "API request time, until the last body byte.",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+REPORT_SECONDS = Histogram(
+    "commitcard_report_seconds", "End-to-end report pipeline time.",
+    ["pipeline", "outcome"], buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "commitcard_stage_seconds", "Time spent in one pipeline stage (see span()).",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+GITHUB_REQUESTS = Counter(
+    "commitcard_github_requests_total", "GitHub API calls by resource and response status.", ["resource", "status"]
+)
+GITHUB_RATE_LIMITED = Counter(
+    "commitcard_github_rate_limited_total", "GitHub responses rejected by a (primary or secondary) rate limit.", ["resource"]
+)
+GITHUB_ADMISSION_REJECTED = Counter(
+    "commitcard_github_admission_rejected_total", "Requests refused up front for lack of GitHub quota (HTTP 429)."
+)
+LLM_TOKENS = Counter(
+    "commitcard_llm_tokens_total", "Gemini tokens by kind; 'source' says whether the SDK reported them or they were estimated.",
+    ["kind", "source"]
+)
+LLM_REQUESTS = Counter("commitcard_llm_requests_total", "Gemini calls by outcome.", ["mode", "outcome"])
+LLM_ATTEMPTS = Counter(
+    "commitcard_llm_attempts_total", "Gemini calls within one request by role (primary, hedge, retry) and outcome.",
+    ["role", "outcome"]
+)
+LLM_HEDGES = Counter("commitcard_llm_hedges_total", "Requests that fired a hedge, by which attempt answered first.", ["mode", "winner"])
+LLM_HEDGE_THRESHOLD = Gauge(
+    "commitcard_llm_hedge_threshold_seconds", "Current wait before hedging, per model and kind of wait.",
+    ["model", "kind"], multiprocess_mode="max"
+)
+LLM_PROMPT_ESTIMATE_RATIO = Histogram(
+    "commitcard_llm_prompt_estimate_ratio", "Actual / estimated prompt tokens per Gemini call (1.0 = exact).",
+    buckets=(0.5, 0.75, 0.9, 1.0, 1.1, 1.25, 1.5, 2.0, 3.0)
+)
+FIRESTORE_WRITES = Counter("commitcard_firestore_writes_total", "Report documents written (or dropped) by the write-behind queue.", ["outcome"])
+
+# Spans recorded during the current API request (set by the HTTP middleware in src/main.py).
+# Tasks copy the context, so spans from work fanned out with create_task land in the same list.
+_trace: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("trace", default=None)
+
+def start_trace() -> List[Tuple[str, float]]:
+    trace: List[Tuple[str, float]] = []
+    _trace.set(trace)
+    return trace
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Times a block as 'stage': observed in the commitcard_stage_seconds histogram and added
+    to the current request's trace (reported in its Server-Timing header). Works in sync
+    and async code alike; the time includes any awaiting inside the block.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((stage, elapsed))
+
+def server_timing(trace: List[Tuple[str, float]]) -> str:
+    """Server-Timing header value: total milliseconds and call count per stage, in first-seen order."""
+    totals: Dict[str, List[float]] = {}
+    for stage, elapsed in trace:
+        total = totals.setdefault(stage, [0.0, 0])
+        total[0] += elapsed
+        total[1] += 1
+    return ", ".join(f'{stage};dur={total * 1000:.1f};desc="{count}x"' for stage, (total, count) in totals.items())
+
+def record_llm_tokens(response: Any, prompt: Any, text: str):
+    """
+    Counts prompt and completion tokens from the response's usage metadata, and how the
+    prompt builder's estimate ('prompt.estimated_tokens') compared with the actual count.
+    SDK versions without usage metadata get estimates, labeled source="estimated".
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and getattr(usage, "prompt_token_count", None):
+        LLM_TOKENS.labels("prompt", "reported").inc(usage.prompt_token_count)
+        LLM_TOKENS.labels("completion", "reported").inc(getattr(usage, "candidates_token_count", 0) or 0)
+        LLM_PROMPT_ESTIMATE_RATIO.observe(usage.prompt_token_count / max(1, prompt.estimated_tokens))
+        logger.debug(
+            "Prompt tokens: estimated %d, actual %d (budget %d).",
+            prompt.estimated_tokens, usage.prompt_token_count, prompt.budget
+        )
+        return
+    LLM_TOKENS.labels("prompt", "estimated").inc(prompt.estimated_tokens)
+    LLM_TOKENS.labels("completion", "estimated").inc(len(text) // 4)
+    logger.debug("Prompt tokens: estimated %d (budget %d; no usage reported).", prompt.estimated_tokens, prompt.budget)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Prometheus exposition of every metric above. With several workers, set
+    PROMETHEUS_MULTIPROC_DIR so each scrape aggregates all of them.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,108 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+class StackSampler:
+    """
+    Sampling profiler for one thread (the event loop's): a helper thread records that
+    thread's Python stack every 'interval' seconds. The result is in folded-stack format
+    ('frame;frame;frame count' per line), which flamegraph.pl and speedscope read directly.
+
+    Everything the loop runs while sampling is included, so other requests served at the
+    same time show up too. Idle time shows as the selector wait.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005, max_depth: int = 64):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        if stack:
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+# One profile at a time: samples are process-wide, so overlapping profiles would just duplicate each other
+_active: Optional[StackSampler] = None
+
+def profiling_enabled() -> bool:
+    """PROFILING_ENABLED=true lets clients ask for a profile with the X-Profile: 1 header."""
+    return os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+def profile_dir() -> str:
+    return os.getenv("PROFILE_DIR", ".cache/profiles")
+
+def start_request_profile() -> Optional[StackSampler]:
+    """Starts sampling the calling (event loop) thread, unless a profile is already running."""
+    global _active
+
+    if _active is not None:
+        return None
+    _active = StackSampler(
+        threading.get_ident(), interval=float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 5)) / 1000
+    )
+    _active.start()
+    return _active
+
+def finish_request_profile(sampler: StackSampler, profile_id: str, label: str) -> Optional[str]:
+    """Stops 'sampler' and saves its folded stacks as PROFILE_DIR/<profile_id>.folded. Returns the path."""
+    global _active
+
+    sampler.stop()
+    if _active is sampler:
+        _active = None
+    path = os.path.join(profile_dir(), f"{profile_id}.folded")
+    try:
+        os.makedirs(profile_dir(), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(sampler.folded())
+    except OSError as e:
+        print(f"❌ [Profiling] Could not save profile {profile_id}: {e}")
+        return None
+    print(f"🔬 [Profiling] {label}: {sampler.duration * 1000:.0f} ms profiled -> {path}")
+    return path
+
+def new_profile_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+def read_profile(profile_id: str) -> Optional[str]:
+    # IDs are generated hex; anything else could escape PROFILE_DIR
+    if not profile_id.isalnum():
+        return None
+    try:
+        with open(os.path.join(profile_dir(), f"{profile_id}.folded"), encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
@@ -0,0 +1,188 @@
+import asyncio
+import contextlib
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
+
+from src.models import ReportResponse
+from src.data_extraction.rate_limit import Reservation
+from src.orchestration.manager import orchestrate_report_generation
+
+# Pipeline stages gated by their own concurrency limit (see JOB_STAGE_CONCURRENCY)
+DEFAULT_STAGE_CONCURRENCY = {"extraction": 8, "synthesis": 4, "persistence": 4}
+
+class JobQueueFull(Exception):
+    """Raised on submit when the queue is at JOB_QUEUE_MAX (surfaced as HTTP 429)."""
+
+@dataclass
+class Job:
+    git_id: str
+    repo_url: str
+    auth_token: Optional[str]
+    user_id: str
+    force_refresh: bool = False
+    profile_mode: str = "fast"
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued" # queued | running | succeeded | failed
+    stage: str = "queued"  # queued | extraction | synthesis | persistence | done
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ReportResponse] = None
+    error: Optional[str] = None
+    reservation: Optional[Reservation] = None # GitHub quota set aside when the job was admitted
+
+class InMemoryJobQueue:
+    """
+    Local queue backend: a bounded asyncio.Queue plus a job table in process memory.
+    Needs no external services; jobs do not survive a restart and are not shared between workers.
+    """
+
+    def __init__(self, max_size: int, retention: float):
+        self.max_size = max_size
+        self.retention = retention
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue(maxsize=max_size)
+        self._jobs: Dict[str, Job] = {}
+
+    def put(self, job: Job):
+        self._purge()
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self.max_size} waiting).")
+        self._jobs[job.id] = job
+
+    async def get(self) -> Job:
+        return await self._queue.get()
+
+    def lookup(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _purge(self):
+        # Finished jobs are kept for 'retention' seconds so clients can collect the result
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+class JobManager:
+    """
+    Runs report jobs on a fixed pool of worker tasks.
+    Each pipeline stage is additionally gated by its own semaphore, so e.g. LLM synthesis
+    can be held to a few concurrent calls while extraction for other jobs keeps going.
+    """
+
+    def __init__(self, workers: int, queue: InMemoryJobQueue, stage_concurrency: Dict[str, int]):
+        self.worker_count = workers
+        self.queue = queue
+        self.stage_limits = {stage: asyncio.Semaphore(limit) for stage, limit in stage_concurrency.items()}
+        self._workers: List[asyncio.Task] = []
+        self.running = 0
+
+    def start(self):
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        print(f"✅ Job workers started ({self.worker_count} workers, queue limit {self.queue.max_size}).")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, job: Job) -> Job:
+        self.queue.put(job)
+        return job
+
+    @asynccontextmanager
+    async def _stage(self, job: Job, name: str):
+        # 'stage' covers waiting for the stage's slot as well as running it
+        job.stage = name
+        limit = self.stage_limits.get(name)
+        if limit is None:
+            yield
+            return
+        async with limit:
+            yield
+
+    async def _run(self, job: Job):
+        job.status, job.started_at = "running", time.time()
+        self.running += 1
+        try:
+            with job.reservation or contextlib.nullcontext():
+                job.result = await orchestrate_report_generation(
+                    git_id=job.git_id,
+                    repo_url=job.repo_url,
+                    auth_token=job.auth_token,
+                    user_id=job.user_id,
+                    force_refresh=job.force_refresh,
+                    stage_gate=lambda name: self._stage(job, name),
+                    profile_mode=job.profile_mode
+                )
+            job.status = "succeeded" if job.result.success else "failed"
+            job.error = job.result.error
+        except Exception as e:
+            print(f"❌ [Jobs] Job {job.id} crashed: {e}")
+            job.status, job.error = "failed", str(e)
+        finally:
+            self.running -= 1
+            job.stage, job.finished_at = "done", time.time()
+            job.reservation = None
+            job.auth_token = None # Never keep a caller's PAT around longer than needed
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            await self._run(job)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queued": self.queue.depth(), "running": self.running, "workers": self.worker_count}
+
+_job_manager: Optional[JobManager] = None
+
+def parse_stage_concurrency(spec: str) -> Dict[str, int]:
+    """Per-stage limits from e.g. 'extraction=8,synthesis=4,persistence=4'; unnamed stages keep their default."""
+    limits = dict(DEFAULT_STAGE_CONCURRENCY)
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() in limits and value:
+            limits[name.strip()] = int(value)
+    return limits
+
+def _stage_concurrency() -> Dict[str, int]:
+    """JOB_STAGE_CONCURRENCY, e.g. 'extraction=8,synthesis=4,persistence=4'."""
+    return parse_stage_concurrency(os.getenv("JOB_STAGE_CONCURRENCY", ""))
+
+def start_job_manager() -> JobManager:
+    """
+    Creates the job queue and starts the worker pool. Called once from the app lifespan.
+    """
+    global _job_manager
+
+    queue = InMemoryJobQueue(
+        max_size=int(os.getenv("JOB_QUEUE_MAX", 100)),
+        retention=float(os.getenv("JOB_RESULT_TTL_SECONDS", 3600))
+    )
+    _job_manager = JobManager(int(os.getenv("JOB_WORKERS", 16)), queue, _stage_concurrency())
+    _job_manager.start()
+    return _job_manager
+
+async def stop_job_manager():
+    """
+    Stops the workers on shutdown. Jobs still queued or running are dropped.
+    """
+    global _job_manager
+
+    if _job_manager is not None:
+        await _job_manager.stop()
+        _job_manager = None
+
+def get_job_manager() -> JobManager:
+    if _job_manager is None:
+        return start_job_manager()
+    return _job_manager
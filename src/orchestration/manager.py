@@ -1,60 +1,158 @@
 import asyncio
-from typing import Optional
+import contextlib
+import hashlib
+import logging
+import os
+import time
+from typing import Optional, Dict, Any, AsyncIterator, AsyncContextManager, Callable, List, Tuple
 
 # Import our data models
-from src.models import ReportResponse
+from src.models import ReportResponse, DeveloperProfileSummary, CodebaseContextSummary
 
 # Import the modules we will build next
 # (These imports will fail until we create the files in the next steps)
 from src.data_extraction.git_extractor import extract_developer_profile
 from src.data_extraction.repo_analyzer import analyze_repo_context
-from src.llm.client import generate_hiring_report
-from src.persistence.firestore import save_report_to_firestore
+from src.llm.client import generate_hiring_report, stream_hiring_report
+from src.persistence.firestore import enqueue_report
+from src.orchestration.singleflight import SingleFlight
+from src.observability.metrics import REPORT_SECONDS, span
+from src.scoring.similarity import score_candidates, vectorize_developers, vectorize_repos, similarity_matrix, rank_matrix
+
+logger = logging.getLogger(__name__)
+
+# Identical concurrent work is done once and shared (e.g. one candidate fanned out to
+# several reviewers, or several candidates evaluated against the same repo at once)
+_profile_flights = SingleFlight("developer_profile")
+_repo_flights = SingleFlight("codebase_context")
+_synthesis_flights = SingleFlight("synthesis")
+
+def _repo_key(repo_url: str, auth_token: Optional[str]) -> Tuple[str, str]:
+    # Different tokens can see different repos, so the token scope is part of the key
+    scope = hashlib.sha256(auth_token.encode()).hexdigest()[:16] if auth_token else "server"
+    return repo_url.rstrip("/").lower(), scope
+
+async def _shared_developer_profile(git_id: str, profile_mode: str = "fast") -> Optional[DeveloperProfileSummary]:
+    with span("extraction.developer_profile"):
+        return await _profile_flights.do(
+            (git_id.lower(), profile_mode), lambda: extract_developer_profile(git_id, profile_mode)
+        )
+
+async def _shared_repo_context(repo_url: str, auth_token: Optional[str]) -> Optional[CodebaseContextSummary]:
+    with span("extraction.repo_context"):
+        return await _repo_flights.do(
+            _repo_key(repo_url, auth_token), lambda: analyze_repo_context(repo_url, auth_token)
+        )
+
+async def _shared_hiring_report(
+    git_id: str,
+    repo_url: str,
+    auth_token: Optional[str],
+    force_refresh: bool,
+    dev_profile: DeveloperProfileSummary,
+    repo_context: CodebaseContextSummary,
+    profile_mode: str = "fast"
+) -> Optional[Dict[str, Any]]:
+    key = (git_id.lower(), profile_mode, _repo_key(repo_url, auth_token), force_refresh)
+    with span("synthesis"):
+        return await _synthesis_flights.do(
+            key, lambda: generate_hiring_report(dev_profile, repo_context, force_refresh)
+        )
+
+def singleflight_stats() -> Dict[str, Any]:
+    return {flights.name: flights.stats() for flights in (_profile_flights, _repo_flights, _synthesis_flights)}
+
+def _extraction_error(
+    git_id: str,
+    repo_url: str,
+    dev_profile: Optional[DeveloperProfileSummary],
+    repo_context: Optional[CodebaseContextSummary]
+) -> Optional[str]:
+    if dev_profile and repo_context:
+        return None
+    error_msg = "Failed to extract data."
+    if not dev_profile: error_msg += f" Could not find user {git_id}."
+    if not repo_context: error_msg += f" Could not access repo {repo_url}."
+    return error_msg
+
+async def _persist_report(
+    git_id: str,
+    repo_url: str,
+    user_id: str,
+    markdown: str,
+    sources: list,
+    dev_profile: DeveloperProfileSummary,
+    repo_context: CodebaseContextSummary
+) -> Optional[str]:
+    # Queued for a batched write-behind; the report ID is known before the write lands
+    full_report_data = {
+        "git_id": git_id,
+        "repo_url": repo_url,
+        "report_markdown": markdown,
+        "sources": sources,
+        "developer_summary": dev_profile.dict(), # Save raw data for debugging/graphs
+        "codebase_summary": repo_context.dict()
+    }
+    with span("persistence"):
+        return await enqueue_report(full_report_data, app_id="commit-card", user_id=user_id)
+
+# Wraps each pipeline stage ('extraction', 'synthesis', 'persistence'); used by the job
+# workers to track progress and apply per-stage concurrency limits
+StageGate = Callable[[str], AsyncContextManager]
+
+def _stage(stage_gate: Optional[StageGate], name: str) -> AsyncContextManager:
+    return stage_gate(name) if stage_gate else contextlib.nullcontext()
 
 async def orchestrate_report_generation(
     git_id: str,
     repo_url: str,
     auth_token: Optional[str],
-    user_id: str
+    user_id: str,
+    force_refresh: bool = False,
+    stage_gate: Optional[StageGate] = None,
+    profile_mode: str = "fast"
 ) -> ReportResponse:
     """
     Coordinator function that runs the full pipeline:
     Extraction -> Synthesis -> Persistence -> Response
     """
-    print(f"🎼 Orchestrator started for {git_id} -> {repo_url}")
+    logger.info("Orchestrator started for %s -> %s", git_id, repo_url)
+    started = time.perf_counter()
+    outcome = "error"
 
     try:
         # --- Step 1: Parallel Data Extraction ---
         # We run both extractors at the same time to save speed.
         # asyncio.gather allows concurrent execution.
         
-        print("⏳ Step 1: Fetching data from GitHub...")
+        logger.debug("Step 1: Fetching data from GitHub...")
         
-        # Launch both tasks
-        dev_task = asyncio.create_task(extract_developer_profile(git_id))
-        repo_task = asyncio.create_task(analyze_repo_context(repo_url, auth_token))
+        async with _stage(stage_gate, "extraction"):
+            # Launch both tasks (joined with identical requests already in flight)
+            dev_task = asyncio.create_task(_shared_developer_profile(git_id, profile_mode))
+            repo_task = asyncio.create_task(_shared_repo_context(repo_url, auth_token))
 
-        # Wait for both to finish
-        dev_profile, repo_context = await asyncio.gather(dev_task, repo_task)
+            # Wait for both to finish
+            dev_profile, repo_context = await asyncio.gather(dev_task, repo_task)
 
         # Check for failures in extraction
-        if not dev_profile or not repo_context:
-            error_msg = "Failed to extract data."
-            if not dev_profile: error_msg += f" Could not find user {git_id}."
-            if not repo_context: error_msg += f" Could not access repo {repo_url}."
-            
+        error_msg = _extraction_error(git_id, repo_url, dev_profile, repo_context)
+        if error_msg:
             return ReportResponse(
                 success=False,
                 markdown_content="",
                 error=error_msg
             )
 
-        print("✅ Step 1 Complete: Data received.")
+        logger.debug("Step 1 Complete: Data received.")
 
         # --- Step 2: LLM Synthesis ---
-        print("⏳ Step 2: Sending data to Gemini LLM...")
+        logger.debug("Step 2: Sending data to Gemini LLM...")
         
-        llm_result = await generate_hiring_report(dev_profile, repo_context)
+        async with _stage(stage_gate, "synthesis"):
+            llm_result = await _shared_hiring_report(
+                git_id, repo_url, auth_token, force_refresh, dev_profile, repo_context, profile_mode
+            )
 
         if not llm_result:
             return ReportResponse(
@@ -63,26 +161,23 @@ async def orchestrate_report_generation(
                 error="LLM Generation failed. Please try again."
             )
 
-        print("✅ Step 2 Complete: Report generated.")
+        logger.debug("Step 2 Complete: Report generated.")
 
         # --- Step 3: Persistence ---
-        print("⏳ Step 3: Saving to Firestore...")
+        logger.debug("Step 3: Saving to Firestore...")
         
         # We assume llm_result is a dictionary containing 'text' and 'sources'
-        full_report_data = {
-            "git_id": git_id,
-            "repo_url": repo_url,
-            "report_markdown": llm_result.get("text", ""),
-            "sources": llm_result.get("sources", []),
-            "developer_summary": dev_profile.dict(), # Save raw data for debugging/graphs
-            "codebase_summary": repo_context.dict()
-        }
-
-        report_id = save_report_to_firestore(full_report_data, app_id="commit-card", user_id=user_id)
+        async with _stage(stage_gate, "persistence"):
+            report_id = await _persist_report(
+                git_id, repo_url, user_id,
+                llm_result.get("text", ""), llm_result.get("sources", []),
+                dev_profile, repo_context
+            )
         
-        print(f"✅ Step 3 Complete. Report ID: {report_id}")
+        logger.info("Report complete. Report ID: %s", report_id)
 
         # --- Step 4: Final Response ---
+        outcome = "success"
         return ReportResponse(
             success=True,
             report_id=str(report_id) if report_id else None,
@@ -98,4 +193,204 @@ async def orchestrate_report_generation(
             success=False,
             markdown_content="",
             error=str(e)
-        )
\ No newline at end of file
+        )
+    finally:
+        REPORT_SECONDS.labels("sync", outcome).observe(time.perf_counter() - started)
+
+async def stream_report_generation(
+    git_id: str,
+    repo_url: str,
+    auth_token: Optional[str],
+    user_id: str,
+    force_refresh: bool = False,
+    profile_mode: str = "fast"
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Same pipeline as orchestrate_report_generation, yielding (event, data) pairs as it goes:
+
+    developer_profile / codebase_context  each extractor's result, as soon as it finishes
+    token                                 a chunk of report Markdown from Gemini
+    complete                              the report was assembled and saved (report_id)
+    error                                 the pipeline stopped; always the last event
+    """
+    logger.info("Streaming orchestrator started for %s -> %s", git_id, repo_url)
+    started = time.perf_counter()
+    outcome = "error"
+
+    dev_task = asyncio.create_task(_shared_developer_profile(git_id, profile_mode))
+    repo_task = asyncio.create_task(_shared_repo_context(repo_url, auth_token))
+
+    try:
+        # --- Step 1: Parallel Data Extraction, reported as each side completes ---
+        pending = {dev_task, repo_task}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result is None:
+                    continue
+                event = "developer_profile" if task is dev_task else "codebase_context"
+                yield event, result.model_dump()
+
+        dev_profile, repo_context = dev_task.result(), repo_task.result()
+        error_msg = _extraction_error(git_id, repo_url, dev_profile, repo_context)
+        if error_msg:
+            yield "error", {"error": error_msg}
+            return
+
+        # --- Step 2: LLM Synthesis, forwarded chunk by chunk ---
+        parts = []
+        async for text in stream_hiring_report(dev_profile, repo_context, force_refresh):
+            parts.append(text)
+            yield "token", {"text": text}
+
+        if not parts:
+            yield "error", {"error": "LLM Generation failed. Please try again."}
+            return
+
+        # --- Step 3: Persistence of the assembled report ---
+        report_id = await _persist_report(git_id, repo_url, user_id, "".join(parts), [], dev_profile, repo_context)
+        logger.info("Streamed report complete. Report ID: %s", report_id)
+        outcome = "success"
+        yield "complete", {"report_id": str(report_id) if report_id else None}
+
+    except Exception as e:
+        print(f"❌ Streaming Orchestrator Error: {e}")
+        yield "error", {"error": str(e) or type(e).__name__}
+    finally:
+        # Client went away mid-stream: stop extraction work nobody will read
+        for task in (dev_task, repo_task):
+            task.cancel()
+        REPORT_SECONDS.labels("stream", outcome).observe(time.perf_counter() - started)
+
+async def stream_candidate_ranking(
+    repo_url: str,
+    git_ids: List[str],
+    auth_token: Optional[str],
+    user_id: str,
+    top_k: int = 10,
+    force_refresh: bool = False
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Ranks many developers against one repository, yielding (event, data) pairs as results land:
+
+    codebase_context  the repo analysis (done once for the whole batch)
+    candidate         one developer's profile and quick pre-LLM fit score (or error)
+    shortlist         the top_k git_ids by fit score, which go on to full LLM reports
+    report            one shortlisted developer's full report
+    complete          summary counts; error events stop the batch
+    """
+    logger.info("Ranking %d candidates against %s", len(git_ids), repo_url)
+
+    repo_context = await _shared_repo_context(repo_url, auth_token)
+    if not repo_context:
+        yield "error", {"error": f"Could not access repo {repo_url}."}
+        return
+    yield "codebase_context", repo_context.model_dump()
+
+    # --- Profiles: extracted concurrently, gated by a semaphore (GitHub quota is scheduled per call) ---
+    semaphore = asyncio.Semaphore(int(os.getenv("RANK_EXTRACT_CONCURRENCY", 8)))
+
+    async def score_candidate(git_id: str):
+        async with semaphore:
+            dev_profile = await _shared_developer_profile(git_id)
+        if not dev_profile:
+            return git_id, None, None
+        return git_id, dev_profile, float(score_candidates([dev_profile], repo_context)[0])
+
+    profiles: Dict[str, DeveloperProfileSummary] = {}
+    scores: Dict[str, float] = {}
+    candidates = list(dict.fromkeys(git_ids)) # De-duplicated, order kept
+    tasks = [asyncio.create_task(score_candidate(git_id)) for git_id in candidates]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                git_id, dev_profile, score = await next_done
+            except Exception as e:
+                yield "error", {"error": str(e)}
+                return
+            if dev_profile is None:
+                yield "candidate", {"git_id": git_id, "error": f"Could not find user {git_id}."}
+                continue
+            profiles[git_id], scores[git_id] = dev_profile, score
+            yield "candidate", {"git_id": git_id, "fit_score": score, "developer_summary": dev_profile.model_dump()}
+
+        # --- Shortlist: only the best top_k go to Gemini ---
+        shortlist = sorted(scores, key=lambda g: scores[g], reverse=True)[:top_k]
+        yield "shortlist", {"git_ids": shortlist, "fit_scores": [scores[g] for g in shortlist]}
+
+        async def report_for(rank: int, git_id: str):
+            llm_result = await _shared_hiring_report(
+                git_id, repo_url, auth_token, force_refresh, profiles[git_id], repo_context
+            )
+            if not llm_result:
+                return {"git_id": git_id, "rank": rank, "fit_score": scores[git_id], "error": "LLM Generation failed."}
+            report_id = await _persist_report(
+                git_id, repo_url, user_id, llm_result.get("text", ""), llm_result.get("sources", []),
+                profiles[git_id], repo_context
+            )
+            return {
+                "git_id": git_id,
+                "rank": rank,
+                "fit_score": scores[git_id],
+                "report_id": report_id,
+                "markdown_content": llm_result.get("text", ""),
+            }
+
+        tasks = [asyncio.create_task(report_for(rank, git_id)) for rank, git_id in enumerate(shortlist, start=1)]
+        reports = 0
+        for next_done in asyncio.as_completed(tasks):
+            report = await next_done
+            reports += "error" not in report
+            yield "report", report
+
+        yield "complete", {"candidates": len(candidates), "scored": len(scores), "reports": reports}
+
+    except Exception as e:
+        print(f"❌ Ranking Error: {e}")
+        yield "error", {"error": str(e) or type(e).__name__}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def score_candidates_against_repos(
+    git_ids: List[str],
+    repo_urls: List[str],
+    auth_token: Optional[str],
+    top_k: int = 10
+) -> Dict[str, Any]:
+    """
+    Deterministic (no LLM) fit scores for every candidate x repo pair.
+    Profiles and repos are extracted concurrently; the scoring itself is one vectorized pass.
+    """
+    semaphore = asyncio.Semaphore(int(os.getenv("RANK_EXTRACT_CONCURRENCY", 8)))
+
+    async def profile_for(git_id: str):
+        async with semaphore:
+            return await _shared_developer_profile(git_id)
+
+    git_ids = list(dict.fromkeys(git_ids))
+    repo_urls = list(dict.fromkeys(repo_urls))
+    results = await asyncio.gather(
+        *(profile_for(git_id) for git_id in git_ids),
+        *(_shared_repo_context(url, auth_token) for url in repo_urls)
+    )
+    profiles, contexts = results[:len(git_ids)], results[len(git_ids):]
+
+    rows = [(g, p) for g, p in zip(git_ids, profiles) if p]
+    cols = [(u, c) for u, c in zip(repo_urls, contexts) if c]
+    unavailable = [g for g, p in zip(git_ids, profiles) if not p] + [u for u, c in zip(repo_urls, contexts) if not c]
+    if not rows or not cols:
+        return {"git_ids": [], "repo_urls": [], "scores": [], "top_candidates": {}, "unavailable": unavailable}
+
+    scores = similarity_matrix(
+        vectorize_developers([p for _, p in rows]), vectorize_repos([c for _, c in cols])
+    )
+    top = rank_matrix(scores, top_k)
+    return {
+        "git_ids": [g for g, _ in rows],
+        "repo_urls": [u for u, _ in cols],
+        "scores": scores.tolist(),
+        "top_candidates": {url: [rows[i][0] for i in top[col]] for col, (url, _) in enumerate(cols)},
+        "unavailable": unavailable,
+    }
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as a task; callers arriving while it runs
+    await the same task and get the same result (or the same exception). Nothing is
+    kept once the task finishes, so this never serves stale data; it only deduplicates.
+
+    Cancellation: a cancelled caller only stops waiting. The shared task is cancelled
+    once the last caller waiting on it has gone.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.executions = 0 # Calls that started the work
+        self.coalesced = 0  # Calls that joined work already in flight
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self._calls[key] = call
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call) # Later callers start fresh instead of joining a cancelled task
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -1,19 +1,59 @@
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore
-from typing import Dict, Any, Optional
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
+from src.persistence.memory_store import MemoryFirestore, new_document_id
+from src.persistence.write_behind import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
 
 # Global DB client variable
 db = None
+_init_attempted = False
+# initialize_firebase may run in the startup warm-up thread while a request asks for the DB
+_init_lock = threading.RLock()
+
+# Write-behind queue for reports (owned by the FastAPI lifespan in src/main.py)
+_writer: Optional[WriteBehindQueue] = None
 
 def initialize_firebase():
     """
     Initializes the Firebase Admin SDK using the service account key.
-    This should be called when the application starts.
+    This should be called when the application starts (the lifespan's warm-up runs it in a
+    worker thread); the SDK and its gRPC stack are only imported here.
+
+    PERSISTENCE_BACKEND=memory uses an in-process fake instead of Firestore, and
+    FIRESTORE_EMULATOR_HOST points the client at a local Firestore emulator.
     """
+    global _init_attempted
+
+    with _init_lock:
+        try:
+            _connect()
+        finally:
+            # Set last, so callers waiting on the lock see the finished client
+            _init_attempted = True
+
+def _connect():
     global db
-    
+
+    if os.getenv("PERSISTENCE_BACKEND", "firestore").lower() == "memory":
+        db = MemoryFirestore()
+        print("✅ Using in-memory persistence (PERSISTENCE_BACKEND=memory).")
+        return
+
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        # The emulator accepts anonymous credentials; no service account needed
+        from google.cloud import firestore as cloud_firestore
+        db = cloud_firestore.Client(project=os.getenv("FIREBASE_PROJECT_ID", "commit-card-local"))
+        print(f"✅ Firestore emulator connected ({os.getenv('FIRESTORE_EMULATOR_HOST')}).")
+        return
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
     # Check if already initialized to prevent errors
     if firebase_admin._apps:
         db = firestore.client()
@@ -33,24 +73,49 @@ def initialize_firebase():
     except Exception as e:
         print(f"❌ Failed to initialize Firebase: {e}")
 
+def get_db():
+    """
+    Returns the DB client. Initialization is attempted once (at startup, or on first
+    use in scripts); a missing key does not trigger a retry on every request.
+    A request that arrives while the startup warm-up is connecting waits for it.
+    """
+    if db is None and not _init_attempted:
+        with _init_lock:
+            if not _init_attempted:
+                initialize_firebase()
+    return db
+
+async def wait_for_db():
+    """
+    get_db for async callers. While the warm-up thread holds the init lock (SDK import),
+    waiting for it happens in a worker thread, so the event loop keeps serving.
+    """
+    if db is None and not _init_attempted:
+        return await asyncio.to_thread(get_db)
+    return db
+
+def persistence_ready() -> bool:
+    return db is not None
+
+def _report_path(app_id: str, user_id: str, report_id: str) -> Tuple[str, ...]:
+    # We store reports under the specific user to allow for "My History" features later
+    return ("artifacts", app_id, "users", user_id, "reports", report_id)
+
 def save_report_to_firestore(
     report_data: Dict[str, Any], 
     app_id: str = "commit-card", 
     user_id: str = "default_user"
 ) -> Optional[str]:
     """
-    Saves the structured report to the database.
+    Saves the structured report to the database (blocking; see enqueue_report for the async path).
     
     Structure: /artifacts/{app_id}/users/{user_id}/reports/{report_id}
     """
-    if db is None:
-        initialize_firebase()
-        if db is None:
-            return None # Fail gracefully if DB is down
+    if get_db() is None:
+        return None # Fail gracefully if DB is down
 
     try:
         # 1. Define the path
-        # We store reports under the specific user to allow for "My History" features later
         collection_ref = db.collection('artifacts').document(app_id)\
                            .collection('users').document(user_id)\
                            .collection('reports')
@@ -61,21 +126,77 @@ def save_report_to_firestore(
         # 3. Add Document (Firestore auto-generates the ID)
         update_time, doc_ref = collection_ref.add(report_data)
         
-        print(f"💾 Report saved with ID: {doc_ref.id}")
+        logger.debug("Report saved with ID: %s", doc_ref.id)
         return doc_ref.id
 
     except Exception as e:
         print(f"❌ Error saving to Firestore: {e}")
         return None
 
-def get_report_by_id(report_id: str, app_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+def start_report_writer(connect: bool = True) -> WriteBehindQueue:
     """
-    Retrieves a specific report by ID.
+    Starts the write-behind queue, connecting to the DB first unless 'connect' is False
+    (the app lifespan connects in its background warm-up instead). Called once at startup.
     """
-    if db is None:
+    global _writer
+
+    if connect:
         initialize_firebase()
-        if db is None:
-            return None # Fail gracefully if DB is down
+    _writer = WriteBehindQueue(
+        get_db,
+        batch_size=int(os.getenv("FIRESTORE_BATCH_SIZE", 20)),
+        flush_interval=float(os.getenv("FIRESTORE_FLUSH_SECONDS", 0.5)),
+        max_retries=int(os.getenv("FIRESTORE_MAX_RETRIES", 5)),
+        max_pending=int(os.getenv("FIRESTORE_MAX_PENDING", 10000))
+    )
+    _writer.start()
+    return _writer
+
+async def stop_report_writer():
+    """
+    Flushes queued reports (up to FIRESTORE_DRAIN_SECONDS) on shutdown.
+    """
+    global _writer
+
+    if _writer is not None:
+        await _writer.stop(timeout=float(os.getenv("FIRESTORE_DRAIN_SECONDS", 10)))
+        _writer = None
+
+def get_report_writer() -> Optional[WriteBehindQueue]:
+    return _writer
+
+async def enqueue_report(
+    report_data: Dict[str, Any],
+    app_id: str = "commit-card",
+    user_id: str = "default_user"
+) -> Optional[str]:
+    """
+    Queues the report for a batched write and returns its ID immediately.
+    The ID is generated client-side (same format as Firestore's), so nobody waits on the write.
+    Without a running writer (scripts) this falls back to a direct save in a worker thread.
+    """
+    if _writer is None:
+        return await asyncio.to_thread(save_report_to_firestore, report_data, app_id, user_id)
+
+    if await wait_for_db() is None:
+        return None # Fail gracefully if DB is down
+
+    report_id = new_document_id()
+    report_data['created_at'] = datetime.utcnow()
+    await _writer.enqueue(_report_path(app_id, user_id, report_id), report_data)
+    return report_id
+
+def get_report_by_id(report_id: str, app_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Retrieves a specific report by ID (including reports still waiting in the write queue).
+    """
+    if _writer is not None:
+        queued = _writer.pending(_report_path(app_id, user_id, report_id))
+        if queued is not None:
+            return dict(queued)
+
+    if get_db() is None:
+        return None # Fail gracefully if DB is down
     
     try:
         doc_ref = db.collection('artifacts').document(app_id)\
@@ -0,0 +1,87 @@
+import copy
+import secrets
+import string
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+# Same alphabet and length as Firestore's auto-generated document IDs
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+def new_document_id() -> str:
+    return "".join(secrets.choice(_ID_ALPHABET) for _ in range(20))
+
+class MemoryDocumentSnapshot:
+    def __init__(self, doc_id: str, data: Optional[Dict[str, Any]]):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+class MemoryDocumentReference:
+    def __init__(self, store: "MemoryFirestore", path: str):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str) -> "MemoryCollectionReference":
+        return MemoryCollectionReference(self._store, f"{self.path}/{name}")
+
+    def set(self, data: Dict[str, Any]):
+        self._store._write([(self.path, data)])
+
+    def get(self) -> MemoryDocumentSnapshot:
+        return MemoryDocumentSnapshot(self.id, self._store._read(self.path))
+
+class MemoryCollectionReference:
+    def __init__(self, store: "MemoryFirestore", path: str):
+        self._store = store
+        self.path = path
+
+    def document(self, doc_id: Optional[str] = None) -> MemoryDocumentReference:
+        return MemoryDocumentReference(self._store, f"{self.path}/{doc_id or new_document_id()}")
+
+    def add(self, data: Dict[str, Any]) -> Tuple[None, MemoryDocumentReference]:
+        doc_ref = self.document()
+        doc_ref.set(data)
+        return None, doc_ref
+
+class MemoryWriteBatch:
+    def __init__(self, store: "MemoryFirestore"):
+        self._store = store
+        self._writes: List[Tuple[str, Dict[str, Any]]] = []
+
+    def set(self, doc_ref: MemoryDocumentReference, data: Dict[str, Any]):
+        self._writes.append((doc_ref.path, data))
+
+    def commit(self):
+        self._store._write(self._writes)
+        self._store.batches_committed += 1
+
+class MemoryFirestore:
+    """
+    In-process stand-in for the Firestore client, covering the calls this app makes
+    (nested collection/document refs, set/get/add and batched writes).
+    Selected with PERSISTENCE_BACKEND=memory for local runs, tests and benchmarks.
+    """
+
+    def __init__(self):
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.batches_committed = 0
+        self._lock = threading.Lock() # Writes arrive from worker threads
+
+    def collection(self, name: str) -> MemoryCollectionReference:
+        return MemoryCollectionReference(self, name)
+
+    def batch(self) -> MemoryWriteBatch:
+        return MemoryWriteBatch(self)
+
+    def _write(self, writes: List[Tuple[str, Dict[str, Any]]]):
+        with self._lock:
+            for path, data in writes:
+                self.documents[path] = copy.deepcopy(data)
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.documents.get(path)
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.observability.metrics import FIRESTORE_WRITES, span
+
+logger = logging.getLogger(__name__)
+
+# One pending write: (document path segments, document data)
+PendingWrite = Tuple[Tuple[str, ...], Dict[str, Any]]
+
+class WriteBehindQueue:
+    """
+    Buffers document writes and flushes them to Firestore as batched writes.
+
+    - A flush happens when 'batch_size' writes are waiting or 'flush_interval' seconds
+      after the first one arrived, whichever comes first.
+    - The (blocking) batch commit runs in a worker thread, so the event loop never waits on it.
+    - A failed commit is retried with exponential backoff and jitter; after 'max_retries'
+      the batch is dropped and counted in 'failed'.
+    - Queued documents stay readable via pending() until committed (read-your-writes).
+    - stop() flushes what is queued at once, without waiting out 'flush_interval'.
+    """
+
+    def __init__(
+        self,
+        get_db: Callable[[], Any],
+        batch_size: int = 20,
+        flush_interval: float = 0.5,
+        max_retries: int = 5,
+        max_pending: int = 10000
+    ):
+        self.get_db = get_db
+        self.batch_size = min(batch_size, 500) # Firestore's per-batch write limit
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: "asyncio.Queue[Optional[PendingWrite]]" = asyncio.Queue(maxsize=max_pending)
+        self._pending: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._draining = False
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, path: Tuple[str, ...], data: Dict[str, Any]):
+        """Queues a document write. Waits only if 'max_pending' writes are already queued."""
+        self._pending[path] = data
+        await self._queue.put((path, data))
+
+    def pending(self, path: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        return self._pending.get(path)
+
+    async def _next_batch(self) -> List[PendingWrite]:
+        batch: List[PendingWrite] = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if self._draining:
+                # Shutting down: take what is queued now
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    if batch:
+                        break
+                    item = await self._queue.get()
+            elif deadline is None:
+                item = await self._queue.get()
+                deadline = time.monotonic() + self.flush_interval
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None: # Wake-up from stop()
+                self._queue.task_done()
+                continue
+            batch.append(item)
+        return batch
+
+    def _commit(self, batch: List[PendingWrite]):
+        db = self.get_db()
+        if db is None:
+            raise RuntimeError("Firestore is not configured.")
+        write_batch = db.batch()
+        for path, data in batch:
+            ref = db
+            for i, segment in enumerate(path):
+                ref = ref.collection(segment) if i % 2 == 0 else ref.document(segment)
+            write_batch.set(ref, data)
+        write_batch.commit()
+
+    async def _flush(self, batch: List[PendingWrite]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with span("firestore.commit"):
+                    await asyncio.to_thread(self._commit, batch)
+                self.written += len(batch)
+                self.batches += 1
+                FIRESTORE_WRITES.labels("written").inc(len(batch))
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error("Dropping %d writes after %d attempts: %s", len(batch), attempt + 1, e)
+                    self.failed += len(batch)
+                    FIRESTORE_WRITES.labels("dropped").inc(len(batch))
+                    break
+                delay = min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.debug("Batch commit failed (%s). Retrying in %.1fs.", e, delay)
+                await asyncio.sleep(delay)
+
+        for path, data in batch:
+            if self._pending.get(path) is data:
+                del self._pending[path]
+            self._queue.task_done()
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            # Shielded so shutdown never abandons a commit halfway through its retries
+            await asyncio.shield(self._flush(batch))
+
+    async def stop(self, timeout: float = 10.0):
+        """Drains queued writes (up to 'timeout' seconds), then stops the flusher."""
+        if self._task is None:
+            return
+        self._draining = True
+        try:
+            self._queue.put_nowait(None) # Ends a batch that is waiting out flush_interval
+        except asyncio.QueueFull:
+            pass # Full queue: the flusher is not waiting on anything
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Shutdown with %d writes still queued.", self._queue.qsize())
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
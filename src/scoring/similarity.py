@@ -0,0 +1,134 @@
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.models import DeveloperProfileSummary, CodebaseContextSummary
+
+# Fixed language vocabulary (GitHub linguist names). Languages outside it are hashed
+# into a few overflow buckets, so rare languages still match each other.
+LANGUAGE_VOCAB = (
+    "Python", "JavaScript", "TypeScript", "Java", "Go", "Rust", "C", "C++", "C#", "Ruby",
+    "PHP", "Swift", "Kotlin", "Scala", "Shell", "Dockerfile", "HTML", "CSS", "SCSS", "Vue",
+    "Svelte", "Dart", "Elixir", "Erlang", "Haskell", "Clojure", "OCaml", "F#", "Lua", "Perl",
+    "R", "Julia", "MATLAB", "Objective-C", "Groovy", "PowerShell", "HCL", "Nix", "Zig", "Solidity",
+    "Jupyter Notebook", "TeX", "Makefile", "CMake", "Assembly", "Fortran", "Cuda", "SQL", "PLpgSQL", "Starlark",
+)
+LANGUAGE_OVERFLOW_BUCKETS = 14
+TOPIC_DIM = 256 # Hashed bag-of-words buckets for topics and path terms
+
+DEFAULT_SCORING_WEIGHTS = {"language": 0.8, "topic": 0.2}
+
+_LANGUAGE_INDEX = {name.lower(): i for i, name in enumerate(LANGUAGE_VOCAB)}
+LANGUAGE_DIM = len(LANGUAGE_VOCAB) + LANGUAGE_OVERFLOW_BUCKETS
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+@dataclass
+class VectorBatch:
+    """Row-normalized language and topic vectors for a list of profiles or repos."""
+    languages: np.ndarray # (n, LANGUAGE_DIM) float32
+    topics: np.ndarray    # (n, TOPIC_DIM) float32
+
+def _bucket(token: str, size: int) -> int:
+    # crc32 is stable across processes (unlike hash()), so vectors are reproducible
+    return zlib.crc32(token.encode("utf-8")) % size
+
+def _language_slot(name: str) -> int:
+    slot = _LANGUAGE_INDEX.get(name.lower())
+    if slot is None:
+        slot = len(LANGUAGE_VOCAB) + _bucket(name.lower(), LANGUAGE_OVERFLOW_BUCKETS)
+    return slot
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+def _share(value) -> float:
+    # Repo language shares come formatted as "80.0%"
+    try:
+        return float(str(value).rstrip("%"))
+    except ValueError:
+        return 0.0
+
+def vectorize_developers(profiles: Sequence[DeveloperProfileSummary]) -> VectorBatch:
+    """Developer language weights ('score') and tech_focus topics as vectors."""
+    languages = np.zeros((len(profiles), LANGUAGE_DIM), dtype=np.float32)
+    topics = np.zeros((len(profiles), TOPIC_DIM), dtype=np.float32)
+    for row, profile in enumerate(profiles):
+        for lang in profile.top_languages:
+            if lang.get("name"):
+                languages[row, _language_slot(lang["name"])] += float(lang.get("score", 1))
+        for topic in profile.tech_focus:
+            for token in _TOKEN.findall(topic.lower()):
+                topics[row, _bucket(token, TOPIC_DIM)] = 1.0
+    return VectorBatch(_normalize_rows(languages), _normalize_rows(topics))
+
+def vectorize_repos(contexts: Sequence[CodebaseContextSummary]) -> VectorBatch:
+    """Repo language shares, and terms from language names and hot file paths, as vectors."""
+    languages = np.zeros((len(contexts), LANGUAGE_DIM), dtype=np.float32)
+    topics = np.zeros((len(contexts), TOPIC_DIM), dtype=np.float32)
+    for row, context in enumerate(contexts):
+        for lang in context.languages:
+            if lang.get("name"):
+                languages[row, _language_slot(lang["name"])] += _share(lang.get("share", 0))
+        text = " ".join(
+            [lang.get("name", "") for lang in context.languages]
+            + context.high_churn_files
+            + context.complexity_hotspots
+        )
+        for token in _TOKEN.findall(text.lower()):
+            topics[row, _bucket(token, TOPIC_DIM)] = 1.0
+    return VectorBatch(_normalize_rows(languages), _normalize_rows(topics))
+
+def scoring_weights() -> Dict[str, float]:
+    """SCORING_WEIGHTS, e.g. 'language=0.8,topic=0.2'."""
+    weights = dict(DEFAULT_SCORING_WEIGHTS)
+    for part in os.getenv("SCORING_WEIGHTS", "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() in weights and value:
+            weights[name.strip()] = float(value)
+    return weights
+
+def similarity_matrix(developers: VectorBatch, repos: VectorBatch) -> np.ndarray:
+    """
+    (candidates x repos) fit scores in 0-100: weighted cosine similarity of the language
+    and topic vectors. Rows are pre-normalized, so each part is one matrix product.
+    """
+    weights = scoring_weights()
+    total = sum(weights.values()) or 1.0
+    scores = (weights["language"] / total) * (developers.languages @ repos.languages.T)
+    scores += (weights["topic"] / total) * (developers.topics @ repos.topics.T)
+    # float64 on the way out so rounded scores serialize cleanly (57.3, not 57.29999923706055)
+    return np.round(100.0 * scores.astype(np.float64), 1)
+
+def score_candidates(
+    profiles: Sequence[DeveloperProfileSummary],
+    repo_context: CodebaseContextSummary
+) -> np.ndarray:
+    """One repo vs many candidates: a (n,) score vector."""
+    return similarity_matrix(vectorize_developers(profiles), vectorize_repos([repo_context]))[:, 0]
+
+def score_breakdown(dev_profile: DeveloperProfileSummary, repo_context: CodebaseContextSummary) -> Dict[str, float]:
+    """Overall score plus its language and topic parts (each 0-100) for one pair."""
+    developer = vectorize_developers([dev_profile])
+    repo = vectorize_repos([repo_context])
+    return {
+        "score": float(similarity_matrix(developer, repo)[0, 0]),
+        "language": round(float(developer.languages[0] @ repo.languages[0]) * 100, 1),
+        "topic": round(float(developer.topics[0] @ repo.topics[0]) * 100, 1),
+    }
+
+def rank_matrix(scores: np.ndarray, top_k: int) -> List[List[int]]:
+    """For each repo column, the row indices of the top_k candidates, best first."""
+    top_k = min(top_k, scores.shape[0])
+    if top_k <= 0:
+        return [[] for _ in range(scores.shape[1])]
+    # argpartition is O(n) per column; only the k winners get sorted
+    top = np.argpartition(-scores, top_k - 1, axis=0)[:top_k]
+    order = np.take_along_axis(scores, top, axis=0).argsort(axis=0)[::-1]
+    return np.take_along_axis(top, order, axis=0).T.tolist()
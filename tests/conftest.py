@@ -0,0 +1,103 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Tuple
+
+import pytest
+
+from src.llm import client
+from src.models import CodebaseContextSummary, DeveloperProfileSummary
+
+class FakeGeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeGeminiError(Exception):
+    """API error; 'code' is the HTTP status, as on google.api_core exceptions."""
+
+    def __init__(self, code: int = 503):
+        super().__init__(f"{code} (injected)")
+        self.code = code
+
+class FakeGeminiStream:
+    """Async-iterable of FakeGeminiResponse chunks, like AsyncGenerateContentResponse."""
+
+    def __init__(self, chunks, chunk_delay: float):
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+
+    async def __aiter__(self) -> AsyncIterator[FakeGeminiResponse]:
+        for chunk in self.chunks:
+            await asyncio.sleep(self.chunk_delay)
+            yield FakeGeminiResponse(chunk)
+
+class FakeGeminiModel:
+    """
+    Stand-in for genai.GenerativeModel that answers after 'latency_ms' (spread over
+    'stream_chunks' chunks when streaming). 'stall_ms' delays every call before it
+    answers, and 'fail' makes every call raise FakeGeminiError(503).
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 10.0,
+        stream_chunks: int = 4,
+        stall_ms: float = 0.0,
+        fail: bool = False,
+        model_name: str = "models/fake-gemini"
+    ):
+        self.latency_ms = latency_ms
+        self.stream_chunks = stream_chunks
+        self.stall_ms = stall_ms
+        self.fail = fail
+        self.model_name = model_name
+        self.calls = 0
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise FakeGeminiError()
+        await asyncio.sleep(self.stall_ms / 1000)
+        text = f"## Core Fit Assessment\nStrong ({len(str(contents))} prompt chars)"
+        if stream:
+            size = max(1, len(text) // self.stream_chunks)
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            return FakeGeminiStream(chunks, self.latency_ms / 1000 / len(chunks))
+        await asyncio.sleep(self.latency_ms / 1000)
+        return FakeGeminiResponse(text)
+
+@pytest.fixture
+def dev_profile() -> DeveloperProfileSummary:
+    return DeveloperProfileSummary(
+        top_languages=[{"name": "Python", "score": 12}, {"name": "Go", "score": 4}],
+        contribution_style="Active Maintainer",
+        tech_focus=["api", "cli", "ml"]
+    )
+
+@pytest.fixture
+def repo_context() -> CodebaseContextSummary:
+    return CodebaseContextSummary(
+        languages=[{"name": "Python", "share": "80.0%"}],
+        high_churn_files=["src/app.py", "src/models.py"],
+        complexity_hotspots=["src/app.py (12 KB, 9 entries in dir)"]
+    )
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Installs FakeGeminiModels (built from the given keyword arguments) as the LLM client's
+    primary and fallback models, without a report cache, and returns them.
+    """
+    def install(primary: Dict[str, Any], fallback: Dict[str, Any]) -> Tuple[FakeGeminiModel, FakeGeminiModel]:
+        models = FakeGeminiModel(model_name="models/primary", **primary), FakeGeminiModel(model_name="models/fallback", **fallback)
+        monkeypatch.setattr(client, "_model", models[0])
+        monkeypatch.setattr(client, "_fallback_model", models[1])
+        monkeypatch.setattr(client, "_semaphore", None)
+        monkeypatch.setattr(client, "_report_cache", None)
+        monkeypatch.setattr(client, "_report_cache_ready", True)
+        monkeypatch.setattr(client, "_init_attempted", True)
+        return models
+
+    monkeypatch.setenv("LLM_HEDGE", "true")
+    monkeypatch.setenv("LLM_HEDGE_AFTER_MS", "50")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "2")
+    monkeypatch.setenv("LLM_RETRY_BACKOFF_MS", "1")
+    return install
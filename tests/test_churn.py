@@ -0,0 +1,152 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from src.data_extraction import churn, repo_analyzer
+from src.data_extraction.churn import ChurnResult, compute_file_churn
+
+DAY = 86400.0
+
+class Clock:
+    """Stands in for the time module in churn.py."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self.payload = payload
+        self.text = ""
+
+    def json(self):
+        return self.payload
+
+class FakeHistory:
+    """
+    Default-branch history served like HISTORY_QUERY, newest commit first, two commits a page.
+    Each commit is (oid, committed_at, pull request number or None, {path: (additions, deletions)}).
+    """
+
+    def __init__(self):
+        self.commits = []
+        self.queries = 0
+
+    def push(self, oid: str, committed_at: float, pr=None, files=None):
+        self.commits.insert(0, (oid, committed_at, pr, files or {}))
+
+    async def graphql(self, query, variables, token=None):
+        self.queries += 1
+        start = int(variables["after"] or 0)
+        end = min(start + 2, start + variables["first"])
+        nodes = []
+        for oid, committed_at, pr, files in self.commits[start:end]:
+            pull_requests = [] if pr is None else [{
+                "number": pr,
+                "files": {"nodes": [{"path": p, "additions": a, "deletions": d} for p, (a, d) in files.items()]}
+            }]
+            nodes.append({
+                "oid": oid,
+                "committedDate": datetime.fromtimestamp(committed_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "associatedPullRequests": {"nodes": pull_requests},
+            })
+        return FakeResponse({"data": {
+            "rateLimit": {"cost": 1},
+            "repository": {"defaultBranchRef": {"target": {
+                "oid": self.commits[0][0],
+                "history": {"pageInfo": {"hasNextPage": end < len(self.commits), "endCursor": str(end)}, "nodes": nodes},
+            }}},
+        }})
+
+@pytest.fixture
+def history(monkeypatch):
+    fake = FakeHistory()
+    monkeypatch.setattr(churn, "github_graphql", fake.graphql)
+    monkeypatch.setenv("CHURN_MAX_REQUESTS", "50")
+    monkeypatch.setenv("CHURN_MAX_POINTS", "100")
+    monkeypatch.setenv("CHURN_HALF_LIFE_DAYS", "30")
+    return fake
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1_750_000_000.0)
+    monkeypatch.setattr(churn, "time", clock)
+    return clock
+
+def _compute(**kwargs) -> ChurnResult:
+    return asyncio.run(compute_file_churn("o", "r", "token", **kwargs))
+
+def _indexed(result: ChurnResult, seen, updates: int = 0):
+    # As stored in the repo index
+    return {"churn": result.to_dict(), "pull_requests": sorted(seen), "updates": updates}
+
+def _assert_same_churn(merged: ChurnResult, full: ChurnResult):
+    assert merged.head_sha == full.head_sha
+    assert merged.commits_analyzed == full.commits_analyzed
+    assert merged.unattributed_commits == full.unattributed_commits
+    assert set(merged.files) == set(full.files)
+    for path, expected in full.files.items():
+        entry = merged.files[path]
+        assert (entry.changes, entry.additions, entry.deletions) == (expected.changes, expected.additions, expected.deletions)
+        assert entry.last_changed == expected.last_changed
+        assert entry.score == pytest.approx(expected.score, rel=1e-5)
+
+def _old_history(history: FakeHistory, now: float):
+    history.push("c1", now - 60 * DAY, pr=1, files={"app.py": (50, 0), "README.md": (10, 0)})
+    history.push("c2", now - 40 * DAY, pr=2, files={"app.py": (5, 3), "util.py": (20, 0)})
+    history.push("c3", now - 30 * DAY) # Direct push: no pull request
+    history.push("c4", now - 20 * DAY, pr=3, files={"util.py": (1, 1)})
+    history.push("c5", now - 10 * DAY, pr=3, files={"util.py": (1, 1)}) # Same PR (merge workflow)
+
+def test_incremental_churn_matches_a_full_recompute(history, clock):
+    _old_history(history, clock.now)
+    seen = set()
+    old = _compute(seen_pull_requests=seen)
+    assert old.commits_analyzed == 5
+
+    # Ten days later: new commits, two of them from the same PR
+    clock.now += 10 * DAY
+    history.push("c6", clock.now - 8 * DAY, pr=4, files={"app.py": (7, 2), "new.py": (30, 0)})
+    history.push("c7", clock.now - 5 * DAY, pr=4, files={"app.py": (7, 2), "new.py": (30, 0)})
+    history.push("c8", clock.now - 1 * DAY, pr=5, files={"README.md": (2, 2)})
+
+    merged, merged_seen, incremental = asyncio.run(repo_analyzer._indexed_churn("o", "r", "token", _indexed(old, seen)))
+    assert incremental
+    assert history.queries == 3 + 2 # The incremental walk stopped at c5
+
+    full_seen = set()
+    full = _compute(seen_pull_requests=full_seen)
+    _assert_same_churn(merged, full)
+    assert merged_seen == full_seen == {1, 2, 3, 4, 5}
+    assert merged.computed_at == full.computed_at == clock.now
+
+def test_force_push_falls_back_to_a_full_rebuild(history, clock):
+    _old_history(history, clock.now)
+    seen = set()
+    old = _compute(seen_pull_requests=seen)
+
+    # History rewritten: the indexed HEAD (c5) is gone
+    clock.now += 2 * DAY
+    history.commits = [commit for commit in history.commits if commit[0] not in ("c4", "c5")]
+    history.push("c5b", clock.now - 1 * DAY, pr=6, files={"util.py": (3, 0)})
+
+    rebuilt, rebuilt_seen, incremental = asyncio.run(repo_analyzer._indexed_churn("o", "r", "token", _indexed(old, seen)))
+    assert not incremental
+    full_seen = set()
+    _assert_same_churn(rebuilt, _compute(seen_pull_requests=full_seen))
+    assert rebuilt_seen == full_seen == {1, 2, 6} # PR 3 is no longer in history
+
+def test_too_many_updates_force_a_full_rebuild(history, clock, monkeypatch):
+    monkeypatch.setenv("REPO_INDEX_MAX_UPDATES", "5")
+    _old_history(history, clock.now)
+    seen = set()
+    old = _compute(seen_pull_requests=seen)
+    history.push("c6", clock.now, pr=4, files={"app.py": (1, 1)})
+
+    _, _, incremental = asyncio.run(repo_analyzer._indexed_churn("o", "r", "token", _indexed(old, seen, updates=5)))
+    assert not incremental
@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from src.data_extraction.clone_analyzer import CloneCache, analyze_clone, count_lines, iter_numstat
+
+GIT_ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.com",
+    "GIT_CONFIG_NOSYSTEM": "1", "HOME": os.devnull
+}
+
+def git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, env=GIT_ENV, check=True, capture_output=True, text=True).stdout.strip()
+
+def commit(work, message, files=None, remove=()):
+    for path, content in (files or {}).items():
+        with open(os.path.join(work, path), "wb") as f:
+            f.write(content)
+    for path in remove:
+        git("rm", "-q", path, cwd=work)
+    git("add", "-A", cwd=work)
+    git("commit", "-q", "-m", message, cwd=work)
+
+@pytest.fixture
+def origin(tmp_path):
+    """
+    Bare repository with three commits, served over file:// with partial clone support:
+      1. add a.py (3 lines) and b.txt (2 lines)
+      2. a.py: +2 -1 (now 4 lines), add binary bin.dat
+      3. delete b.txt
+    """
+    bare = tmp_path / "origin.git"
+    work = tmp_path / "work"
+    git("init", "-q", "--bare", "-b", "main", str(bare))
+    git("config", "uploadpack.allowFilter", "true", cwd=bare)
+    git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=bare)
+    git("clone", "-q", str(bare), str(work))
+    git("checkout", "-q", "-b", "main", cwd=work)
+
+    commit(work, "first", {"a.py": b"one\ntwo\nthree\n", "b.txt": b"x\ny\n"})
+    commit(work, "second", {"a.py": b"one\nTWO\nthree\nfour\n", "bin.dat": b"\x00\x01\x02"})
+    commit(work, "third", remove=["b.txt"])
+    git("push", "-q", "origin", "main", cwd=work)
+    return f"file://{bare}", git("rev-parse", "HEAD", cwd=work)
+
+@pytest.fixture
+def cache(tmp_path):
+    return CloneCache(root=str(tmp_path / "clones"), max_bytes=1024 ** 3, depth=0, blob_filter="blob:none")
+
+def test_numstat_and_line_counts(origin, cache):
+    url, _ = origin
+    repo_dir = cache.ensure(url, "origin")
+
+    rows = [(path, added, deleted) for _, _, path, added, deleted in iter_numstat(cache, repo_dir, max_commits=10)]
+    assert sorted(rows) == sorted([
+        ("b.txt", 0, 2),
+        ("a.py", 2, 1), ("bin.dat", 0, 0),
+        ("a.py", 3, 0), ("b.txt", 2, 0)
+    ])
+    # Deleted and binary files have no line count
+    assert count_lines(cache, repo_dir, ["a.py", "b.txt", "bin.dat"]) == {"a.py": 4}
+
+def test_count_lines_does_not_deadlock_on_many_requests(origin, cache):
+    url, _ = origin
+    repo_dir = cache.ensure(url, "origin")
+    # ~100 KB of requests and their output: more than a pipe buffer holds in either direction
+    paths = ["a.py"] * 10000
+    result = {}
+
+    worker = threading.Thread(target=lambda: result.update(count_lines(cache, repo_dir, paths)), daemon=True)
+    worker.start()
+    worker.join(timeout=30)
+    assert not worker.is_alive(), "count_lines deadlocked"
+    assert result == {"a.py": 4}
+
+@pytest.mark.parametrize("blob_filter", ["blob:none", ""])
+def test_analyze_clone(origin, cache, blob_filter):
+    url, head = origin
+    cache.blob_filter = blob_filter
+    analysis = analyze_clone(url, "origin", max_commits=10, cache=cache)
+
+    churn = analysis.churn
+    assert churn.head_sha == head
+    assert churn.commits_analyzed == 3
+    assert (churn.files["a.py"].changes, churn.files["a.py"].additions, churn.files["a.py"].deletions) == (2, 5, 1)
+    assert (churn.files["b.txt"].changes, churn.files["b.txt"].additions, churn.files["b.txt"].deletions) == (2, 2, 2)
+    assert churn.files["bin.dat"].changes == 1
+    assert analysis.hotspots == [("a.py", 4)]
+
+def test_evict_skips_clone_in_use_by_another_process(origin, cache):
+    url, _ = origin
+    repo_dir = cache.ensure(url, "origin")
+    cache.max_bytes = 1
+
+    # Another worker process holds the clone the way analyze_clone does
+    holder = subprocess.Popen(
+        [sys.executable, "-c",
+         "import fcntl, os, sys\n"
+         f"fd = os.open({os.path.join(cache.root, '.lock-origin')!r}, os.O_RDWR | os.O_CREAT)\n"
+         "fcntl.flock(fd, fcntl.LOCK_SH)\n"
+         "print('locked', flush=True)\n"
+         "sys.stdin.read()\n"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        cache.evict()
+        assert os.path.isdir(repo_dir)
+    finally:
+        holder.communicate(input="")
+
+    cache.evict()
+    assert not os.path.exists(repo_dir)
+
+def test_evict_skips_clone_in_use_by_this_process(origin, cache):
+    url, _ = origin
+    cache.max_bytes = 1
+
+    with cache.in_use("origin"):
+        repo_dir = cache.ensure(url, "origin") # ensure() evicts, but not the clone being used
+        assert os.path.isdir(repo_dir)
+    cache.evict()
+    assert not os.path.exists(repo_dir)
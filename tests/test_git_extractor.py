@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import pytest
+
+from src.cache.stores import MemoryCache
+from src.data_extraction import git_extractor
+from src.data_extraction.profile_snapshots import ProfileSnapshotStore
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self.payload
+
+class FakeGitHub:
+    """Answers the REST and GraphQL calls of a deep profile for user 'dev' from in-memory data."""
+
+    def __init__(self, repo_count: int, total_commits: int = 40):
+        # Newest push first, like the API with sort=pushed
+        self.repos = [self.repo(i, f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}Z") for i in range(repo_count)]
+        self.repos.reverse()
+        self.events = []
+        self.failing_pages = set()
+        self.total_commits = total_commits
+
+    @staticmethod
+    def repo(i: int, pushed_at: str):
+        return {"full_name": f"dev/repo{i}", "pushed_at": pushed_at, "size": 100, "language": "Python"}
+
+    async def get(self, path, token=None, params=None):
+        if path == "/users/dev":
+            return FakeResponse(200, {"public_repos": len(self.repos)})
+        if path == "/users/dev/repos":
+            if params["page"] in self.failing_pages:
+                return FakeResponse(502, {"message": "Bad Gateway"})
+            start = (params["page"] - 1) * 100
+            return FakeResponse(200, self.repos[start:start + 100])
+        if path == "/users/dev/events/public":
+            return FakeResponse(200, self.events)
+        if path.endswith("/languages"):
+            return FakeResponse(200, {"Python": 1000})
+        return FakeResponse(404, {"message": "Not Found"})
+
+    async def graphql(self, query, variables):
+        return FakeResponse(200, {"data": {"user": {"contributionsCollection": {
+            "totalCommitContributions": self.total_commits,
+            "commitContributionsByRepository": [
+                {"contributions": {"totalCount": self.total_commits}, "repository": {"nameWithOwner": "dev/repo0", "isFork": False}}
+            ]
+        }}}})
+
+class AuthenticatedPool:
+    authenticated = True
+
+@pytest.fixture
+def github(monkeypatch):
+    fake = FakeGitHub(repo_count=150)
+    store = ProfileSnapshotStore(MemoryCache())
+    monkeypatch.setattr(git_extractor, "github_get", fake.get)
+    monkeypatch.setattr(git_extractor, "github_graphql", fake.graphql)
+    monkeypatch.setattr(git_extractor, "get_token_pool", lambda: AuthenticatedPool())
+    monkeypatch.setattr(git_extractor, "get_profile_store", lambda: store)
+    monkeypatch.setenv("PROFILE_DEEP_MAX_REQUESTS", "1000")
+    fake.store = store
+    return fake
+
+def _profile():
+    return asyncio.run(git_extractor.extract_deep_profile("dev"))
+
+def _snapshot(github):
+    return asyncio.run(github.store.get("dev"))
+
+def test_failed_page_keeps_full_scan_watermark(github):
+    github.failing_pages = {2}
+    _profile()
+    snapshot = _snapshot(github)
+    assert len(snapshot["repos"]) == 100
+    assert snapshot["last_synced"] == "" # Page 2 was never listed
+
+    # The next (incremental) run lists everything after the old watermark and finds page 2
+    github.failing_pages = set()
+    _profile()
+    snapshot = _snapshot(github)
+    assert len(snapshot["repos"]) == 150
+    assert snapshot["last_synced"] == github.repos[0]["pushed_at"]
+
+def test_failed_page_does_not_replace_repos_on_relist(github):
+    _profile()
+    before = _snapshot(github)
+
+    # A new repo changes public_repos, so the incremental run re-lists every page
+    github.repos.insert(0, github.repo(150, "2026-02-01T00:00:00Z"))
+    github.failing_pages = {2}
+    _profile()
+    snapshot = _snapshot(github)
+    assert set(snapshot["repos"]) == set(before["repos"])
+    assert snapshot["last_synced"] == before["last_synced"]
+
+    github.failing_pages = set()
+    _profile()
+    snapshot = _snapshot(github)
+    assert len(snapshot["repos"]) == 151
+    assert snapshot["last_synced"] == "2026-02-01T00:00:00Z"
+
+def test_incremental_refresh_keeps_commit_counts_of_last_full_scan(github):
+    profile = _profile()
+    assert "Authored 40 commits in the last year." in profile.contribution_style
+
+    github.repos[0]["pushed_at"] = "2026-02-01T00:00:00Z"
+    github.events = [
+        {"type": "PushEvent", "created_at": "2026-02-01T00:00:01Z", "repo": {"name": "other/lib"}, "payload": {"distinct_size": 7}},
+        {"type": "PushEvent", "created_at": "2026-02-01T00:00:00Z", "repo": {"name": "dev/repo149"}, "payload": {"distinct_size": 5}},
+    ]
+    for _ in range(2):
+        profile = _profile()
+        assert "Authored 40 commits in the last year." in profile.contribution_style
+
+    snapshot = _snapshot(github)
+    assert snapshot["total_commits"] == 40
+    assert snapshot["commits"] == {"dev/repo0": 40}
+    assert snapshot["external"]["other/lib"] == {"languages": {"Python": 1000}}
+    assert snapshot["last_synced"] == "2026-02-01T00:00:01Z" # Newest event
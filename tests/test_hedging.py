@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+
+from src.llm import client
+from src.llm.hedging import HedgePolicy, LatencyStats, hedged_call
+
+def _policy(**overrides) -> HedgePolicy:
+    settings = {"enabled": True, "fixed_threshold": 0.05, "max_retries": 2, "backoff": 0.001}
+    settings.update(overrides)
+    return HedgePolicy(**settings)
+
+class ApiError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"{code} (injected)")
+        self.code = code
+
+class ScriptedModel:
+    """Answers calls in order from 'script': a float waits that long and succeeds, an int raises that status."""
+
+    def __init__(self, name: str, *script):
+        self.name = name
+        self.script = list(script)
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        if isinstance(step, int):
+            raise ApiError(step)
+        await asyncio.sleep(step)
+        return f"{self.name} answer"
+
+def _run(primary: ScriptedModel, backup: ScriptedModel, policy: HedgePolicy):
+    return asyncio.run(hedged_call(
+        lambda model: model(), (primary.name, primary), (backup.name, backup), "complete", "generate",
+        policy=policy, stats=LatencyStats()
+    ))
+
+def test_hedge_wins_over_slow_primary():
+    primary, backup = ScriptedModel("primary", 2.0), ScriptedModel("backup", 0.01)
+    started = time.perf_counter()
+    result, winner = _run(primary, backup, _policy())
+    assert (result, winner) == ("backup answer", "backup")
+    assert time.perf_counter() - started < 1.0 # The slow primary was cancelled, not awaited
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = ScriptedModel("primary", 0.001), ScriptedModel("backup", 0.001)
+    assert _run(primary, backup, _policy(fixed_threshold=1.0)) == ("primary answer", "primary")
+    assert backup.calls == 0
+
+def test_503_is_retried():
+    model = ScriptedModel("primary", 503, 503, 0.001)
+    result, winner = _run(model, model, _policy(enabled=False))
+    assert (result, winner) == ("primary answer", "primary")
+    assert model.calls == 3
+
+def test_client_error_is_not_retried():
+    model = ScriptedModel("primary", 400, 0.001)
+    with pytest.raises(ApiError) as raised:
+        _run(model, model, _policy())
+    assert raised.value.code == 400
+    assert model.calls == 1
+
+def test_retries_run_out():
+    model = ScriptedModel("primary", 503)
+    with pytest.raises(ApiError):
+        _run(model, model, _policy(enabled=False, max_retries=2))
+    assert model.calls == 3 # First try + 2 retries
+
+def test_transient_failure_fails_over_to_backup():
+    primary, backup = ScriptedModel("primary", 503), ScriptedModel("fallback", 0.001)
+    assert _run(primary, backup, _policy(fixed_threshold=10.0)) == ("fallback answer", "fallback")
+    assert primary.calls == 1
+
+def test_report_fails_over_to_fallback_model(fake_llm, dev_profile, repo_context):
+    primary, fallback = fake_llm({"fail": True}, {})
+    report = asyncio.run(client.generate_hiring_report(dev_profile, repo_context))
+    assert report is not None and report["text"].startswith("## Core Fit Assessment")
+    assert primary.calls == 1 and fallback.calls == 1
+
+def test_report_is_none_when_every_attempt_fails(fake_llm, dev_profile, repo_context):
+    primary, fallback = fake_llm({"fail": True}, {"fail": True})
+    assert asyncio.run(client.generate_hiring_report(dev_profile, repo_context)) is None
+    assert primary.calls + fallback.calls == 4 # Primary, hedge, then 2 retries
+
+def test_stream_hedges_a_stalled_first_chunk(fake_llm, dev_profile, repo_context):
+    fake_llm({"latency_ms": 20, "stall_ms": 5000}, {"latency_ms": 20})
+
+    async def collect():
+        return "".join([chunk async for chunk in client.stream_hiring_report(dev_profile, repo_context)])
+
+    started = time.perf_counter()
+    text = asyncio.run(collect())
+    assert text.startswith("## Core Fit Assessment")
+    assert time.perf_counter() - started < 2.0
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from src import main
+from src.data_extraction import rate_limit
+from src.data_extraction.rate_limit import RateLimitExceeded, TokenPool, estimate_report_cost
+
+@pytest.fixture
+def tokenless_pool(monkeypatch):
+    """The shared pool of a deployment without GITHUB_TOKENS (60 requests an hour)."""
+    pool = TokenPool([], reserve=50, max_wait=60)
+    monkeypatch.setattr(rate_limit, "_pool", pool)
+    return pool
+
+def test_tokenless_reports_cost_no_graphql(tokenless_pool):
+    assert estimate_report_cost() == {"core": 5, "graphql": 0}
+
+def test_tokenless_pool_admits_reports_up_to_its_capacity(tokenless_pool):
+    # The reserve is capped at a tenth of the 60-request limit, so 54 are admissible
+    assert tokenless_pool.kept_free("core") == 6
+    cost = estimate_report_cost()
+    reservations = [tokenless_pool.admit(cost) for _ in range(10)]
+    assert tokenless_pool.reserved == {"core": 50, "graphql": 0}
+
+    with pytest.raises(RateLimitExceeded):
+        tokenless_pool.admit(cost)
+    assert tokenless_pool.rejected == 1
+
+    reservations[0].release()
+    tokenless_pool.admit(cost)
+
+def test_reservation_is_drawn_down_by_calls_and_released_on_exit(tokenless_pool):
+    async def run():
+        with tokenless_pool.admit({"core": 5, "graphql": 0}) as reservation:
+            for _ in range(2):
+                token = await tokenless_pool.acquire()
+                tokenless_pool.release(token)
+            return dict(reservation.left), dict(tokenless_pool.reserved)
+
+    left, reserved = asyncio.run(run())
+    assert left == {"core": 3, "graphql": 0}
+    assert reserved == {"core": 3, "graphql": 0}
+    assert tokenless_pool.reserved == {"core": 0, "graphql": 0}
+
+def _run_sse(pool: TokenPool, receive, send):
+    """Serves an SSE response whose events never arrive, holding a reservation of 'pool'."""
+    async def events():
+        await asyncio.sleep(3600)
+        yield "never", {}
+
+    async def run():
+        response = main._sse_response(events(), pool.admit({"core": 5, "graphql": 0}))
+        assert pool.reserved["core"] == 5
+        scope = {"type": "http", "method": "POST", "path": "/", "headers": []}
+        try:
+            await asyncio.wait_for(response(scope, receive, send), timeout=5)
+        except Exception:
+            pass # The send failure, possibly wrapped in an exception group by anyio
+
+    asyncio.run(run())
+
+def test_sse_reservation_is_released_when_the_client_disconnects(tokenless_pool):
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    _run_sse(tokenless_pool, receive, send)
+    assert tokenless_pool.reserved["core"] == 0
+
+def test_sse_reservation_is_released_when_the_stream_never_starts(tokenless_pool):
+    async def receive():
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        raise OSError("client gone") # Fails on the response start, before the body is pulled
+
+    _run_sse(tokenless_pool, receive, send)
+    assert tokenless_pool.reserved["core"] == 0
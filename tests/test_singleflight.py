@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from src.orchestration.singleflight import SingleFlight
+
+class Work:
+    """Shared work that finishes once 'release' is set; records whether it was cancelled."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = 0
+        self.cancelled = False
+
+    async def __call__(self) -> str:
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "result"
+
+def test_concurrent_calls_share_one_execution():
+    async def run():
+        flight, work = SingleFlight("test"), Work()
+        waiters = [asyncio.create_task(flight.do("k", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        work.release.set()
+        return flight, work, await asyncio.gather(*waiters)
+
+    flight, work, results = asyncio.run(run())
+    assert results == ["result"] * 3
+    assert work.started == 1
+    assert flight.stats() == {"executions": 1, "coalesced": 2, "in_flight": 0}
+
+def test_cancelled_waiter_does_not_cancel_the_others():
+    async def run():
+        flight, work = SingleFlight("test"), Work()
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        work.release.set()
+        return work, await second
+
+    work, result = asyncio.run(run())
+    assert result == "result"
+    assert not work.cancelled
+
+def test_cancelling_every_waiter_cancels_the_work():
+    async def run():
+        flight, work = SingleFlight("test"), Work()
+        waiters = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        for waiter in waiters:
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        await asyncio.sleep(0) # Let the shared task handle its cancellation
+        assert work.cancelled
+        assert flight.stats()["in_flight"] == 0
+
+        # A later call starts fresh instead of joining the cancelled task
+        again = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        work.release.set()
+        return work, await again
+
+    work, result = asyncio.run(run())
+    assert result == "result"
+    assert work.started == 2
+
+def test_exception_is_shared_by_every_waiter():
+    async def run():
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def fail():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flight.do("k", fail) for _ in range(2)), return_exceptions=True)
+        return calls, results
+
+    calls, results = asyncio.run(run())
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
@@ -0,0 +1,227 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from src.cache import stores
+from src.cache.stores import MemoryCache, SqliteCache, TieredCache, fill_lease
+
+class Clock:
+    """Stands in for the time module in stores.py; advance() moves it forward."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self) -> float:
+        return time.time() + self.offset
+
+    def advance(self, seconds: float = 1.0):
+        self.offset += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(stores, "time", clock)
+    return clock
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setenv("CACHE_LEASE_POLL_MS", "10")
+
+def _keys(store: SqliteCache):
+    return {row[0] for row in store._conn.execute("SELECT key FROM cache_entries WHERE namespace = ?", (store.namespace,))}
+
+# --- fill_lease ---
+
+def test_expired_lease_is_taken_over(path):
+    store = SqliteCache(path)
+    assert store.acquire_lease("k", "crashed-worker", 0.2)
+
+    async def run():
+        started = time.perf_counter()
+        async with fill_lease(store, "k", seconds=5) as entry:
+            waited = time.perf_counter() - started
+            assert not store.acquire_lease("k", "someone-else", 5) # Ours now
+        return entry, waited
+
+    entry, waited = asyncio.run(run())
+    assert entry is None # Nothing was stored: we compute it
+    assert waited >= 0.15
+    assert store.acquire_lease("k", "someone-else", 5) # Released on exit
+
+def test_waiter_is_served_the_stored_value(path):
+    # Two workers on the same file
+    filler_store, waiter_store = SqliteCache(path), SqliteCache(path)
+
+    async def run():
+        filling = asyncio.Event()
+
+        async def filler():
+            async with fill_lease(filler_store, "k") as entry:
+                assert entry is None
+                filling.set()
+                await asyncio.sleep(0.1)
+                await filler_store.aset("k", b"computed")
+
+        async def waiter():
+            await filling.wait()
+            async with fill_lease(waiter_store, "k") as entry:
+                return entry
+
+        _, entry = await asyncio.gather(filler(), waiter())
+        return entry
+
+    entry = asyncio.run(run())
+    assert entry is not None and entry.value == b"computed"
+
+def test_waiter_ignores_stale_value_until_ready(path):
+    filler_store, waiter_store = SqliteCache(path), SqliteCache(path)
+    filler_store.set("k", b"old", {"head": "a"})
+
+    async def run():
+        filling = asyncio.Event()
+
+        async def filler():
+            async with fill_lease(filler_store, "k"):
+                filling.set()
+                await asyncio.sleep(0.1)
+                await filler_store.aset("k", b"new", {"head": "b"})
+
+        async def waiter():
+            await filling.wait()
+            async with fill_lease(waiter_store, "k", ready=lambda e: e.meta.get("head") == "b") as entry:
+                return entry
+
+        return (await asyncio.gather(filler(), waiter()))[1]
+
+    assert asyncio.run(run()).value == b"new"
+
+def test_cancelled_filler_releases_its_lease(path):
+    store = SqliteCache(path)
+
+    async def run():
+        async def filler():
+            async with fill_lease(store, "k"):
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(filler())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert store.acquire_lease("k", "next-worker", 5)
+
+def test_memory_store_has_no_lease():
+    async def run():
+        async with fill_lease(MemoryCache(), "k") as entry:
+            return entry
+
+    assert asyncio.run(run()) is None
+
+# --- SqliteCache eviction ---
+
+def test_eviction_keeps_most_recent_entries_within_max_bytes(path, clock):
+    store = SqliteCache(path, max_entries=100, max_bytes=1000)
+    for i in range(5):
+        store.set(f"k{i}", b"x" * 300) # Each write is over max_bytes / 16, so eviction runs
+        clock.advance()
+    assert _keys(store) == {"k2", "k3", "k4"}
+
+    store.get("k2") # Now the most recently used
+    clock.advance()
+    store.set("k5", b"x" * 300)
+    assert _keys(store) == {"k2", "k4", "k5"}
+    assert store.stats()["bytes"] == 900
+    assert store.stats()["evictions"] == 3
+
+def test_eviction_by_entry_count(path, clock):
+    store = SqliteCache(path, max_entries=3, max_bytes=10 ** 6)
+    for i in range(6):
+        store.set(f"k{i}", b"x")
+        clock.advance()
+    assert len(_keys(store)) == 6 # Small writes only trigger a pass every EVICT_EVERY writes
+    store._evict()
+    assert _keys(store) == {"k3", "k4", "k5"}
+
+def test_value_larger_than_max_bytes_is_not_stored(path):
+    store = SqliteCache(path, max_bytes=100)
+    store.set("small", b"x" * 10)
+    store.set("huge", b"x" * 101)
+    assert _keys(store) == {"small"}
+
+def test_file_without_size_column_is_migrated(path, clock):
+    # Layout written before entries were sized
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE cache_entries ("
+        " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, meta TEXT NOT NULL,"
+        " stored_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+    )
+    now = time.time()
+    conn.executemany(
+        "INSERT INTO cache_entries VALUES ('default', ?, ?, '{}', ?, ?)",
+        [(f"old{i}", b"x" * 300, now + i, now + i) for i in range(3)]
+    )
+    conn.commit()
+    conn.close()
+
+    store = SqliteCache(path, max_bytes=1000)
+    assert store.stats()["bytes"] == 900
+
+    clock.advance(10)
+    assert store.get("old0").value == b"x" * 300
+    clock.advance()
+    store.set("new", b"x" * 300)
+    assert _keys(store) == {"old0", "old2", "new"} # old1 is the least recently used
+
+# --- TieredCache ---
+
+def _tiered(path: str, local_ttl: float = 30.0) -> TieredCache:
+    return TieredCache(MemoryCache(max_entries=10), SqliteCache(path), local_ttl=local_ttl)
+
+def test_tiered_reads_through_to_the_shared_tier(path):
+    writer, reader = _tiered(path), _tiered(path)
+    writer.set("k", b"v1", {"n": 1})
+
+    entry = reader.get("k")
+    assert (entry.value, entry.meta) == (b"v1", {"n": 1})
+    assert (reader.shared_hits, reader.local_hits) == (1, 0)
+    assert reader.get("k").value == b"v1"
+    assert (reader.shared_hits, reader.local_hits) == (1, 1) # Served from the local copy
+
+def test_tiered_local_copy_is_refreshed_after_local_ttl(path, clock):
+    writer, reader = _tiered(path, local_ttl=30), _tiered(path, local_ttl=30)
+    writer.set("k", b"v1")
+    assert reader.get("k").value == b"v1"
+
+    writer.set("k", b"v2")
+    assert reader.get("k").value == b"v1" # Trusted for local_ttl
+    clock.advance(31)
+    assert reader.get("k").value == b"v2"
+
+    writer.delete("k")
+    clock.advance(31)
+    assert reader.get("k") is None
+    assert reader.local.get("k") is None # A shared miss drops the stale local copy
+
+def test_tiered_async_methods(path):
+    writer, reader = _tiered(path), _tiered(path)
+
+    async def run():
+        await writer.aset("k", b"v1")
+        first = await reader.aget("k")
+        second = await reader.aget("k")
+        await writer.adelete("k")
+        return first, second, await writer.aget("k")
+
+    first, second, deleted = asyncio.run(run())
+    assert first.value == second.value == b"v1"
+    assert (reader.shared_hits, reader.local_hits) == (1, 1)
+    assert deleted is None
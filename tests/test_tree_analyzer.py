@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+import pytest
+
+from src.data_extraction.tree_analyzer import TreeIndex, parse_tree_stream
+
+TREE = [
+    {"path": "src", "type": "tree", "sha": "1"},
+    {"path": "src/app.py", "type": "blob", "sha": "2", "size": 1200},
+    {"path": "src/util.py", "type": "blob", "sha": "3", "size": 300},
+    {"path": "README.md", "type": "blob", "sha": "4", "size": 80},
+]
+
+def body(truncated: bool, truncated_first: bool) -> str:
+    fields = [("sha", "abc"), ("url", "https://api.github.com/repos/o/r/git/trees/abc"), ("tree", TREE)]
+    fields.insert(0 if truncated_first else len(fields), ("truncated", truncated))
+    return json.dumps(dict(fields))
+
+def parse(text: str, chunk_size: int, max_entries: int = 1000):
+    async def chunks():
+        for i in range(0, len(text), chunk_size):
+            yield text[i:i + chunk_size]
+
+    index = TreeIndex()
+    truncated = asyncio.run(parse_tree_stream(chunks(), index, max_entries))
+    return index, truncated
+
+@pytest.mark.parametrize("truncated_first", [False, True])
+@pytest.mark.parametrize("truncated", [False, True])
+@pytest.mark.parametrize("chunk_size", [5, 64, 100000])
+def test_truncated_flag_in_either_order(truncated, truncated_first, chunk_size):
+    index, result = parse(body(truncated, truncated_first), chunk_size)
+    assert result is truncated
+    assert sorted(path for path, _, _ in index.files()) == ["README.md", "src/app.py", "src/util.py"]
+
+def test_max_entries_marks_index_truncated():
+    index, result = parse(body(False, truncated_first=True), 7, max_entries=2)
+    assert result is True
+    assert len(index) == 1 # The 'src' tree entry counts towards the limit
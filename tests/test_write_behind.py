@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from src.persistence import write_behind
+from src.persistence.memory_store import MemoryFirestore
+from src.persistence.write_behind import WriteBehindQueue
+
+class FlakyFirestore(MemoryFirestore):
+    """MemoryFirestore whose first 'failures' batch commits raise."""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+        self.attempts = 0
+
+    def batch(self):
+        batch = super().batch()
+        commit = batch.commit
+
+        def flaky_commit():
+            self.attempts += 1
+            if self.attempts <= self.failures:
+                raise RuntimeError("injected commit failure")
+            commit()
+
+        batch.commit = flaky_commit
+        return batch
+
+def _path(i: int):
+    return ("artifacts", "commit-card", "users", "u", "reports", f"r{i}")
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    # Retry delays are 0.5 s * 2^attempt * uniform(0.5, 1.0); keep them in the milliseconds
+    monkeypatch.setattr(write_behind.random, "uniform", lambda a, b: 0.01)
+
+def test_writes_are_committed_in_batches():
+    db = MemoryFirestore()
+
+    async def run():
+        queue = WriteBehindQueue(lambda: db, batch_size=3, flush_interval=0.05)
+        queue.start()
+        for i in range(7):
+            await queue.enqueue(_path(i), {"n": i})
+        await queue.stop(timeout=5)
+        return queue
+
+    queue = asyncio.run(run())
+    assert db.batches_committed == 3 # 3 + 3 + 1
+    assert queue.stats() == {"queued": 0, "written": 7, "failed": 0, "batches": 3}
+    assert db.documents["artifacts/commit-card/users/u/reports/r6"] == {"n": 6}
+
+def test_queued_writes_are_readable_until_committed():
+    db = MemoryFirestore()
+
+    async def run():
+        queue = WriteBehindQueue(lambda: db, batch_size=10, flush_interval=60)
+        queue.start()
+        await queue.enqueue(_path(1), {"n": 1})
+        await asyncio.sleep(0.05)
+        before = (queue.pending(_path(1)), dict(db.documents))
+        await queue.stop(timeout=5)
+        return queue, before
+
+    queue, (pending, committed) = asyncio.run(run())
+    assert pending == {"n": 1}
+    assert committed == {}
+    assert queue.pending(_path(1)) is None
+
+def test_stop_flushes_without_waiting_for_the_interval():
+    db = MemoryFirestore()
+
+    async def run():
+        queue = WriteBehindQueue(lambda: db, batch_size=100, flush_interval=60)
+        queue.start()
+        for i in range(5):
+            await queue.enqueue(_path(i), {"n": i})
+        await asyncio.sleep(0.05) # The flusher now waits out flush_interval for more writes
+        started = asyncio.get_running_loop().time()
+        await queue.stop(timeout=5)
+        return asyncio.get_running_loop().time() - started
+
+    elapsed = asyncio.run(run())
+    assert elapsed < 1
+    assert len(db.documents) == 5
+    assert db.batches_committed == 1
+
+def test_failed_commit_is_retried():
+    db = FlakyFirestore(failures=2)
+
+    async def run():
+        queue = WriteBehindQueue(lambda: db, batch_size=10, flush_interval=0.01, max_retries=3)
+        queue.start()
+        for i in range(4):
+            await queue.enqueue(_path(i), {"n": i})
+        await queue.stop(timeout=5)
+        return queue
+
+    queue = asyncio.run(run())
+    assert db.attempts == 3
+    assert len(db.documents) == 4
+    assert queue.written == 4 and queue.failed == 0
+
+def test_batch_is_dropped_after_max_retries():
+    db = FlakyFirestore(failures=100)
+
+    async def run():
+        queue = WriteBehindQueue(lambda: db, batch_size=10, flush_interval=0.01, max_retries=2)
+        queue.start()
+        await queue.enqueue(_path(1), {"n": 1})
+        await queue.stop(timeout=5)
+        return queue
+
+    queue = asyncio.run(run())
+    assert db.attempts == 3 # First try + 2 retries
+    assert db.documents == {}
+    assert queue.failed == 1 and queue.written == 0
+    assert queue.pending(_path(1)) is None